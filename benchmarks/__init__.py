@@ -0,0 +1,3 @@
+"""
+Benchmarks de desempenho do sistema de controle de estoque
+"""
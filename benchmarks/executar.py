@@ -0,0 +1,298 @@
+"""
+Executa os benchmarks dos serviços de estoque e compara com uma baseline
+
+Uso:
+    python -m benchmarks.executar                         # 10^3 a 10^6 movimentações
+    python -m benchmarks.executar --rapido                # apenas 10^3 e 10^4
+    python -m benchmarks.executar --saida resultados.json
+    python -m benchmarks.executar --rapido --comparar benchmarks/baseline.json --limite 0.25
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.database.profiles import get_profile
+from src.models.produto import Produto
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from main import imprimir_relatorio
+
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000]
+TAMANHOS_RAPIDOS = [1_000, 10_000]
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Movimentações inseridas por chamada a registrar_movimentacoes_em_lote na carga
+BLOCO_CARGA = 50_000
+
+# A cada quantos produtos um é criado sem estoque (aparece no alerta de estoque baixo)
+INTERVALO_SEM_ESTOQUE = 20
+
+
+def percentil(amostras: List[float], p: float) -> float:
+    """
+    Calcula o percentil pelo método do posto mais próximo
+    
+    Args:
+        amostras: Valores já ordenados
+        p: Percentil entre 0 e 100
+        
+    Returns:
+        Valor do percentil (0.0 se não houver amostras)
+    """
+    if not amostras:
+        return 0.0
+    indice = min(len(amostras) - 1, max(0, math.ceil(p / 100 * len(amostras)) - 1))
+    return amostras[indice]
+
+
+def medir(cenario: str, tamanho: int, operacao: Callable[[int], object], repeticoes: int) -> Dict:
+    """
+    Mede a latência de cada chamada e a vazão total de um cenário
+    
+    Args:
+        cenario: Nome do cenário
+        tamanho: Quantidade de movimentações da base
+        operacao: Função chamada com o índice da repetição
+        repeticoes: Número de chamadas
+        
+    Returns:
+        Dicionário com ops/s e percentis de latência em milissegundos
+    """
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        t0 = time.perf_counter_ns()
+        operacao(i)
+        latencias.append((time.perf_counter_ns() - t0) / 1_000_000)
+    duracao = time.perf_counter() - inicio
+    
+    latencias.sort()
+    return {
+        "cenario": cenario,
+        "tamanho": tamanho,
+        "operacoes": repeticoes,
+        "duracao_s": round(duracao, 4),
+        "ops_por_segundo": round(repeticoes / duracao, 1) if duracao else 0.0,
+        "p50_ms": round(percentil(latencias, 50), 4),
+        "p99_ms": round(percentil(latencias, 99), 4),
+    }
+
+
+def popular_base(db_path: str, tamanho: int, semente: int) -> List[int]:
+    """
+    Cria a base de teste com o perfil bulk_load
+    
+    Um produto para cada 100 movimentações (mínimo de 100). Um a cada
+    INTERVALO_SEM_ESTOQUE produtos fica sem estoque e sem movimentações.
+    
+    Args:
+        db_path: Caminho do arquivo do banco
+        tamanho: Quantidade de movimentações
+        semente: Semente do gerador aleatório
+        
+    Returns:
+        IDs dos produtos que recebem movimentações
+    """
+    db = DatabaseConnection(db_path, profile="bulk_load")
+    create_tables(db)
+    total_produtos = max(100, tamanho // 100)
+    
+    with db.get_cursor() as cursor:
+        cursor.executemany(
+            """
+            INSERT INTO produtos (nome, descricao, preco_unitario, estoque_atual, estoque_inicial)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                (f"Produto {i:07d}", "Produto de benchmark", float(1 + i % 500),
+                 0 if i % INTERVALO_SEM_ESTOQUE == 0 else 1000,
+                 0 if i % INTERVALO_SEM_ESTOQUE == 0 else 1000)
+                for i in range(total_produtos)
+            )
+        )
+        cursor.execute("SELECT id, estoque_atual FROM produtos ORDER BY id")
+        ativos = [row["id"] for row in cursor.fetchall() if row["estoque_atual"] > 0]
+    
+    estoque_service = EstoqueService(db)
+    gerador = random.Random(semente)
+    restante = tamanho
+    while restante > 0:
+        bloco = min(BLOCO_CARGA, restante)
+        estoque_service.registrar_movimentacoes_em_lote(
+            (gerador.choice(ativos), "saida" if gerador.random() < 0.2 else "entrada", gerador.randint(1, 10))
+            for _ in range(bloco)
+        )
+        restante -= bloco
+    
+    db.close()
+    return ativos
+
+
+def executar_tamanho(tamanho: int, perfil: Optional[str], repeticoes: int, semente: int) -> List[Dict]:
+    """
+    Executa todos os cenários sobre uma base com a quantidade dada de movimentações
+    
+    Args:
+        tamanho: Quantidade de movimentações da base
+        perfil: Perfil do SQLite usado nas medições
+        repeticoes: Chamadas por cenário (cenários pesados usam menos)
+        semente: Semente do gerador aleatório
+        
+    Returns:
+        Lista de resultados de cada cenário
+    """
+    diretorio = tempfile.mkdtemp(prefix="estoque-bench-")
+    db_path = os.path.join(diretorio, "bench.db")
+    
+    try:
+        t0 = time.perf_counter()
+        ativos = popular_base(db_path, tamanho, semente)
+        print(f"   base com {tamanho} movimentações criada em {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        
+        db = DatabaseConnection(db_path, profile=perfil)
+        produto_service = ProdutoService(db)
+        estoque_service = EstoqueService(db)
+        gerador = random.Random(semente)
+        sorteados = [gerador.choice(ativos) for _ in range(repeticoes)]
+        
+        pesados = max(3, repeticoes // 100)
+        cenarios = [
+            ("criar_produto", repeticoes,
+             lambda i: produto_service.criar_produto(Produto(nome=f"Novo {tamanho} {i}", preco_unitario=1.0))),
+            ("registrar_entrada", repeticoes,
+             lambda i: estoque_service.registrar_entrada(sorteados[i], 1)),
+            ("registrar_saida", repeticoes,
+             lambda i: estoque_service.registrar_saida(sorteados[i], 1)),
+            ("listar_movimentacoes_produto", repeticoes,
+             lambda i: estoque_service.listar_movimentacoes(produto_id=sorteados[i])),
+            ("listar_movimentacoes", pesados,
+             lambda i: estoque_service.listar_movimentacoes()),
+            ("obter_saldo_produto", repeticoes,
+             lambda i: estoque_service.obter_saldo_produto(sorteados[i])),
+            ("obter_produtos_com_estoque_baixo", pesados,
+             lambda i: estoque_service.obter_produtos_com_estoque_baixo(limite=10)),
+            ("relatorio_main", pesados,
+             lambda i: imprimir_relatorio(produto_service, estoque_service, escrever=lambda *args: None)),
+        ]
+        
+        resultados = []
+        for cenario, quantidade, operacao in cenarios:
+            resultado = medir(cenario, tamanho, operacao, quantidade)
+            print(f"   {cenario:<34} {resultado['ops_por_segundo']:>12.1f} op/s"
+                  f"  p50 {resultado['p50_ms']:>9.3f} ms  p99 {resultado['p99_ms']:>9.3f} ms", file=sys.stderr)
+            resultados.append(resultado)
+        
+        db.close()
+        return resultados
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def comparar(resultados: List[Dict], baseline: List[Dict], limite: float) -> List[str]:
+    """
+    Compara a vazão de cada cenário com a baseline
+    
+    Args:
+        resultados: Resultados da execução atual
+        baseline: Resultados armazenados
+        limite: Queda relativa de ops/s tolerada (0.25 = 25%)
+        
+    Returns:
+        Descrição das regressões encontradas (vazia se nenhuma)
+    """
+    referencia = {(r["cenario"], r["tamanho"]): r for r in baseline}
+    regressoes = []
+    
+    for resultado in resultados:
+        base = referencia.get((resultado["cenario"], resultado["tamanho"]))
+        if base is None or not base["ops_por_segundo"]:
+            continue
+        
+        variacao = resultado["ops_por_segundo"] / base["ops_por_segundo"] - 1
+        marca = "REGRESSÃO" if variacao < -limite else "ok"
+        print(f"   {resultado['cenario']:<34} {resultado['tamanho']:>9} {variacao:>+8.1%}  {marca}", file=sys.stderr)
+        
+        if variacao < -limite:
+            regressoes.append(
+                f"{resultado['cenario']} ({resultado['tamanho']}): "
+                f"{base['ops_por_segundo']:.1f} -> {resultado['ops_por_segundo']:.1f} op/s ({variacao:+.1%})"
+            )
+    
+    return regressoes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema de controle de estoque")
+    parser.add_argument("--tamanhos", type=int, nargs="+", help="Quantidades de movimentações da base")
+    parser.add_argument("--rapido", action="store_true", help=f"Usa apenas {TAMANHOS_RAPIDOS}")
+    parser.add_argument("--repeticoes", type=int, default=1000, help="Chamadas por cenário")
+    parser.add_argument("--perfil", help="Perfil do SQLite (padrão: ESTOQUE_DB_PROFILE ou balanced)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", nargs="?", const=BASELINE_PADRAO, metavar="BASELINE",
+                        help="Compara com uma baseline e falha se houver regressão")
+    parser.add_argument("--limite", type=float, default=0.25,
+                        help="Queda de ops/s tolerada na comparação (padrão: 0.25)")
+    args = parser.parse_args(argv)
+    
+    tamanhos = args.tamanhos or (TAMANHOS_RAPIDOS if args.rapido else TAMANHOS_PADRAO)
+    perfil = get_profile(args.perfil).name
+    
+    resultados = []
+    for tamanho in tamanhos:
+        print(f"📊 {tamanho} movimentações (perfil {perfil})", file=sys.stderr)
+        resultados.extend(executar_tamanho(tamanho, perfil, args.repeticoes, args.semente))
+    
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "perfil": perfil,
+        },
+        "resultados": resultados,
+    }
+    
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+            arquivo.write("\n")
+    else:
+        json.dump(relatorio, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)["resultados"]
+        
+        print(f"\n🔎 Comparando com {args.comparar} (limite {args.limite:.0%})", file=sys.stderr)
+        regressoes = comparar(resultados, baseline, args.limite)
+        if regressoes:
+            print("\n❌ Regressões de desempenho:", file=sys.stderr)
+            for regressao in regressoes:
+                print(f"   {regressao}", file=sys.stderr)
+            return 1
+        print("✅ Nenhuma regressão acima do limite", file=sys.stderr)
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Script para exportar movimentações ou produtos em CSV/JSONL
+"""
+import argparse
+import sys
+import os
+from datetime import datetime
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.models.movimentacao import TipoMovimentacao
+from src.services.exportador import Exportador, FORMATOS_EXPORTACAO
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta movimentações ou produtos em fluxo (memória constante)")
+    parser.add_argument("tabela", choices=("movimentacoes", "produtos"))
+    parser.add_argument("destino", help="arquivo de saída (.csv, .jsonl, com .gz para gzip) ou '-' para stdout")
+    parser.add_argument("--banco", default=None, help="caminho do banco (padrão: estoque.db)")
+    parser.add_argument("--formato", default=None, choices=FORMATOS_EXPORTACAO,
+                        help="formato de saída (padrão: pela extensão, ou csv)")
+    parser.add_argument("--gzip", action="store_true", default=None, help="compacta a saída com gzip")
+    parser.add_argument("--produto", type=int, default=None, help="apenas movimentações deste produto")
+    parser.add_argument("--tipo", default=None, choices=[tipo.value for tipo in TipoMovimentacao],
+                        help="apenas movimentações deste tipo")
+    parser.add_argument("--inicio", type=datetime.fromisoformat, default=None,
+                        help="movimentações a partir desta data/hora (ISO)")
+    parser.add_argument("--fim", type=datetime.fromisoformat, default=None,
+                        help="movimentações anteriores a esta data/hora (ISO)")
+    args = parser.parse_args()
+    if args.gzip and args.destino == "-":
+        parser.error("--gzip exige um arquivo de saída")
+    
+    db = DatabaseConnection(args.banco)
+    create_tables(db)
+    exportador = Exportador(db)
+    destino = sys.stdout if args.destino == "-" else args.destino
+    
+    try:
+        if args.tabela == "movimentacoes":
+            resultado = exportador.exportar_movimentacoes(
+                destino, formato=args.formato, compactar=args.gzip, produto_id=args.produto,
+                tipo=TipoMovimentacao(args.tipo) if args.tipo else None, inicio=args.inicio, fim=args.fim
+            )
+        else:
+            resultado = exportador.exportar_produtos(destino, formato=args.formato, compactar=args.gzip)
+    finally:
+        db.close()
+    
+    print(f"{resultado.linhas} linhas exportadas em {resultado.segundos:.2f}s "
+          f"({resultado.linhas_por_segundo:,.0f} linhas/s)", file=sys.stderr)
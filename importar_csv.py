@@ -0,0 +1,62 @@
+"""
+Script para importar produtos e saldos de estoque de um arquivo CSV
+"""
+import argparse
+import csv
+import sys
+import os
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.services.importador_csv import ImportadorCSV, TAMANHO_BLOCO_IMPORTACAO
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Importa produtos (upsert pelo nome) e saldos de estoque de um CSV com cabeçalho"
+    )
+    parser.add_argument("arquivo", help="arquivo CSV (colunas: nome, descricao, preco_unitario, "
+                                        "estoque_atual, estoque_minimo)")
+    parser.add_argument("--banco", default=None, help="caminho do banco (padrão: estoque.db)")
+    parser.add_argument("--perfil", default=None, choices=("durable", "balanced", "bulk_load"),
+                        help="perfil de desempenho do SQLite")
+    parser.add_argument("--delimitador", default=",", help="separador de campos (padrão: ',')")
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO_IMPORTACAO,
+                        help="linhas gravadas por transação")
+    parser.add_argument("--rejeitadas", default=None,
+                        help="grava as linhas rejeitadas (linha, motivo) neste CSV")
+    args = parser.parse_args()
+    
+    db = DatabaseConnection(args.banco, profile=args.perfil)
+    create_tables(db)
+    importador = ImportadorCSV(db, tamanho_bloco=args.tamanho_bloco)
+    
+    saida_rejeitadas = open(args.rejeitadas, "w", newline="", encoding="utf-8") if args.rejeitadas else None
+    try:
+        ao_rejeitar = None
+        if saida_rejeitadas is not None:
+            escritor = csv.writer(saida_rejeitadas)
+            escritor.writerow(("linha", "motivo"))
+            ao_rejeitar = lambda rejeicao: escritor.writerow((rejeicao.linha, rejeicao.motivo))
+        
+        resultado = importador.importar(args.arquivo, delimitador=args.delimitador, ao_rejeitar=ao_rejeitar)
+    finally:
+        if saida_rejeitadas is not None:
+            saida_rejeitadas.close()
+        db.close()
+    
+    print(f"Linhas lidas:  {resultado.linhas_lidas}")
+    print(f"Inseridos:     {resultado.inseridos}")
+    print(f"Atualizados:   {resultado.atualizados}")
+    print(f"Inalterados:   {resultado.inalterados}")
+    print(f"Ajustes:       {resultado.ajustes}")
+    print(f"Rejeitadas:    {resultado.total_rejeitadas}")
+    print(f"Tempo:         {resultado.segundos:.2f}s ({resultado.linhas_por_segundo:,.0f} linhas/s)")
+    
+    if args.rejeitadas is None:
+        for rejeicao in resultado.rejeicoes[:20]:
+            print(f"  linha {rejeicao.linha}: {rejeicao.motivo}")
+        if resultado.total_rejeitadas > 20:
+            print(f"  ... e mais {resultado.total_rejeitadas - 20} (use --rejeitadas para gravar todas)")
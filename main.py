@@ -95,48 +95,65 @@ def demonstrar_sistema():
         print(f"   ❌ ERRO: {e}")
         print(f"   ✅ Sistema protegeu contra estoque negativo!")
     
+    imprimir_relatorio(produto_service, estoque_service)
+    
+    # Com ESTOQUE_DB_SLOW_MS definido, mostra as instruções SQL mais custosas
+    tracer = get_database_connection().tracer
+    if tracer is not None:
+        print(f"\n🔎 INSTRUÇÕES SQL (por tempo total)")
+        print(tracer.format_table(limit=10))
+    
+    print(f"\n🎉 Demonstração concluída com sucesso!")
+    print("💡 Execute 'behave' para rodar os testes BDD")
+    print("💡 Execute 'pytest tests/' para rodar os testes unitários")
+
+
+def imprimir_relatorio(produto_service, estoque_service, escrever=print):
+    """
+    Imprime o relatório de estoque, os alertas e as últimas movimentações
+    
+    Args:
+        produto_service: Serviço de produtos
+        estoque_service: Serviço de estoque
+        escrever: Função usada para emitir cada linha
+    """
     # 5. Relatório de Estoque
-    print(f"\n📊 5. RELATÓRIO DE ESTOQUE ATUAL")
-    print("-" * 35)
+    escrever(f"\n📊 5. RELATÓRIO DE ESTOQUE ATUAL")
+    escrever("-" * 35)
     
-    produtos_atuais = produto_service.listar_produtos()
-    total_valor = 0
+    # Valores calculados no banco; reaproveitado do cache enquanto o estoque não muda
+    valorizacao = estoque_service.relatorio_valorizacao(top=3, por_produto=True)
     
-    for produto in produtos_atuais:
-        valor_estoque = produto.estoque_atual * produto.preco_unitario
-        total_valor += valor_estoque
-        print(f"   📦 {produto.nome:<25} | Estoque: {produto.estoque_atual:>3} | Valor: R$ {valor_estoque:>8.2f}")
+    for item in valorizacao.por_produto:
+        escrever(f"   📦 {item.nome:<25} | Estoque: {item.estoque_atual:>3} | Valor: R$ {item.valor:>8.2f}")
     
-    print(f"   {'-' * 70}")
-    print(f"   💰 VALOR TOTAL DO ESTOQUE: R$ {total_valor:.2f}")
+    escrever(f"   {'-' * 70}")
+    escrever(f"   💰 VALOR TOTAL DO ESTOQUE: R$ {valorizacao.valor_total:.2f}")
+    escrever(f"   🏆 Maiores valores: {', '.join(item.nome for item in valorizacao.maiores)}")
     
     # 6. Produtos com Estoque Baixo
-    print(f"\n⚠️  6. PRODUTOS COM ESTOQUE BAIXO (≤ 10 unidades)")
-    print("-" * 55)
+    escrever(f"\n⚠️  6. PRODUTOS COM ESTOQUE BAIXO (≤ 10 unidades)")
+    escrever("-" * 55)
     
     produtos_baixo = estoque_service.obter_produtos_com_estoque_baixo(limite=10)
     
     if produtos_baixo:
         for produto in produtos_baixo:
-            print(f"   ⚠️  {produto.nome:<25} | Estoque: {produto.estoque_atual:>3} unidades")
+            escrever(f"   ⚠️  {produto.nome:<25} | Estoque: {produto.estoque_atual:>3} unidades")
     else:
-        print("   ✅ Nenhum produto com estoque baixo!")
+        escrever("   ✅ Nenhum produto com estoque baixo!")
     
     # 7. Histórico de Movimentações
-    print(f"\n📋 7. ÚLTIMAS MOVIMENTAÇÕES")
-    print("-" * 30)
+    escrever(f"\n📋 7. ÚLTIMAS MOVIMENTAÇÕES")
+    escrever("-" * 30)
     
-    movimentacoes = estoque_service.listar_movimentacoes()
+    # Apenas as 8 mais recentes, já com o nome do produto (uma única consulta)
+    movimentacoes = estoque_service.listar_movimentacoes_paginado(limite=8, incluir_produto=True)
     
-    for i, mov in enumerate(movimentacoes[:8]):  # Mostra apenas as 8 mais recentes
-        produto = produto_service.buscar_produto_por_id(mov.produto_id)
+    for mov in movimentacoes:
         icone = "📥" if mov.is_entrada() else "📤"
         sinal = "+" if mov.is_entrada() else "-"
-        print(f"   {icone} {produto.nome:<20} | {sinal}{mov.quantidade:>3} | {mov.created_at.strftime('%d/%m %H:%M')}")
-    
-    print(f"\n🎉 Demonstração concluída com sucesso!")
-    print("💡 Execute 'behave' para rodar os testes BDD")
-    print("💡 Execute 'pytest tests/' para rodar os testes unitários")
+        escrever(f"   {icone} {mov.produto_nome:<20} | {sinal}{mov.quantidade:>3} | {mov.created_at.strftime('%d/%m %H:%M')}")
 
 
 def resetar_banco():
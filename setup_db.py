@@ -1,15 +1,35 @@
 """
 Script para inicializar o banco de dados
 """
+import argparse
 import sys
 import os
 
 # Adiciona o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.database.migrations import create_tables
+from src.database.migrations import create_tables, reconstruir_movimentacoes_diarias
+from src.services.estoque_service import EstoqueService
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inicializa o banco de dados")
+    parser.add_argument("--reconstruir-resumo-diario", action="store_true",
+                        help="refaz a tabela movimentacoes_diarias a partir do histórico")
+    parser.add_argument("--arquivar-movimentacoes", action="store_true",
+                        help="move os meses fechados de movimentações para arquivos mensais (partições)")
+    args = parser.parse_args()
+    
     print("Criando tabelas do banco de dados...")
     create_tables()
     print("Tabelas criadas com sucesso!")
+    
+    if args.reconstruir_resumo_diario:
+        print("Reconstruindo o resumo diário de movimentações...")
+        ultima = reconstruir_movimentacoes_diarias()
+        print(f"Resumo diário reconstruído até a movimentação {ultima}.")
+    
+    if args.arquivar_movimentacoes:
+        print("Arquivando os meses fechados de movimentações...")
+        for particao in EstoqueService().arquivar_movimentacoes():
+            print(f"  {particao.mes}: {particao.linhas} movimentações em {particao.arquivo}")
+        print("Arquivamento concluído.")
@@ -3,44 +3,230 @@ Gerenciamento de conexão com o banco de dados SQLite
 """
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
-from typing import Optional
+from typing import Optional, Union
+
+from .pool import ConnectionPool, PoolMetrics
+from .profiles import SQLiteProfile, get_profile
+from .tracing import DEFAULT_SLOW_THRESHOLD_MS, TRACE_ENV_VAR, SQLTracer
+from ..models.datas import FORMATO_TEXTO
+
+
+# Tamanho padrão do pool de conexões
+DEFAULT_POOL_SIZE = 8
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão SQLite do pool (subclasse para permitir weakrefs e atributos)"""
+    
+    # Mantido pelo rastreamento de SQL: transação aberta por BEGIN IMMEDIATE ou escrita
+    in_write_transaction = False
+    
+    # Partições anexadas (esquema -> arquivo), ver src/database/partitions.py
+    attached_partitions = None
 
 
 class DatabaseConnection:
-    """Classe para gerenciar conexões com o banco SQLite"""
+    """
+    Classe para gerenciar conexões com o banco SQLite
     
-    def __init__(self, db_path: Optional[str] = None):
+    As conexões vêm de um pool limitado e podem ser usadas por várias
+    threads: cada thread reserva uma conexão ao entrar em get_cursor e a
+    devolve ao sair. Chamadas aninhadas na mesma thread reutilizam a
+    conexão já reservada.
+    
+    Toda conexão aberta recebe os PRAGMAs do perfil de desempenho
+    configurado (ver src/database/profiles.py).
+    
+    O rastreamento de SQL (ver src/database/tracing.py) é opcional: com
+    um SQLTracer configurado, os cursores de get_cursor registram cada
+    instrução; sem ele, get_cursor não tem custo adicional.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_timeout: float = 30.0, profile: Union[str, SQLiteProfile, None] = None,
+                 tracer: Optional[SQLTracer] = None):
         """
         Inicializa a conexão com o banco
         
         Args:
             db_path: Caminho para o arquivo do banco. Se None, usa 'estoque.db'
+            pool_size: Número máximo de conexões simultâneas
+            pool_timeout: Tempo máximo (segundos) de espera por uma conexão livre
+            profile: Perfil de desempenho ('durable', 'balanced', 'bulk_load').
+                Se None, usa a variável de ambiente ESTOQUE_DB_PROFILE ou 'balanced'
+            tracer: Rastreador de SQL. Se None, o rastreamento só é ativado
+                quando a variável ESTOQUE_DB_SLOW_MS define o limite (ms) de
+                consulta lenta
         """
         if db_path is None:
             db_path = "estoque.db"
         
+        # Cada conexão ':memory:' é um banco distinto; não pode ser compartilhado
+        if db_path == ":memory:":
+            pool_size = 1
+        
         self.db_path = db_path
-        self._connection: Optional[sqlite3.Connection] = None
+        self.profile = get_profile(profile)
+        self._pool = ConnectionPool(self._create_connection, max_size=pool_size, timeout=pool_timeout)
+        self._local = threading.local()
+        self._timestamp_format: Optional[str] = None
+        
+        if tracer is None and os.environ.get(TRACE_ENV_VAR):
+            tracer = SQLTracer(slow_threshold_ms=float(os.environ[TRACE_ENV_VAR]))
+        self.tracer = tracer
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """
+        Cria uma nova conexão SQLite para o pool
+        
+        Returns:
+            Conexão SQLite
+        """
+        connection = sqlite3.connect(
+            self.db_path,
+            timeout=self.profile.busy_timeout / 1000,
+            check_same_thread=False,
+            factory=PooledConnection,
+            # Permite anexar partições somente leitura (file:...?mode=ro)
+            uri=True
+        )
+        connection.row_factory = sqlite3.Row  # Para acessar colunas por nome
+        
+        cursor = self.cursor(connection)
+        try:
+            self.profile.apply(cursor)
+        finally:
+            cursor.close()
+        return connection
+    
+    def cursor(self, connection: sqlite3.Connection) -> sqlite3.Cursor:
+        """
+        Cria um cursor na conexão, rastreado se o rastreamento estiver ativo
+        
+        Usado por get_cursor e pelas instruções internas (PRAGMAs do perfil,
+        leitura de metadados, ATTACH de partições), para que o SQLTracer
+        registre todas as instruções enviadas ao banco.
+        
+        Args:
+            connection: Conexão SQLite
+            
+        Returns:
+            Cursor padrão ou TracedCursor
+        """
+        tracer = self.tracer
+        return connection.cursor() if tracer is None else tracer.cursor(connection)
     
     def connect(self) -> sqlite3.Connection:
         """
-        Cria e retorna uma conexão com o banco
+        Retorna a conexão reservada para a thread atual
+        
+        A conexão permanece reservada para a thread até close(). Chamadas
+        repetidas na mesma thread devolvem a mesma conexão sem reservá-la de
+        novo, de modo que um único close() a devolve ao pool.
         
         Returns:
             Conexão SQLite
         """
-        if self._connection is None:
-            self._connection = sqlite3.connect(self.db_path)
-            self._connection.row_factory = sqlite3.Row  # Para acessar colunas por nome
+        if getattr(self._local, "pinned", False):
+            return self._local.connection
         
-        return self._connection
+        connection = self._checkout()
+        self._local.pinned = True
+        return connection
     
     def close(self) -> None:
-        """Fecha a conexão com o banco"""
-        if self._connection:
-            self._connection.close()
-            self._connection = None
+        """Devolve a conexão da thread atual e fecha as conexões do pool"""
+        if getattr(self._local, "pinned", False):
+            self._local.pinned = False
+            self._checkin()
+        
+        self._pool.close()
+    
+    def pool_metrics(self) -> PoolMetrics:
+        """
+        Retorna as métricas do pool de conexões
+        
+        Returns:
+            Instância de PoolMetrics
+        """
+        return self._pool.metrics()
+    
+    def enable_tracing(self, slow_threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS) -> SQLTracer:
+        """
+        Ativa o rastreamento de SQL nos próximos cursores de get_cursor
+        
+        Args:
+            slow_threshold_ms: Duração (ms) a partir da qual a instrução vai
+                para o log de consultas lentas
+            
+        Returns:
+            Rastreador com os agregados e as consultas lentas
+        """
+        self.tracer = SQLTracer(slow_threshold_ms=slow_threshold_ms)
+        return self.tracer
+    
+    def disable_tracing(self) -> Optional[SQLTracer]:
+        """
+        Desativa o rastreamento de SQL
+        
+        Returns:
+            Rastreador que estava ativo (com os agregados coletados), ou None
+        """
+        tracer, self.tracer = self.tracer, None
+        return tracer
+    
+    @property
+    def timestamp_format(self) -> str:
+        """
+        Formato dos timestamps gravados neste banco ('texto' ou 'epoch_us')
+        
+        Lido da tabela metadados na primeira consulta e mantido em memória.
+        Bancos anteriores à tabela usam 'texto'.
+        """
+        if self._timestamp_format is None:
+            # Sem get_cursor: a leitura pode ocorrer no meio de uma transação
+            # da mesma thread, que não deve ser confirmada aqui
+            cursor = self.cursor(self._checkout())
+            try:
+                row = cursor.execute(
+                    "SELECT valor FROM metadados WHERE chave = 'formato_timestamp'"
+                ).fetchone()
+            except sqlite3.OperationalError:
+                # Tabelas ainda não criadas: não guarda o valor
+                return FORMATO_TEXTO
+            finally:
+                cursor.close()
+                self._checkin()
+            self._timestamp_format = row['valor'] if row else FORMATO_TEXTO
+        return self._timestamp_format
+    
+    def refresh_timestamp_format(self) -> None:
+        """Descarta o formato de timestamp em memória (após criar ou migrar o banco)"""
+        self._timestamp_format = None
+    
+    def _checkout(self) -> sqlite3.Connection:
+        """Reserva (ou reutiliza) a conexão da thread atual"""
+        depth = getattr(self._local, "depth", 0)
+        
+        if depth == 0:
+            self._local.connection = self._pool.acquire()
+        
+        self._local.depth = depth + 1
+        return self._local.connection
+    
+    def _checkin(self) -> None:
+        """Libera um nível de reserva; devolve a conexão ao pool no último"""
+        self._local.depth -= 1
+        
+        if self._local.depth == 0:
+            connection = self._local.connection
+            self._local.connection = None
+            
+            if connection.in_transaction:
+                connection.rollback()
+            self._pool.release(connection)
     
     @contextmanager
     def get_cursor(self):
@@ -50,16 +236,19 @@ class DatabaseConnection:
         Yields:
             Cursor SQLite
         """
-        conn = self.connect()
-        cursor = conn.cursor()
+        conn = self._checkout()
         try:
-            yield cursor
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
+            cursor = self.cursor(conn)
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
         finally:
-            cursor.close()
+            self._checkin()
     
     def execute_script(self, script: str) -> None:
         """
@@ -72,20 +261,25 @@ class DatabaseConnection:
             cursor.executescript(script)
     
     def reset_database(self) -> None:
-        """Remove o arquivo do banco se existir"""
+        """Remove o arquivo do banco (e os arquivos do WAL) se existir"""
         self.close()
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
+        for path in (self.db_path, f"{self.db_path}-wal", f"{self.db_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
 
 # Instância singleton para uso global
 _db_connection: Optional[DatabaseConnection] = None
+_db_connection_lock = threading.Lock()
 
 
 def get_database_connection(db_path: Optional[str] = None) -> DatabaseConnection:
     """
     Retorna a instância singleton da conexão com banco
     
+    A instância é segura para uso concorrente: cada thread obtém sua
+    própria conexão do pool.
+    
     Args:
         db_path: Caminho para o banco (usado apenas na primeira chamada)
         
@@ -95,7 +289,9 @@ def get_database_connection(db_path: Optional[str] = None) -> DatabaseConnection
     global _db_connection
     
     if _db_connection is None:
-        _db_connection = DatabaseConnection(db_path)
+        with _db_connection_lock:
+            if _db_connection is None:
+                _db_connection = DatabaseConnection(db_path)
     
     return _db_connection
 
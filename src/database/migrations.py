@@ -1,78 +1,618 @@
 """
 Migrations para criação das tabelas do banco de dados
 """
+from datetime import datetime, timezone
+from typing import Optional
+
 from .connection import get_database_connection
+from .migrator import DEFAULT_CHUNK_SIZE, Migration, Migrator
+from .partitions import attach_partitions, partition_path, partition_schema
+from ..models.datas import FORMATO_EPOCH, FORMATO_TEXTO, para_epoch_us
+
+
+# Formato de timestamp usado em bancos novos
+FORMATO_TIMESTAMP_PADRAO = FORMATO_EPOCH
+
+# Expressão SQL do instante atual em cada formato. Em epoch, julianday('now')
+# tem precisão de milissegundos e é arredondada antes de virar microssegundos.
+SQL_AGORA = {
+    FORMATO_TEXTO: "CURRENT_TIMESTAMP",
+    FORMATO_EPOCH: "(CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER) * 1000)",
+}
 
+# Dia local (YYYY-MM-DD) de movimentacoes.created_at em qualquer formato.
+# Textos sem fração de segundo vêm de CURRENT_TIMESTAMP e são UTC.
+SQL_DIA_MOVIMENTACAO = """CASE
+    WHEN typeof(created_at) = 'integer' THEN date(created_at / 1000000, 'unixepoch', 'localtime')
+    WHEN length(created_at) = 19 THEN date(created_at, 'localtime')
+    ELSE date(created_at)
+END"""
 
-def create_tables() -> None:
-    """Cria todas as tabelas necessárias no banco"""
+# Colunas de data convertidas por migrar_timestamps_para_epoch
+COLUNAS_TIMESTAMP = {
+    "produtos": ("created_at", "updated_at"),
+    "movimentacoes": ("created_at",),
+    "saldos_checkpoint": ("created_at",),
+}
+
+
+def create_tables(db_connection=None, formato_timestamp: Optional[str] = None) -> None:
+    """
+    Cria todas as tabelas necessárias no banco
     
-    db = get_database_connection()
+    Aplica as migrations pendentes (ver MIGRATIONS); com o esquema atual,
+    custa uma única leitura de PRAGMA user_version.
     
-    # Script SQL para criar as tabelas
-    script = """
-    -- Tabela de produtos
-    CREATE TABLE IF NOT EXISTS produtos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT NOT NULL UNIQUE,
-        descricao TEXT,
-        preco_unitario REAL DEFAULT 0.0,
-        estoque_atual INTEGER DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    
-    -- Tabela de movimentações
-    CREATE TABLE IF NOT EXISTS movimentacoes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        produto_id INTEGER NOT NULL,
-        tipo TEXT NOT NULL CHECK (tipo IN ('entrada', 'saida')),
-        quantidade INTEGER NOT NULL CHECK (quantidade > 0),
-        observacao TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
-    );
-    
-    -- Índices para melhorar performance
-    CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome);
-    CREATE INDEX IF NOT EXISTS idx_movimentacoes_produto_id ON movimentacoes(produto_id);
-    CREATE INDEX IF NOT EXISTS idx_movimentacoes_tipo ON movimentacoes(tipo);
-    CREATE INDEX IF NOT EXISTS idx_movimentacoes_created_at ON movimentacoes(created_at);
+    O formato dos timestamps é escolhido na criação do banco e gravado na
+    tabela metadados. Bancos que já existiam sem essa tabela continuam em
+    texto até migrar_timestamps_para_epoch.
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+        formato_timestamp: 'epoch_us' (padrão) ou 'texto'; vale apenas para
+            bancos novos
+            
+    Raises:
+        ValueError: Se o formato for desconhecido ou diferente do já gravado
+    """
+    
+    db = db_connection or get_database_connection()
+    
+    if formato_timestamp not in (None, FORMATO_TEXTO, FORMATO_EPOCH):
+        raise ValueError(f"Formato de timestamp desconhecido: {formato_timestamp}")
+    
+    migrar_esquema(db, formato_timestamp=formato_timestamp)
+    
+    if formato_timestamp is not None and db.timestamp_format != formato_timestamp:
+        raise ValueError(
+            f"Banco já usa timestamps em '{db.timestamp_format}'; "
+            f"use migrar_timestamps_para_epoch para convertê-lo"
+        )
+
+
+def migrar_esquema(db_connection=None, formato_timestamp: Optional[str] = None,
+                   tamanho_bloco: int = DEFAULT_CHUNK_SIZE, max_blocos: Optional[int] = None) -> int:
+    """
+    Aplica as migrations pendentes do esquema
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+        formato_timestamp: Formato de timestamp para bancos novos
+        tamanho_bloco: Linhas por transação nas cargas de dados
+        max_blocos: Limite de blocos nesta chamada (None para concluir tudo)
+        
+    Returns:
+        Versão do esquema ao final
+    """
+    db = db_connection or get_database_connection()
+    migrador = Migrator(db, MIGRATIONS, {"formato_timestamp": formato_timestamp})
+    
+    versao = migrador.current_version()
+    if versao >= migrador.latest_version:
+        return versao
+    
+    versao = migrador.migrate(chunk_size=tamanho_bloco, max_chunks=max_blocos)
+    db.refresh_timestamp_format()
+    return versao
+
+
+def _v1_metadados(cursor, contexto) -> None:
+    """Cria a tabela metadados e fixa o formato dos timestamps"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metadados (
+            chave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        )
+    """)
+    
+    # Banco anterior à tabela metadados: os dados existentes estão em texto
+    if _tabela_existe(cursor, "produtos"):
+        formato = FORMATO_TEXTO
+    else:
+        formato = contexto.get("formato_timestamp") or FORMATO_TIMESTAMP_PADRAO
+    
+    cursor.execute(
+        "INSERT OR IGNORE INTO metadados (chave, valor) VALUES ('formato_timestamp', ?)", (formato,)
+    )
+
+
+def _v2_produtos_e_movimentacoes(cursor, contexto) -> None:
+    """Cria as tabelas produtos e movimentacoes, os índices e o trigger"""
+    formato = _ler_formato_timestamp(cursor)
+    agora = SQL_AGORA[formato]
+    
+    # Tabela de produtos
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            descricao TEXT,
+            preco_unitario REAL DEFAULT 0.0,
+            estoque_atual INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT {agora},
+            updated_at TIMESTAMP DEFAULT {agora}
+        )
+    """)
+    
+    # Tabela de movimentações
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS movimentacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL CHECK (tipo IN ('entrada', 'saida')),
+            quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+            observacao TEXT,
+            created_at TIMESTAMP DEFAULT {agora},
+            FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Índices para melhorar performance
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentacoes_produto_id ON movimentacoes(produto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentacoes_tipo ON movimentacoes(tipo)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentacoes_created_at ON movimentacoes(created_at)")
+    
+    # Trigger para atualizar updated_at automaticamente
+    cursor.execute(_script_trigger_updated_at(formato, "CREATE TRIGGER IF NOT EXISTS"))
+
+
+def _v3_estoque_inicial(cursor, contexto) -> None:
+    """Adiciona a coluna estoque_inicial (bancos anteriores a ela)"""
+    _adicionar_coluna_se_ausente(cursor, "produtos", "estoque_inicial", "INTEGER DEFAULT 0")
+
+
+def _v4_saldos_checkpoint(cursor, contexto) -> None:
+    """Cria a tabela de checkpoints de saldo"""
+    agora = SQL_AGORA[_ler_formato_timestamp(cursor)]
+    
+    # Checkpoints de saldo: saldo do produto até a movimentação indicada
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS saldos_checkpoint (
+            produto_id INTEGER PRIMARY KEY,
+            movimentacao_id INTEGER NOT NULL DEFAULT 0,
+            saldo INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT {agora},
+            FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _v5_estoque_minimo(cursor, contexto) -> None:
+    """Adiciona o ponto de reposição por produto e o índice da consulta de reposição"""
+    _adicionar_coluna_se_ausente(cursor, "produtos", "estoque_minimo", "INTEGER NOT NULL DEFAULT 0")
+    
+    # Índice parcial: só produtos no ponto de reposição têm entrada, então
+    # movimentações de produtos com estoque folgado não mexem no índice
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_produtos_reposicao
+        ON produtos(estoque_atual - estoque_minimo, id)
+        WHERE estoque_atual <= estoque_minimo
+    """)
+
+
+def _v6_indices_compostos(cursor, contexto) -> None:
+    """Troca os índices de coluna única por índices compostos das consultas dos serviços"""
+    # Listagem por produto em ordem de data sem ordenação temporária; também
+    # atende o saldo (produto_id = ? AND id > ?) e o ON DELETE CASCADE.
+    # Um índice de cobertura só para o saldo deixaria toda inserção ~40% mais
+    # lenta, e o saldo não está no caminho de escrita.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_movimentacoes_produto_created_at
+        ON movimentacoes(produto_id, created_at)
+    """)
+    
+    # Listagem por tipo em ordem de data
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_movimentacoes_tipo_created_at
+        ON movimentacoes(tipo, created_at)
+    """)
+    
+    # Alerta de estoque baixo (WHERE estoque_atual <= ? ORDER BY estoque_atual, nome)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_produtos_estoque_nome
+        ON produtos(estoque_atual, nome)
+    """)
+    
+    # Cobertos pelos índices acima; idx_produtos_nome repete o índice do UNIQUE
+    cursor.execute("DROP INDEX IF EXISTS idx_movimentacoes_produto_id")
+    cursor.execute("DROP INDEX IF EXISTS idx_movimentacoes_tipo")
+    cursor.execute("DROP INDEX IF EXISTS idx_produtos_nome")
+
+
+def _v7_movimentacoes_diarias(cursor, contexto) -> dict:
+    """Cria o resumo diário de movimentações; a carga das existentes roda em blocos"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS movimentacoes_diarias (
+            dia TEXT NOT NULL,
+            produto_id INTEGER NOT NULL,
+            entradas INTEGER NOT NULL DEFAULT 0,
+            saidas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, produto_id),
+            FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_movimentacoes_diarias_produto
+        ON movimentacoes_diarias(produto_id, dia)
+    """)
+    
+    # A partir daqui os serviços mantêm o resumo; a carga vai só até a última
+    # movimentação existente, para não contar duas vezes as que chegarem
+    return {"ultimo": 0, "ate": _ultima_movimentacao(cursor)}
+
+
+def _v7_carregar_movimentacoes_diarias(cursor, estado: dict, tamanho_bloco: int) -> Optional[dict]:
+    """Soma um bloco de movimentações existentes ao resumo diário"""
+    if estado["ultimo"] >= estado["ate"]:
+        return None
+    
+    ate = min(estado["ultimo"] + tamanho_bloco, estado["ate"])
+    _somar_movimentacoes_diarias(cursor, estado["ultimo"], ate)
+    return {"ultimo": ate, "ate": estado["ate"]}
+
+
+def _v8_geracao_estoque(cursor, contexto) -> None:
+    """Cria o contador de geração do estoque, mantido por triggers em produtos"""
+    cursor.execute("INSERT OR IGNORE INTO metadados (chave, valor) VALUES ('geracao_estoque', '0')")
+    
+    # Qualquer alteração de estoque, preço ou nome (inclusive por SQL direto
+    # ou por outro processo) avança a geração; caches derivados desses
+    # valores comparam a geração com uma única leitura por chave primária
+    incrementar = "UPDATE metadados SET valor = valor + 1 WHERE chave = 'geracao_estoque';"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS produtos_geracao_insert
+        AFTER INSERT ON produtos
+        BEGIN {incrementar} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS produtos_geracao_delete
+        AFTER DELETE ON produtos
+        BEGIN {incrementar} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS produtos_geracao_update
+        AFTER UPDATE OF estoque_atual, preco_unitario, nome ON produtos
+        WHEN OLD.estoque_atual IS NOT NEW.estoque_atual
+          OR OLD.preco_unitario IS NOT NEW.preco_unitario
+          OR OLD.nome IS NOT NEW.nome
+        BEGIN {incrementar} END
+    """)
+
+
+def _v9_particoes_movimentacoes(cursor, contexto) -> None:
+    """Cria o catálogo das partições mensais de movimentações"""
+    agora = SQL_AGORA[_ler_formato_timestamp(cursor)]
+    
+    # Uma linha por mês arquivado: o arquivo (relativo ao diretório do banco
+    # principal), os limites [inicio, fim) no formato dos timestamps e as
+    # faixas de IDs e de produtos usadas para descartar partições nas consultas
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS particoes_movimentacoes (
+            mes TEXT PRIMARY KEY,
+            arquivo TEXT NOT NULL,
+            inicio TIMESTAMP NOT NULL,
+            fim TIMESTAMP NOT NULL,
+            primeiro_id INTEGER NOT NULL,
+            ultimo_id INTEGER NOT NULL,
+            menor_produto_id INTEGER NOT NULL,
+            maior_produto_id INTEGER NOT NULL,
+            linhas INTEGER NOT NULL,
+            arquivada_em TIMESTAMP DEFAULT {agora}
+        )
+    """)
+
+
+def _v10_geracao_cadastro(cursor, contexto) -> None:
+    """Cria o contador de geração do cadastro, para as demais colunas de produtos"""
+    cursor.execute("INSERT OR IGNORE INTO metadados (chave, valor) VALUES ('geracao_cadastro', '0')")
+    
+    # Separado de geracao_estoque para não invalidar o relatório de
+    # valorização; o cache de produtos soma as duas gerações para saber se
+    # outra conexão alterou algum produto
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_geracao_cadastro
+        AFTER UPDATE OF descricao, estoque_minimo, estoque_inicial, created_at ON produtos
+        WHEN OLD.descricao IS NOT NEW.descricao
+          OR OLD.estoque_minimo IS NOT NEW.estoque_minimo
+          OR OLD.estoque_inicial IS NOT NEW.estoque_inicial
+          OR OLD.created_at IS NOT NEW.created_at
+        BEGIN UPDATE metadados SET valor = valor + 1 WHERE chave = 'geracao_cadastro'; END
+    """)
+
+
+
+def _v11_movimentacoes_pendentes(cursor, contexto) -> None:
+    """Adiciona aos checkpoints de saldo a contagem de movimentações posteriores"""
+    _adicionar_coluna_se_ausente(cursor, "saldos_checkpoint", "movimentacoes_pendentes", "INTEGER NOT NULL DEFAULT 0")
     
+    # Movimentações de cada produto depois do seu checkpoint; as escritas
+    # mantêm a contagem a partir daqui
+    cursor.execute("""
+        UPDATE saldos_checkpoint SET movimentacoes_pendentes = (
+            SELECT COUNT(*) FROM movimentacoes m
+            WHERE m.produto_id = saldos_checkpoint.produto_id AND m.id > saldos_checkpoint.movimentacao_id
+        )
+    """)
+
+
+# Passos do esquema, em ordem. Nunca altere um passo já publicado: acrescente
+# um novo com a próxima versão.
+MIGRATIONS = [
+    Migration(1, "metadados e formato dos timestamps", _v1_metadados),
+    Migration(2, "tabelas produtos e movimentacoes", _v2_produtos_e_movimentacoes),
+    Migration(3, "coluna produtos.estoque_inicial", _v3_estoque_inicial),
+    Migration(4, "tabela saldos_checkpoint", _v4_saldos_checkpoint),
+    Migration(5, "ponto de reposição por produto", _v5_estoque_minimo),
+    Migration(6, "índices compostos", _v6_indices_compostos),
+    Migration(7, "resumo diário de movimentações", _v7_movimentacoes_diarias, _v7_carregar_movimentacoes_diarias),
+    Migration(8, "geração do estoque para caches", _v8_geracao_estoque),
+    Migration(9, "catálogo de partições de movimentações", _v9_particoes_movimentacoes),
+    Migration(10, "geração do cadastro para o cache de produtos", _v10_geracao_cadastro),
+    Migration(11, "movimentações pendentes por checkpoint de saldo", _v11_movimentacoes_pendentes),
+]
+
+
+def _ler_formato_timestamp(cursor) -> str:
+    """Lê, pelo cursor da migration, o formato de timestamp gravado em metadados"""
+    cursor.execute("SELECT valor FROM metadados WHERE chave = 'formato_timestamp'")
+    row = cursor.fetchone()
+    return row['valor'] if row else FORMATO_TEXTO
+
+
+def _tabela_existe(cursor, tabela: str) -> bool:
+    """Verifica, pelo cursor da migration, se a tabela existe"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def _script_trigger_updated_at(formato: str, criar: str = "CREATE TRIGGER") -> str:
+    """
+    Gera o trigger que atualiza updated_at no formato de timestamp do banco
+    
+    Em epoch o trigger só age quando o próprio UPDATE não alterou
+    updated_at, evitando uma segunda escrita na linha.
+    
+    Args:
+        formato: Formato dos timestamps
+        criar: Comando de criação ('CREATE TRIGGER' ou com IF NOT EXISTS)
+        
+    Returns:
+        Script SQL do trigger
+    """
+    condicao = "WHEN NEW.updated_at IS OLD.updated_at" if formato == FORMATO_EPOCH else ""
+    return f"""
     -- Trigger para atualizar updated_at automaticamente
-    CREATE TRIGGER IF NOT EXISTS update_produtos_updated_at
+    {criar} update_produtos_updated_at
         AFTER UPDATE ON produtos
         FOR EACH ROW
+        {condicao}
     BEGIN
-        UPDATE produtos SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        UPDATE produtos SET updated_at = {SQL_AGORA[formato]} WHERE id = NEW.id;
     END;
     """
+
+
+def migrar_timestamps_para_epoch(db_connection=None, tamanho_bloco: int = 10000) -> int:
+    """
+    Converte os timestamps em texto para microssegundos desde a época
     
-    db.execute_script(script)
+    Primeiro grava o novo formato e recria o trigger (uma transação curta),
+    para que as novas escritas já saiam em epoch. Depois converte as linhas
+    em texto em blocos de tamanho_bloco, cada um na sua transação, sem
+    segurar o lock de escrita pela tabela inteira. Se for interrompida,
+    basta executar de novo: só as linhas ainda em texto são convertidas.
+    
+    Textos sem fração de segundo vêm de CURRENT_TIMESTAMP e são UTC; os
+    demais foram gravados pela aplicação em horário local.
+    
+    Enquanto a conversão não termina, leituras aceitam os dois formatos,
+    mas a ordenação por data mistura os valores (inteiros vêm antes de
+    texto no SQLite). Outros processos devem ser reiniciados para passar
+    a gravar em epoch. Partições já arquivadas não são convertidas: a
+    conversão deve ser feita antes do primeiro arquivamento.
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+        tamanho_bloco: Linhas convertidas por transação
+        
+    Returns:
+        Quantidade de linhas convertidas
+        
+    Raises:
+        ValueError: Se houver partições de movimentações arquivadas
+    """
+    db = db_connection or get_database_connection()
+    create_tables(db)
+    
+    if db.timestamp_format != FORMATO_EPOCH:
+        with db.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM particoes_movimentacoes")
+            if cursor.fetchone()[0]:
+                raise ValueError("Há partições de movimentações arquivadas com timestamps em texto")
+            
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("DROP TRIGGER IF EXISTS update_produtos_updated_at")
+            cursor.execute(_script_trigger_updated_at(FORMATO_EPOCH))
+            cursor.execute(
+                "UPDATE metadados SET valor = ? WHERE chave = 'formato_timestamp'", (FORMATO_EPOCH,)
+            )
+        db.refresh_timestamp_format()
+    
+    convertidas = 0
+    for tabela, colunas in COLUNAS_TIMESTAMP.items():
+        chave = "produto_id" if tabela == "saldos_checkpoint" else "id"
+        em_texto = " OR ".join(f"typeof({coluna}) = 'text'" for coluna in colunas)
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in colunas)
+        ultimo = None
+        
+        while True:
+            with db.get_cursor() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(
+                    f"SELECT {chave}, {', '.join(colunas)} FROM {tabela} "
+                    f"WHERE ({em_texto}) AND {chave} > ? ORDER BY {chave} LIMIT ?",
+                    (ultimo if ultimo is not None else -1, tamanho_bloco)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                cursor.executemany(
+                    f"UPDATE {tabela} SET {atribuicoes} WHERE {chave} = ?",
+                    [
+                        tuple(_texto_para_epoch_us(row[coluna]) for coluna in colunas) + (row[chave],)
+                        for row in rows
+                    ]
+                )
+                ultimo = rows[-1][chave]
+                convertidas += len(rows)
+    
+    return convertidas
 
 
-def drop_tables() -> None:
-    """Remove todas as tabelas (usado para testes)"""
+def _texto_para_epoch_us(valor):
+    """
+    Converte um timestamp em texto para epoch em microssegundos
     
-    db = get_database_connection()
+    Args:
+        valor: Valor da coluna (texto, inteiro ou None)
+        
+    Returns:
+        Inteiro em microssegundos ou o próprio valor se não for texto
+    """
+    if not isinstance(valor, str) or not valor:
+        return valor
+    
+    instante = datetime.fromisoformat(valor)
+    if len(valor) == 19 and instante.tzinfo is None:
+        # 'YYYY-MM-DD HH:MM:SS' de CURRENT_TIMESTAMP, sempre em UTC
+        instante = instante.replace(tzinfo=timezone.utc)
+    return para_epoch_us(instante)
+
+
+def reconstruir_movimentacoes_diarias(db_connection=None, tamanho_bloco: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Reconstrói o resumo diário a partir das movimentações
+    
+    Apaga o resumo e fixa a última movimentação numa transação curta; as
+    partições mensais (uma transação cada) e as movimentações até ela são
+    somadas em blocos de IDs, cada um na sua transação. As que chegarem
+    durante a reconstrução são somadas pelos próprios serviços. Até o fim,
+    o resumo fica incompleto; não execute junto com o arquivamento.
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+        tamanho_bloco: Faixa de IDs de movimentação somada por transação
+        
+    Returns:
+        ID da última movimentação incluída
+    """
+    db = db_connection or get_database_connection()
+    create_tables(db)
+    
+    with db.get_cursor() as cursor:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM movimentacoes_diarias")
+        ate = _ultima_movimentacao(cursor)
+        cursor.execute("SELECT mes, arquivo, ultimo_id FROM particoes_movimentacoes ORDER BY mes")
+        particoes = cursor.fetchall()
+    
+    for particao in particoes:
+        esquema = partition_schema(particao['mes'])
+        with db.get_cursor() as cursor:
+            attach_partitions(cursor, [(esquema, partition_path(db.db_path, particao['arquivo']))])
+            cursor.execute("BEGIN IMMEDIATE")
+            _somar_movimentacoes_diarias(cursor, 0, particao['ultimo_id'], f"{esquema}.movimentacoes")
+    
+    for inicio in range(0, ate, tamanho_bloco):
+        with db.get_cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            _somar_movimentacoes_diarias(cursor, inicio, min(inicio + tamanho_bloco, ate))
+    
+    return ate
+
+
+def _somar_movimentacoes_diarias(cursor, depois_de: int, ate: int, tabela: str = "movimentacoes") -> None:
+    """Soma ao resumo diário as movimentações (da tabela ou partição) com id em (depois_de, ate]"""
+    cursor.execute(f"""
+        INSERT INTO movimentacoes_diarias (dia, produto_id, entradas, saidas)
+        SELECT
+            {SQL_DIA_MOVIMENTACAO},
+            produto_id,
+            SUM(CASE WHEN tipo = 'entrada' THEN quantidade ELSE 0 END),
+            SUM(CASE WHEN tipo = 'saida' THEN quantidade ELSE 0 END)
+        FROM {tabela}
+        WHERE id > ? AND id <= ?
+        GROUP BY 1, 2
+        ON CONFLICT (dia, produto_id) DO UPDATE SET
+            entradas = entradas + excluded.entradas,
+            saidas = saidas + excluded.saidas
+    """, (depois_de, ate))
+
+
+def _ultima_movimentacao(cursor) -> int:
+    """Retorna o maior ID de movimentação (0 se não houver)"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movimentacoes")
+    return cursor.fetchone()[0]
+
+
+def _adicionar_coluna_se_ausente(cursor, tabela: str, coluna: str, definicao: str) -> None:
+    """
+    Adiciona uma coluna a uma tabela existente caso ela ainda não exista
+    
+    Args:
+        cursor: Cursor do banco
+        tabela: Nome da tabela
+        coluna: Nome da coluna
+        definicao: Tipo e restrições da coluna
+    """
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    colunas = {row['name'] for row in cursor.fetchall()}
+    
+    if coluna not in colunas:
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+def drop_tables(db_connection=None) -> None:
+    """
+    Remove todas as tabelas (usado para testes)
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+    """
+    
+    db = db_connection or get_database_connection()
     
     script = """
+    DROP TABLE IF EXISTS saldos_checkpoint;
+    DROP TABLE IF EXISTS movimentacoes_diarias;
+    DROP TABLE IF EXISTS particoes_movimentacoes;
+    DROP TABLE IF EXISTS metadados;
     DROP TABLE IF EXISTS movimentacoes;
     DROP TABLE IF EXISTS produtos;
     DROP TRIGGER IF EXISTS update_produtos_updated_at;
+    DROP TABLE IF EXISTS schema_version;
+    PRAGMA user_version = 0;
     """
     
     db.execute_script(script)
+    db.refresh_timestamp_format()
 
 
-def reset_database() -> None:
-    """Reseta o banco de dados - remove e recria as tabelas"""
-    drop_tables()
-    create_tables()
+def reset_database(db_connection=None) -> None:
+    """
+    Reseta o banco de dados - remove e recria as tabelas
+    
+    Args:
+        db_connection: Conexão com banco (usa a conexão global se None)
+    """
+    drop_tables(db_connection)
+    create_tables(db_connection)
 
 
 if __name__ == "__main__":
     # Executar migrations quando o script for executado diretamente
     print("Criando tabelas do banco de dados...")
     create_tables()
-    print("Tabelas criadas com sucesso!")
+    print(f"Tabelas criadas com sucesso! (esquema na versão {MIGRATIONS[-1].version})")
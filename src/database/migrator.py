@@ -0,0 +1,220 @@
+"""
+Motor de migrations versionadas do esquema
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Histórico das migrations aplicadas e progresso das que têm carga em blocos
+SCHEMA_VERSION_SCRIPT = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    descricao TEXT NOT NULL,
+    concluida INTEGER NOT NULL DEFAULT 0,
+    progresso TEXT,
+    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Tamanho padrão dos blocos das cargas de dados
+DEFAULT_CHUNK_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Passo numerado do esquema
+    
+    up recebe (cursor, contexto) e roda numa transação junto com o registro
+    em schema_version; deve ser idempotente (CREATE ... IF NOT EXISTS), pois
+    bancos anteriores ao motor já podem ter parte do esquema.
+    
+    backfill, se houver, recebe (cursor, estado, tamanho_bloco), processa um
+    bloco e retorna o novo estado (serializável em JSON) ou None ao terminar.
+    O estado inicial é o valor retornado por up, gravado na mesma transação:
+    é onde up fixa, por exemplo, até qual linha a carga deve ir.
+    Cada bloco roda na sua própria transação, com o estado salvo junto, de
+    modo que uma migração interrompida continua de onde parou. As cargas
+    rodam depois do up de todas as migrations pendentes, portanto um up
+    não pode depender dos dados de uma carga anterior.
+    """
+    version: int
+    description: str
+    up: Callable[[Any, Dict[str, Any]], Any]
+    backfill: Optional[Callable[[Any, Any, int], Any]] = None
+
+
+class Migrator:
+    """
+    Aplica as migrations pendentes em ordem
+    
+    A versão do esquema fica também em PRAGMA user_version, lido do
+    cabeçalho do arquivo: quando o banco está atualizado, migrate() custa
+    uma única consulta e não abre transação. user_version é a maior versão
+    até a qual todas as migrations estão concluídas (up e carga).
+    """
+    
+    def __init__(self, db, migrations: Sequence[Migration], context: Optional[Dict[str, Any]] = None):
+        """
+        Inicializa o motor
+        
+        Args:
+            db: Conexão com banco (DatabaseConnection)
+            migrations: Passos do esquema
+            context: Valores repassados ao up de cada migration
+            
+        Raises:
+            ValueError: Se houver versões repetidas ou menores que 1
+        """
+        self.db = db
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.context = context or {}
+        
+        versions = [migration.version for migration in self.migrations]
+        if len(set(versions)) != len(versions) or (versions and versions[0] < 1):
+            raise ValueError(f"Versões de migration inválidas: {versions}")
+    
+    @property
+    def latest_version(self) -> int:
+        """Versão mais recente conhecida"""
+        return self.migrations[-1].version if self.migrations else 0
+    
+    def current_version(self) -> int:
+        """
+        Retorna a versão do esquema gravada no banco
+        
+        Returns:
+            Última versão concluída (0 em bancos novos ou anteriores ao motor)
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("PRAGMA user_version")
+            return cursor.fetchone()[0]
+    
+    def pending(self) -> List[Migration]:
+        """
+        Retorna as migrations ainda não concluídas
+        
+        Returns:
+            Lista em ordem de versão
+        """
+        current = self.current_version()
+        return [migration for migration in self.migrations if migration.version > current]
+    
+    def migrate(self, target: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                max_chunks: Optional[int] = None) -> int:
+        """
+        Aplica as migrations pendentes
+        
+        Primeiro roda o up de todas elas, em ordem; depois, as cargas de
+        dados. Assim, interromper uma carga (max_chunks) não deixa de fora o
+        esquema das versões seguintes, e os serviços funcionam enquanto a
+        carga continua nas próximas chamadas.
+        
+        Args:
+            target: Versão final (a mais recente se None)
+            chunk_size: Linhas por bloco nas cargas de dados
+            max_chunks: Limite de blocos nesta chamada; ao atingi-lo, a
+                carga em andamento para e continua na próxima chamada
+                
+        Returns:
+            Versão do esquema ao final (ver user_version)
+        """
+        target = self.latest_version if target is None else target
+        current = self.current_version()
+        if current >= target:
+            return current
+        
+        self.db.execute_script(SCHEMA_VERSION_SCRIPT)
+        pending = [migration for migration in self.migrations if current < migration.version <= target]
+        
+        for migration in pending:
+            self._apply(migration)
+        
+        chunks = 0
+        for migration in pending:
+            if migration.backfill is None:
+                continue
+            
+            while max_chunks is None or chunks < max_chunks:
+                if self._run_chunk(migration, chunk_size):
+                    break
+                chunks += 1
+            else:
+                break
+        
+        return self._update_version(target)
+    
+    def _apply(self, migration: Migration) -> None:
+        """Executa o up da migration, se ainda não foi registrado em schema_version"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Outro processo pode ter aplicado a migration enquanto esperávamos o lock
+            cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,))
+            if cursor.fetchone():
+                return
+            
+            state = migration.up(cursor, self.context)
+            concluida = migration.backfill is None
+            cursor.execute(
+                "INSERT INTO schema_version (version, descricao, concluida, progresso) VALUES (?, ?, ?, ?)",
+                (migration.version, migration.description, int(concluida),
+                 json.dumps(state) if state is not None and not concluida else None)
+            )
+    
+    def _run_chunk(self, migration: Migration, chunk_size: int) -> bool:
+        """
+        Processa um bloco da carga de dados da migration
+        
+        Returns:
+            True se a carga terminou
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                "SELECT concluida, progresso FROM schema_version WHERE version = ?", (migration.version,)
+            )
+            row = cursor.fetchone()
+            if row['concluida']:
+                return True
+            
+            state = json.loads(row['progresso']) if row['progresso'] is not None else None
+            state = migration.backfill(cursor, state, chunk_size)
+            
+            if state is None:
+                cursor.execute(
+                    "UPDATE schema_version SET concluida = 1, progresso = NULL WHERE version = ?",
+                    (migration.version,)
+                )
+                return True
+            
+            cursor.execute(
+                "UPDATE schema_version SET progresso = ? WHERE version = ?",
+                (json.dumps(state), migration.version)
+            )
+            return False
+    
+    def _update_version(self, target: int) -> int:
+        """
+        Grava em user_version a maior versão até target com todas as
+        migrations anteriores concluídas
+        
+        Returns:
+            Versão gravada
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT version FROM schema_version WHERE concluida = 1")
+            concluded = {row['version'] for row in cursor.fetchall()}
+            
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+            for migration in self.migrations:
+                if migration.version <= version:
+                    continue
+                if migration.version > target or migration.version not in concluded:
+                    break
+                version = migration.version
+            
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            return version
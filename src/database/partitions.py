@@ -0,0 +1,330 @@
+"""
+Arquivos mensais de movimentações anexados ao banco principal com ATTACH
+"""
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+from urllib.request import pathname2url
+
+
+# Partições anexadas ao mesmo tempo por conexão. O SQLite aceita no máximo
+# 10 bancos anexados (SQLITE_MAX_ATTACHED); duas vagas ficam livres para
+# outros usos, como o arquivo de destino do arquivamento.
+MAX_ATTACHED_PARTITIONS = 8
+
+# Esquema de um arquivo de partição: a mesma tabela movimentacoes (os IDs
+# vêm do banco principal, por isso sem AUTOINCREMENT) e os mesmos índices
+PARTITION_SCHEMA_SCRIPT = """
+CREATE TABLE IF NOT EXISTS metadados (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS movimentacoes (
+    id INTEGER PRIMARY KEY,
+    produto_id INTEGER NOT NULL,
+    tipo TEXT NOT NULL CHECK (tipo IN ('entrada', 'saida')),
+    quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+    observacao TEXT,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_movimentacoes_created_at ON movimentacoes(created_at);
+CREATE INDEX IF NOT EXISTS idx_movimentacoes_produto_created_at ON movimentacoes(produto_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_movimentacoes_tipo_created_at ON movimentacoes(tipo, created_at);
+"""
+
+_MONTH = re.compile(r"^\d{4}-\d{2}$")
+
+
+def partition_schema(month: str) -> str:
+    """
+    Nome do esquema (ATTACH ... AS) da partição de um mês
+    
+    Args:
+        month: Mês no formato 'AAAA-MM'
+        
+    Returns:
+        Nome do esquema, como 'mov_2024_03'
+        
+    Raises:
+        ValueError: Se o mês não estiver no formato 'AAAA-MM'
+    """
+    if not _MONTH.match(month):
+        raise ValueError(f"Mês de partição inválido: '{month}'")
+    return "mov_" + month.replace("-", "_")
+
+
+def partition_path(db_path: str, file: str) -> str:
+    """
+    Caminho absoluto de uma partição do catálogo
+    
+    Args:
+        db_path: Caminho do banco principal
+        file: Arquivo da partição, relativo ao diretório do banco principal
+        
+    Returns:
+        Caminho absoluto do arquivo
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), file)
+
+
+def create_partition_file(path: str, timestamp_format: str) -> None:
+    """
+    Cria o arquivo de uma partição com o esquema de movimentacoes
+    
+    A partição usa o journal em modo DELETE: depois de arquivada ela só é
+    lida, e um arquivo sem -wal/-shm pode ficar somente leitura e ser
+    copiado sozinho.
+    
+    Args:
+        path: Caminho do arquivo
+        timestamp_format: Formato dos timestamps do banco principal
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode = DELETE")
+        connection.executescript(PARTITION_SCHEMA_SCRIPT)
+        connection.execute(
+            "INSERT OR IGNORE INTO metadados (chave, valor) VALUES ('formato_timestamp', ?)", (timestamp_format,)
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def attach_partitions(cursor: sqlite3.Cursor, partitions: Sequence[Tuple[str, str]]) -> None:
+    """
+    Garante que as partições estejam anexadas à conexão
+    
+    As partições ficam anexadas entre as consultas; quando o limite é
+    atingido, as usadas há mais tempo (e que não estão no pedido) são
+    desanexadas. As partições são anexadas somente leitura (URI com
+    mode=ro). ATTACH e DETACH não podem rodar dentro de uma transação.
+    
+    Args:
+        cursor: Cursor da conexão do pool (de get_cursor, rastreado se o
+            rastreamento estiver ativo)
+        partitions: Pares (esquema, caminho do arquivo)
+        
+    Raises:
+        ValueError: Se o pedido passar de MAX_ATTACHED_PARTITIONS
+        FileNotFoundError: Se o arquivo de uma partição não existir
+        sqlite3.OperationalError: Se a conexão estiver em transação
+    """
+    if len(partitions) > MAX_ATTACHED_PARTITIONS:
+        raise ValueError(f"No máximo {MAX_ATTACHED_PARTITIONS} partições podem ser anexadas por consulta")
+    
+    connection = cursor.connection
+    attached = getattr(connection, "attached_partitions", None)
+    if attached is None:
+        attached = connection.attached_partitions = OrderedDict()
+    
+    requested = {schema for schema, _ in partitions}
+    for schema, path in partitions:
+        if attached.get(schema) == path:
+            attached.move_to_end(schema)
+            continue
+        
+        if schema in attached:
+            detach_partition(cursor, schema)
+        
+        while len(attached) >= MAX_ATTACHED_PARTITIONS:
+            detach_partition(cursor, next(name for name in attached if name not in requested))
+        
+        # ATTACH de um caminho inexistente criaria um banco vazio
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Arquivo de partição não encontrado: {path}")
+        
+        uri = "file:" + pathname2url(os.path.abspath(path)) + "?mode=ro"
+        cursor.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+        attached[schema] = path
+
+
+def detach_partition(cursor: sqlite3.Cursor, schema: str) -> None:
+    """
+    Desanexa uma partição da conexão do cursor, se estiver anexada
+    
+    Args:
+        cursor: Cursor da conexão do pool
+        schema: Esquema da partição
+    """
+    attached = getattr(cursor.connection, "attached_partitions", None)
+    if attached is not None and attached.pop(schema, None) is not None:
+        cursor.execute(f"DETACH DATABASE {schema}")
+
+
+def find_partitions(cursor: sqlite3.Cursor, db_path: str, product_id: Optional[int] = None,
+                    start=None, end=None, before=None) -> List[Tuple[str, str, object]]:
+    """
+    Consulta no catálogo as partições que podem ter movimentações do filtro
+    
+    Args:
+        cursor: Cursor do banco principal (com ou sem row_factory)
+        db_path: Caminho do banco principal
+        product_id: ID do produto (opcional)
+        start: Limite inferior de created_at no formato do banco (opcional)
+        end: Limite superior (exclusivo) no formato do banco (opcional)
+        before: created_at do cursor de paginação; descarta meses
+            posteriores (opcional)
+        
+    Returns:
+        Tuplas (esquema, caminho, início do mês), do mês mais recente ao mais antigo
+    """
+    query = "SELECT mes, arquivo, inicio FROM particoes_movimentacoes WHERE 1=1"
+    params = []
+    
+    if start is not None:
+        query += " AND fim > ?"
+        params.append(start)
+    
+    if end is not None:
+        query += " AND inicio < ?"
+        params.append(end)
+    
+    if product_id is not None:
+        query += " AND ? BETWEEN menor_produto_id AND maior_produto_id"
+        params.append(product_id)
+    
+    if before is not None:
+        query += " AND inicio <= ?"
+        params.append(before)
+    
+    cursor.execute(query + " ORDER BY mes DESC", params)
+    return [(partition_schema(row[0]), partition_path(db_path, row[1]), row[2]) for row in cursor.fetchall()]
+
+
+def partition_groups(partitions: Sequence[Tuple[str, str, object]]) -> List[Tuple[List[Tuple[str, str]], Tuple]]:
+    """
+    Divide as partições (do mês mais recente ao mais antigo) em grupos
+    consultados um de cada vez
+    
+    Cada grupo recebe a faixa [inferior, superior) de created_at que
+    cobre: os grupos juntos cobrem todo o histórico sem sobreposição, e
+    a tabela principal entra em todos, restrita à faixa do grupo.
+    
+    Args:
+        partitions: Tuplas (esquema, caminho, início do mês)
+        
+    Returns:
+        Lista de (pares (esquema, caminho), (inferior, superior)), do grupo
+        mais recente ao mais antigo
+    """
+    if not partitions:
+        return [([], (None, None))]
+    
+    groups = []
+    upper = None
+    for index in range(0, len(partitions), MAX_ATTACHED_PARTITIONS):
+        group = partitions[index:index + MAX_ATTACHED_PARTITIONS]
+        last = index + MAX_ATTACHED_PARTITIONS >= len(partitions)
+        lower = None if last else group[-1][2]
+        groups.append(([(schema, path) for schema, path, _ in group], (lower, upper)))
+        upper = lower
+    
+    return groups
+
+
+def movement_tables(schemas: Sequence[str]) -> List[str]:
+    """
+    Tabelas de movimentações de uma consulta: a principal e a de cada partição
+    
+    Args:
+        schemas: Esquemas das partições anexadas
+        
+    Returns:
+        Nomes qualificados das tabelas, a principal primeiro
+    """
+    return ["movimentacoes"] + [f"{schema}.movimentacoes" for schema in schemas]
+
+
+def bounds_filter(bounds: Tuple, column: str = "created_at") -> Tuple[str, list]:
+    """
+    Filtro SQL que restringe um ramo à faixa de datas do seu grupo
+    
+    Args:
+        bounds: Faixa (inferior, superior) de partition_groups
+        column: Coluna de data, qualificada se o ramo usar alias
+        
+    Returns:
+        Tupla (trecho ' AND ...', params), vazia se a faixa não tiver limites
+    """
+    lower, upper = bounds
+    sql = ""
+    params = []
+    
+    if lower is not None:
+        sql += f" AND {column} >= ?"
+        params.append(lower)
+    
+    if upper is not None:
+        sql += f" AND {column} < ?"
+        params.append(upper)
+    
+    return sql, params
+
+
+def read_partitioned(cursor: sqlite3.Cursor, db_path: str,
+                     build_query: Callable[[List[str], Tuple], Tuple[str, list]],
+                     product_id: Optional[int] = None, start=None, end=None, before=None,
+                     oldest_first: bool = False, limit: Optional[int] = None,
+                     block_size: Optional[int] = None) -> Iterator[list]:
+    """
+    Lê movimentações da tabela principal e das partições que podem conter
+    linhas do filtro
+    
+    As partições são descartadas pelo catálogo (período, faixa de produtos
+    e cursor). Até MAX_ATTACHED_PARTITIONS partições, tudo é uma única
+    consulta; além disso, as partições são lidas em grupos de meses
+    consecutivos, cada grupo restrito ao seu intervalo de datas, e o limite
+    vale para o conjunto dos grupos.
+    
+    Args:
+        cursor: Cursor do banco principal (fora de transação se houver partições)
+        db_path: Caminho do banco principal
+        build_query: Recebe os esquemas anexados do grupo e a faixa
+            [inferior, superior) de created_at e retorna (query, params),
+            com um ramo para cada tabela de movement_tables e, se a ordem
+            importar, ORDER BY por created_at no sentido de oldest_first
+        product_id: ID do produto (opcional)
+        start: Limite inferior de created_at no formato do banco (opcional)
+        end: Limite superior (exclusivo) no formato do banco (opcional)
+        before: created_at do cursor de paginação (opcional)
+        oldest_first: Lê os grupos do mais antigo ao mais recente
+        limit: Quantidade máxima de linhas (opcional)
+        block_size: Linhas por fetchmany (None lê tudo com fetchall)
+        
+    Yields:
+        Blocos de linhas, grupo a grupo
+    """
+    groups = partition_groups(find_partitions(cursor, db_path, product_id, start, end, before))
+    if oldest_first:
+        groups.reverse()
+    
+    remaining = limit
+    for group, bounds in groups:
+        if group:
+            attach_partitions(cursor, group)
+        
+        query, params = build_query([schema for schema, _ in group], bounds)
+        if remaining is not None:
+            query += " LIMIT ?"
+            params = list(params) + [remaining]
+        
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchall() if block_size is None else cursor.fetchmany(block_size)
+            if not rows:
+                break
+            
+            if remaining is not None:
+                remaining -= len(rows)
+            yield rows
+            
+            if block_size is None:
+                break
+        
+        if remaining == 0:
+            return
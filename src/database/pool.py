@@ -0,0 +1,206 @@
+"""
+Pool de conexões SQLite compartilhado entre threads
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Exceção lançada quando nenhuma conexão fica livre dentro do timeout"""
+    pass
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Retrato das métricas de uso do pool de conexões
+    """
+    max_size: int
+    open_connections: int
+    in_use: int
+    idle: int
+    checkouts: int
+    waits: int
+    timeouts: int
+    total_wait_time: float
+    max_wait_time: float
+    
+    @property
+    def average_wait_time(self) -> float:
+        """Tempo médio de espera (segundos) entre os checkouts que esperaram"""
+        if self.waits == 0:
+            return 0.0
+        return self.total_wait_time / self.waits
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite
+    
+    As conexões são criadas sob demanda até max_size e reaproveitadas
+    em ordem LIFO. Quando todas estão em uso, acquire() aguarda até que
+    alguma seja devolvida ou até o timeout.
+    """
+    
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_size: int = 8,
+                 timeout: float = 30.0):
+        """
+        Inicializa o pool
+        
+        Args:
+            factory: Função que cria uma nova conexão
+            max_size: Número máximo de conexões abertas simultaneamente
+            timeout: Tempo máximo (segundos) de espera por uma conexão livre
+        """
+        if max_size < 1:
+            raise ValueError("Tamanho do pool deve ser maior que zero")
+        
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        
+        self._condition = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._open = 0
+        self._generation = 0
+        self._connection_generation = {}
+        
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+    
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        Obtém uma conexão do pool
+        
+        Args:
+            timeout: Sobrescreve o timeout padrão do pool
+            
+        Returns:
+            Conexão SQLite reservada para o chamador
+            
+        Raises:
+            PoolTimeoutError: Se nenhuma conexão ficar livre a tempo
+        """
+        timeout = self.timeout if timeout is None else timeout
+        wait_start = None
+        
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                
+                if self._open < self.max_size:
+                    self._open += 1
+                    connection = None
+                    break
+                
+                now = time.monotonic()
+                if wait_start is None:
+                    wait_start = now
+                    self._waits += 1
+                
+                remaining = timeout - (now - wait_start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(now - wait_start)
+                    raise PoolTimeoutError(
+                        f"Nenhuma conexão livre no pool após {timeout:.1f}s (max_size={self.max_size})"
+                    )
+                
+                self._condition.wait(remaining)
+            
+            if wait_start is not None:
+                self._record_wait(time.monotonic() - wait_start)
+            self._checkouts += 1
+            generation = self._generation
+        
+        if connection is None:
+            try:
+                connection = self._factory()
+            except Exception:
+                with self._condition:
+                    self._open -= 1
+                    self._condition.notify()
+                raise
+            
+            with self._condition:
+                self._connection_generation[id(connection)] = generation
+        
+        return connection
+    
+    def release(self, connection: sqlite3.Connection) -> None:
+        """
+        Devolve uma conexão ao pool
+        
+        Conexões abertas antes do último close() são fechadas em vez de
+        reaproveitadas.
+        
+        Args:
+            connection: Conexão obtida por acquire()
+        """
+        with self._condition:
+            stale = self._connection_generation.get(id(connection)) != self._generation
+            
+            if stale:
+                self._discard(connection)
+            else:
+                self._idle.append(connection)
+            
+            self._condition.notify()
+        
+        if stale:
+            connection.close()
+    
+    def close(self) -> None:
+        """
+        Fecha as conexões ociosas e invalida as que estão em uso
+        
+        O pool continua utilizável: novas conexões são criadas sob demanda.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            for connection in idle:
+                self._discard(connection)
+            self._generation += 1
+            self._condition.notify_all()
+        
+        for connection in idle:
+            connection.close()
+    
+    def metrics(self) -> PoolMetrics:
+        """
+        Retorna as métricas atuais do pool
+        
+        Returns:
+            Instância de PoolMetrics
+        """
+        with self._condition:
+            return PoolMetrics(
+                max_size=self.max_size,
+                open_connections=self._open,
+                in_use=self._open - len(self._idle),
+                idle=len(self._idle),
+                checkouts=self._checkouts,
+                waits=self._waits,
+                timeouts=self._timeouts,
+                total_wait_time=self._total_wait_time,
+                max_wait_time=self._max_wait_time
+            )
+    
+    def _discard(self, connection: sqlite3.Connection) -> None:
+        """Remove a conexão da contabilidade do pool (chamado com o lock)"""
+        self._open -= 1
+        self._connection_generation.pop(id(connection), None)
+    
+    def _record_wait(self, elapsed: float) -> None:
+        """Acumula um tempo de espera (chamado com o lock)"""
+        self._total_wait_time += elapsed
+        if elapsed > self._max_wait_time:
+            self._max_wait_time = elapsed
@@ -0,0 +1,105 @@
+"""
+Perfis de desempenho aplicados às conexões SQLite
+"""
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+
+# Variável de ambiente que seleciona o perfil padrão
+PROFILE_ENV_VAR = "ESTOQUE_DB_PROFILE"
+
+# Perfil usado quando nenhum é informado
+DEFAULT_PROFILE = "balanced"
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """
+    Conjunto de PRAGMAs aplicados ao abrir uma conexão
+    """
+    name: str
+    journal_mode: str
+    synchronous: str
+    cache_size: int      # Negativo: tamanho em KiB; positivo: número de páginas
+    mmap_size: int       # Bytes mapeados em memória (0 desativa)
+    temp_store: str
+    busy_timeout: int    # Milissegundos
+    
+    def apply(self, connection: Union[sqlite3.Connection, sqlite3.Cursor]) -> None:
+        """
+        Aplica o perfil a uma conexão recém-aberta
+        
+        Args:
+            connection: Conexão SQLite ou cursor dela (um cursor rastreado
+                registra os PRAGMAs no SQLTracer)
+        """
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        connection.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        connection.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+
+PROFILES: Dict[str, SQLiteProfile] = {
+    # Cada commit é sincronizado em disco; sobrevive a queda de energia
+    "durable": SQLiteProfile(
+        name="durable",
+        journal_mode="WAL",
+        synchronous="FULL",
+        cache_size=-8000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+        busy_timeout=5000
+    ),
+    # WAL com fsync apenas nos checkpoints: um commit recente pode ser
+    # perdido em queda de energia, mas o banco nunca fica corrompido
+    "balanced": SQLiteProfile(
+        name="balanced",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-32000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5000
+    ),
+    # Cargas em massa reexecutáveis: sem fsync e com cache grande
+    "bulk_load": SQLiteProfile(
+        name="bulk_load",
+        journal_mode="WAL",
+        synchronous="OFF",
+        cache_size=-256000,
+        mmap_size=1024 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=30000
+    ),
+}
+
+
+def get_profile(profile: Union[str, SQLiteProfile, None] = None) -> SQLiteProfile:
+    """
+    Resolve o perfil a ser usado por uma conexão
+    
+    Args:
+        profile: Nome do perfil, instância de SQLiteProfile ou None para
+            usar a variável de ambiente ESTOQUE_DB_PROFILE (ou o padrão)
+            
+    Returns:
+        Instância de SQLiteProfile
+        
+    Raises:
+        ValueError: Se o nome do perfil for desconhecido
+    """
+    if isinstance(profile, SQLiteProfile):
+        return profile
+    
+    name: Optional[str] = profile or os.environ.get(PROFILE_ENV_VAR) or DEFAULT_PROFILE
+    
+    try:
+        return PROFILES[name.strip().lower()]
+    except KeyError:
+        raise ValueError(
+            f"Perfil de banco desconhecido: '{name}'. Opções: {', '.join(sorted(PROFILES))}"
+        )
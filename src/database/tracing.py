@@ -0,0 +1,340 @@
+"""
+Rastreamento de instruções SQL e log de consultas lentas
+"""
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+
+# Variável de ambiente que ativa o rastreamento com o limite (ms) de consulta lenta
+TRACE_ENV_VAR = "ESTOQUE_DB_SLOW_MS"
+
+# Duração (ms) a partir da qual uma instrução vai para o log de consultas lentas
+DEFAULT_SLOW_THRESHOLD_MS = 100.0
+
+# Consultas lentas mantidas em memória (as mais antigas são descartadas)
+DEFAULT_SLOW_LOG_SIZE = 1000
+
+# Instruções que abrem (implicitamente) uma transação de escrita
+WRITE_VERBS = frozenset({"INSERT", "UPDATE", "DELETE", "REPLACE"})
+
+slow_query_logger = logging.getLogger("estoque.sql.lentas")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """
+    Normaliza uma instrução para agregação
+    
+    Literais de texto e números viram '?', listas IN (?, ?, ...) de
+    qualquer tamanho viram IN (...) e os espaços são compactados: as
+    variações de uma mesma consulta caem na mesma linha da tabela.
+    
+    Args:
+        sql: Texto da instrução
+        
+    Returns:
+        Texto normalizado
+    """
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+@dataclass
+class StatementStats:
+    """
+    Agregado das execuções de uma instrução normalizada
+    """
+    statement: str
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows: int = 0
+    slow_calls: int = 0
+    write_calls: int = 0
+    
+    @property
+    def average_time(self) -> float:
+        """Duração média (segundos) por execução"""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+@dataclass(frozen=True)
+class SlowQuery:
+    """
+    Execução que passou do limite de consulta lenta
+    """
+    statement: str
+    duration: float
+    rows: int
+    in_write_transaction: bool
+    timestamp: float
+
+
+class SQLTracer:
+    """
+    Coleta duração, linhas e contexto de transação das instruções SQL
+    
+    Usado por DatabaseConnection quando o rastreamento está ativo: os
+    cursores de get_cursor passam a ser TracedCursor e cada instrução
+    é agregada pelo texto normalizado. Sem rastreamento, get_cursor
+    usa o cursor padrão e o único custo é um teste de None.
+    
+    A duração inclui o execute e as buscas de linhas (fetch/iteração),
+    mas não o tempo gasto pelo chamador entre uma busca e outra.
+    """
+    
+    def __init__(self, slow_threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS,
+                 slow_log_size: int = DEFAULT_SLOW_LOG_SIZE):
+        """
+        Inicializa o rastreador
+        
+        Args:
+            slow_threshold_ms: Duração (ms) a partir da qual a execução vai
+                para o log de consultas lentas
+            slow_log_size: Consultas lentas mantidas em memória
+        """
+        self.slow_threshold = slow_threshold_ms / 1000
+        self._lock = threading.Lock()
+        self._stats: Dict[str, StatementStats] = {}
+        self._slow: Deque[SlowQuery] = deque(maxlen=slow_log_size)
+    
+    def cursor(self, connection: sqlite3.Connection) -> "TracedCursor":
+        """
+        Cria um cursor rastreado na conexão
+        
+        Args:
+            connection: Conexão SQLite
+            
+        Returns:
+            Instância de TracedCursor
+        """
+        cursor = connection.cursor(TracedCursor)
+        cursor.tracer = self
+        return cursor
+    
+    def record(self, sql: str, duration: float, rows: int, in_write_transaction: bool) -> None:
+        """
+        Registra uma execução
+        
+        Args:
+            sql: Texto da instrução
+            duration: Duração (segundos)
+            rows: Linhas devolvidas (consultas) ou afetadas (escritas)
+            in_write_transaction: A instrução rodou em transação de escrita
+        """
+        statement = normalize_sql(sql)
+        slow = duration >= self.slow_threshold
+        
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = StatementStats(statement)
+            
+            stats.calls += 1
+            stats.total_time += duration
+            stats.rows += rows
+            if duration > stats.max_time:
+                stats.max_time = duration
+            if in_write_transaction:
+                stats.write_calls += 1
+            if slow:
+                stats.slow_calls += 1
+                self._slow.append(SlowQuery(statement, duration, rows, in_write_transaction, time.time()))
+        
+        if slow:
+            slow_query_logger.warning(
+                "%.1f ms, %d linha(s)%s: %s", duration * 1000, rows,
+                " [escrita]" if in_write_transaction else "", statement
+            )
+    
+    def statistics(self) -> List[StatementStats]:
+        """
+        Retorna os agregados por instrução, do maior tempo total ao menor
+        
+        Returns:
+            Lista de StatementStats (cópias)
+        """
+        with self._lock:
+            stats = [StatementStats(**vars(item)) for item in self._stats.values()]
+        
+        return sorted(stats, key=lambda item: item.total_time, reverse=True)
+    
+    def slow_queries(self) -> List[SlowQuery]:
+        """
+        Retorna as consultas lentas mais recentes, da mais antiga à mais nova
+        
+        Returns:
+            Lista de SlowQuery
+        """
+        with self._lock:
+            return list(self._slow)
+    
+    def reset(self) -> None:
+        """Descarta os agregados e o log de consultas lentas"""
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+    
+    def format_table(self, limit: Optional[int] = 20, width: int = 80) -> str:
+        """
+        Formata os agregados como tabela de texto
+        
+        Args:
+            limit: Quantidade máxima de instruções (None para todas)
+            width: Largura máxima da coluna da instrução
+            
+        Returns:
+            Tabela ordenada pelo tempo total
+        """
+        stats = self.statistics()[:limit]
+        lines = [
+            f"{'total ms':>10} {'exec':>8} {'média ms':>9} {'máx ms':>9} {'linhas':>9} {'lentas':>6} "
+            f"{'escrita':>7}  instrução"
+        ]
+        for item in stats:
+            statement = item.statement if len(item.statement) <= width else item.statement[:width - 3] + "..."
+            lines.append(
+                f"{item.total_time * 1000:>10.1f} {item.calls:>8} {item.average_time * 1000:>9.3f} "
+                f"{item.max_time * 1000:>9.3f} {item.rows:>9} {item.slow_calls:>6} {item.write_calls:>7}  {statement}"
+            )
+        return "\n".join(lines)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor que mede as instruções e entrega cada execução ao SQLTracer
+    
+    Uma consulta é registrada quando suas linhas se esgotam, quando o
+    cursor executa outra instrução ou quando é fechado; escritas e
+    executemany são registrados logo após a execução.
+    """
+    
+    tracer: SQLTracer
+    _pending: Optional[list] = None
+    
+    def execute(self, sql, parameters=()):
+        self._finish()
+        in_write = _track_write_transaction(self.connection, sql)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, time.perf_counter() - start, 0, in_write]
+        
+        if self.description is None:
+            self._finish(max(self.rowcount, 0))
+        return self
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        in_write = _track_write_transaction(self.connection, sql)
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, time.perf_counter() - start, 0, in_write]
+        
+        self._finish(max(self.rowcount, 0))
+        return self
+    
+    def executescript(self, sql_script):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self.tracer.record(sql_script, time.perf_counter() - start, 0, False)
+        return self
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+    
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def _fetched(self, start: float, rows: int, exhausted: bool) -> None:
+        """Soma uma busca de linhas à execução pendente"""
+        pending = self._pending
+        if pending is None:
+            return
+        
+        pending[1] += time.perf_counter() - start
+        pending[2] += rows
+        if exhausted:
+            self._finish()
+    
+    def _finish(self, rows: int = 0) -> None:
+        """Registra a execução pendente, se houver"""
+        pending = self._pending
+        if pending is None:
+            return
+        
+        self._pending = None
+        sql, duration, fetched, in_write = pending
+        self.tracer.record(sql, duration, fetched + rows, in_write)
+
+
+def _track_write_transaction(connection: sqlite3.Connection, sql: str) -> bool:
+    """
+    Atualiza e retorna o estado de transação de escrita da conexão
+    
+    A transação é de escrita a partir de um BEGIN IMMEDIATE/EXCLUSIVE ou
+    da primeira escrita, até o commit ou rollback.
+    
+    Args:
+        connection: Conexão que vai executar a instrução
+        sql: Texto da instrução
+        
+    Returns:
+        True se a instrução roda em transação de escrita
+    """
+    if not connection.in_transaction:
+        connection.in_write_transaction = False
+    
+    words = sql.split(None, 2)
+    verb = words[0].upper() if words else ""
+    if verb in WRITE_VERBS or (verb == "BEGIN" and len(words) > 1 and words[1].upper() in ("IMMEDIATE", "EXCLUSIVE")):
+        connection.in_write_transaction = True
+    
+    return getattr(connection, "in_write_transaction", False)
@@ -33,7 +33,7 @@ class ProdutoNaoEncontradoException(EstoqueException):
         super().__init__(mensagem)
 
 
-class MovimentacaoInvalidaException(EstoqueException):
+class MovimentacaoInvalidaException(EstoqueException, ValueError):
     """Exceção lançada para movimentações inválidas"""
     
     def __init__(self, motivo: str):
@@ -0,0 +1,117 @@
+"""
+Conversão de timestamps entre o banco e os modelos
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+# Formatos de armazenamento dos timestamps (gravados na tabela metadados)
+FORMATO_TEXTO = "texto"
+FORMATO_EPOCH = "epoch_us"
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+ValorTimestamp = Union[datetime, int, str, None]
+
+
+def para_datetime(valor: ValorTimestamp) -> Optional[datetime]:
+    """
+    Converte um timestamp lido do banco em datetime local (sem fuso)
+    
+    Args:
+        valor: Microssegundos desde a época (int), texto ISO ou datetime
+        
+    Returns:
+        datetime correspondente ou None
+    """
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, int):
+        # O erro do float na divisão fica abaixo de meio microssegundo
+        # até o ano 2200, e fromtimestamp arredonda para o microssegundo
+        return datetime.fromtimestamp(valor / 1_000_000)
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def para_epoch_us(valor: datetime) -> int:
+    """
+    Converte um datetime em microssegundos desde a época
+    
+    Args:
+        valor: datetime; sem fuso, é interpretado como horário local
+        
+    Returns:
+        Microssegundos desde 1970-01-01 UTC
+    """
+    if valor.tzinfo is None:
+        valor = valor.astimezone()
+    return (valor - _EPOCA) // _MICROSSEGUNDO
+
+
+def para_banco(valor: Optional[datetime], formato: str) -> Union[datetime, int, None]:
+    """
+    Prepara um datetime para gravação no formato do banco
+    
+    Args:
+        valor: datetime a gravar
+        formato: FORMATO_TEXTO ou FORMATO_EPOCH
+        
+    Returns:
+        Inteiro em FORMATO_EPOCH; o próprio datetime em FORMATO_TEXTO
+    """
+    if valor is None or formato != FORMATO_EPOCH:
+        return valor
+    return para_epoch_us(valor)
+
+
+class DataPreguicosa:
+    """
+    Descriptor de campo de data convertido apenas no primeiro acesso
+    
+    Envolve o slot do próprio campo do dataclass: o valor bruto (int,
+    texto ou datetime) fica no slot, e a leitura o converte com
+    para_datetime e guarda o resultado. Listagens que não usam a data não
+    pagam pela conversão, e o campo continua público (fields, asdict,
+    comparação e cópia o veem como datetime).
+    """
+    
+    def __init__(self, slot):
+        self.slot = slot
+    
+    def __get__(self, obj, owner=None) -> Optional[datetime]:
+        if obj is None:
+            return self
+        
+        valor = self.slot.__get__(obj, owner)
+        if valor is not None and not isinstance(valor, datetime):
+            valor = para_datetime(valor)
+            self.slot.__set__(obj, valor)
+        return valor
+    
+    def __set__(self, obj, valor: ValorTimestamp) -> None:
+        self.slot.__set__(obj, valor)
+    
+    def bruto(self, obj) -> ValorTimestamp:
+        """Valor guardado no slot, sem conversão"""
+        return self.slot.__get__(obj, type(obj))
+
+
+def datas_preguicosas(*campos: str):
+    """
+    Decorador que torna campos de data de um dataclass com slots preguiçosos
+    
+    Deve ser aplicado sobre @dataclass(slots=True): substitui o descriptor
+    de cada slot por um DataPreguicosa que o envolve.
+    
+    Args:
+        campos: Nomes dos campos de data
+        
+    Returns:
+        Decorador de classe
+    """
+    def decorar(cls):
+        for campo in campos:
+            setattr(cls, campo, DataPreguicosa(cls.__dict__[campo]))
+        return cls
+    
+    return decorar
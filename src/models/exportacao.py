@@ -0,0 +1,25 @@
+"""
+Modelo de resultado para exportações em fluxo
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class ResultadoExportacao:
+    """
+    Relatório de uma exportação
+    """
+    linhas: int = 0
+    segundos: float = 0.0
+    
+    @property
+    def linhas_por_segundo(self) -> float:
+        """Vazão da exportação"""
+        return self.linhas / self.segundos if self.segundos else 0.0
+    
+    def __str__(self) -> str:
+        return (f"ResultadoExportacao(linhas={self.linhas}, segundos={self.segundos:.2f}, "
+                f"linhas_por_segundo={self.linhas_por_segundo:.0f})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
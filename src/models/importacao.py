@@ -0,0 +1,52 @@
+"""
+Modelos de resultado para importação de produtos em CSV
+"""
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class LinhaRejeitada:
+    """
+    Linha do arquivo que não foi importada
+    """
+    linha: int
+    motivo: str
+    
+    def __str__(self) -> str:
+        return f"LinhaRejeitada(linha={self.linha}, motivo='{self.motivo}')"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@dataclass
+class ResultadoImportacao:
+    """
+    Relatório de uma importação de produtos
+    
+    Os contadores cobrem o arquivo inteiro; a lista de rejeições guarda
+    apenas as primeiras linhas rejeitadas (até o limite do importador),
+    para que a memória não cresça com o tamanho do arquivo.
+    """
+    linhas_lidas: int = 0
+    inseridos: int = 0
+    atualizados: int = 0
+    inalterados: int = 0
+    ajustes: int = 0
+    total_rejeitadas: int = 0
+    rejeicoes: List[LinhaRejeitada] = field(default_factory=list)
+    segundos: float = 0.0
+    
+    @property
+    def linhas_por_segundo(self) -> float:
+        """Vazão da importação"""
+        return self.linhas_lidas / self.segundos if self.segundos else 0.0
+    
+    def __str__(self) -> str:
+        return (f"ResultadoImportacao(lidas={self.linhas_lidas}, inseridos={self.inseridos}, "
+                f"atualizados={self.atualizados}, inalterados={self.inalterados}, "
+                f"ajustes={self.ajustes}, rejeitadas={self.total_rejeitadas})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
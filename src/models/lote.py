@@ -0,0 +1,65 @@
+"""
+Modelos de resultado para processamento de movimentações em lote
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .movimentacao import Movimentacao
+from ..exceptions.estoque_exceptions import EstoqueException
+
+
+@dataclass
+class ResultadoLinha:
+    """
+    Resultado do processamento de uma linha do lote
+    """
+    indice: int
+    movimentacao: Optional[Movimentacao] = None
+    erro: Optional[EstoqueException] = None
+    
+    @property
+    def sucesso(self) -> bool:
+        """Indica se a linha foi aplicada ao estoque"""
+        return self.erro is None
+    
+    def __str__(self) -> str:
+        if self.sucesso:
+            return f"ResultadoLinha(indice={self.indice}, movimentacao_id={self.movimentacao.id})"
+        return f"ResultadoLinha(indice={self.indice}, erro='{self.erro}')"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@dataclass
+class ResultadoLote:
+    """
+    Relatório do processamento de um lote de movimentações, linha a linha
+    """
+    linhas: List[ResultadoLinha] = field(default_factory=list)
+    
+    @property
+    def movimentacoes(self) -> List[Movimentacao]:
+        """Movimentações registradas com sucesso, na ordem do lote"""
+        return [linha.movimentacao for linha in self.linhas if linha.sucesso]
+    
+    @property
+    def falhas(self) -> List[ResultadoLinha]:
+        """Linhas rejeitadas, com a exceção correspondente"""
+        return [linha for linha in self.linhas if not linha.sucesso]
+    
+    @property
+    def total_sucesso(self) -> int:
+        """Quantidade de linhas aplicadas"""
+        return sum(1 for linha in self.linhas if linha.sucesso)
+    
+    @property
+    def total_falhas(self) -> int:
+        """Quantidade de linhas rejeitadas"""
+        return len(self.linhas) - self.total_sucesso
+    
+    def __str__(self) -> str:
+        return f"ResultadoLote(sucesso={self.total_sucesso}, falhas={self.total_falhas})"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
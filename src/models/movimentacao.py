@@ -1,11 +1,13 @@
 """
 Modelo de dados para Movimentação de Estoque
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Optional
 
+from .datas import datas_preguicosas
+
 
 class TipoMovimentacao(Enum):
     """Tipos de movimentação de estoque"""
@@ -13,10 +15,21 @@ class TipoMovimentacao(Enum):
     SAIDA = "saida"
 
 
-@dataclass
+# Conversão direta do valor gravado no banco, sem passar por TipoMovimentacao(valor)
+_TIPOS_POR_VALOR = {tipo.value: tipo for tipo in TipoMovimentacao}
+
+
+@datas_preguicosas("created_at")
+@dataclass(slots=True)
 class Movimentacao:
     """
     Classe que representa uma movimentação de estoque
+    
+    Usa __slots__ para reduzir a memória de listagens grandes. Objetos
+    vindos do banco devem ser criados com from_row; a data fica no
+    formato gravado e só vira datetime quando acessada. produto_nome e
+    produto_preco só são preenchidos por listagens feitas com
+    incluir_produto=True (junção com produtos).
     """
     produto_id: int
     tipo: TipoMovimentacao
@@ -24,6 +37,8 @@ class Movimentacao:
     observacao: Optional[str] = None
     id: Optional[int] = None
     created_at: Optional[datetime] = None
+    produto_nome: Optional[str] = field(default=None, compare=False)
+    produto_preco: Optional[float] = field(default=None, compare=False)
     
     def __post_init__(self):
         """Inicializa campos de data e validações"""
@@ -43,6 +58,37 @@ class Movimentacao:
             else:
                 raise ValueError(f"Tipo de movimentação deve ser TipoMovimentacao ou string válida")
     
+    @classmethod
+    def from_row(cls, row, com_produto: bool = False) -> "Movimentacao":
+        """
+        Cria uma Movimentacao a partir de uma linha do banco
+        
+        Não executa __post_init__: a quantidade e o tipo já foram validados
+        na gravação (e pelas restrições CHECK da tabela).
+        
+        Args:
+            row: Linha da tabela movimentacoes (sqlite3.Row ou mapeamento)
+            com_produto: A linha traz também as colunas produto_nome e
+                produto_preco, da junção com produtos
+            
+        Returns:
+            Instância de Movimentacao
+        """
+        movimentacao = cls.__new__(cls)
+        movimentacao.id = row['id']
+        movimentacao.produto_id = row['produto_id']
+        movimentacao.tipo = _TIPOS_POR_VALOR[row['tipo']]
+        movimentacao.quantidade = row['quantidade']
+        movimentacao.observacao = row['observacao']
+        movimentacao.created_at = row['created_at']
+        if com_produto:
+            movimentacao.produto_nome = row['produto_nome']
+            movimentacao.produto_preco = row['produto_preco']
+        else:
+            movimentacao.produto_nome = None
+            movimentacao.produto_preco = None
+        return movimentacao
+    
     def is_entrada(self) -> bool:
         """Verifica se é uma movimentação de entrada"""
         return self.tipo == TipoMovimentacao.ENTRADA
@@ -0,0 +1,78 @@
+"""
+Modelo de página para listagens paginadas por cursor (keyset)
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Generic, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class Pagina(Generic[T]):
+    """
+    Classe que representa uma página de resultados
+    
+    O campo proximo contém o cursor opaco a ser passado em 'apos' para
+    obter a página seguinte, ou None quando não há mais resultados.
+    """
+    itens: List[T] = field(default_factory=list)
+    proximo: Optional[str] = None
+    
+    @property
+    def tem_proxima(self) -> bool:
+        """Indica se existe uma página seguinte"""
+        return self.proximo is not None
+    
+    def __len__(self) -> int:
+        return len(self.itens)
+    
+    def __iter__(self):
+        return iter(self.itens)
+    
+    def __str__(self) -> str:
+        return f"Pagina(itens={len(self.itens)}, tem_proxima={self.tem_proxima})"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def codificar_cursor(*valores) -> str:
+    """
+    Codifica a chave de ordenação do último item em um cursor opaco
+    
+    Args:
+        valores: Valores das colunas de ordenação
+        
+    Returns:
+        Cursor em base64 seguro para URLs
+    """
+    dados = json.dumps(list(valores), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(dados).decode("ascii")
+
+
+def decodificar_cursor(cursor: str, quantidade: int) -> list:
+    """
+    Decodifica um cursor gerado por codificar_cursor
+    
+    Args:
+        cursor: Cursor opaco
+        quantidade: Número de valores esperados
+        
+    Returns:
+        Lista com os valores das colunas de ordenação
+        
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError, AttributeError):
+        raise ValueError(f"Cursor de paginação inválido: {cursor!r}")
+    
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise ValueError(f"Cursor de paginação inválido: {cursor!r}")
+    
+    return valores
@@ -0,0 +1,56 @@
+"""
+Modelo de partição mensal do histórico de movimentações
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from .datas import para_datetime
+
+
+@dataclass(frozen=True, slots=True)
+class ParticaoMovimentacoes:
+    """
+    Classe que representa um mês de movimentações arquivado em arquivo próprio
+    
+    Vem do catálogo particoes_movimentacoes; o arquivo é relativo ao
+    diretório do banco principal e guarda as movimentações com
+    inicio <= created_at < fim.
+    """
+    mes: str
+    arquivo: str
+    inicio: datetime
+    fim: datetime
+    primeiro_id: int
+    ultimo_id: int
+    menor_produto_id: int
+    maior_produto_id: int
+    linhas: int
+    
+    @classmethod
+    def from_row(cls, row) -> "ParticaoMovimentacoes":
+        """
+        Cria a partição a partir de uma linha do catálogo
+        
+        Args:
+            row: Linha de particoes_movimentacoes
+            
+        Returns:
+            Instância de ParticaoMovimentacoes
+        """
+        return cls(
+            mes=row['mes'],
+            arquivo=row['arquivo'],
+            inicio=para_datetime(row['inicio']),
+            fim=para_datetime(row['fim']),
+            primeiro_id=row['primeiro_id'],
+            ultimo_id=row['ultimo_id'],
+            menor_produto_id=row['menor_produto_id'],
+            maior_produto_id=row['maior_produto_id'],
+            linhas=row['linhas'],
+        )
+    
+    def __str__(self) -> str:
+        return f"ParticaoMovimentacoes(mes='{self.mes}', arquivo='{self.arquivo}', linhas={self.linhas})"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -5,11 +5,18 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+from .datas import datas_preguicosas
 
-@dataclass
+
+@datas_preguicosas("created_at", "updated_at")
+@dataclass(slots=True)
 class Produto:
     """
     Classe que representa um produto no sistema de estoque
+    
+    Usa __slots__ para reduzir a memória de listagens grandes. Objetos
+    vindos do banco devem ser criados com from_row; as datas ficam no
+    formato gravado e só viram datetime quando acessadas.
     """
     nome: str
     descricao: Optional[str] = None
@@ -18,13 +25,43 @@ class Produto:
     id: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    # Depois dos campos originais para não mudar a construção posicional
+    estoque_minimo: int = 0
     
     def __post_init__(self):
         """Inicializa campos de data se não fornecidos"""
-        if self.created_at is None:
-            self.created_at = datetime.now()
-        if self.updated_at is None:
-            self.updated_at = datetime.now()
+        if self.created_at is None or self.updated_at is None:
+            agora = datetime.now()
+            if self.created_at is None:
+                self.created_at = agora
+            if self.updated_at is None:
+                self.updated_at = agora
+    
+    @classmethod
+    def from_row(cls, row) -> "Produto":
+        """
+        Cria um Produto a partir de uma linha do banco
+        
+        Não executa __post_init__: os valores já foram validados na gravação
+        e as datas vêm do próprio banco (inteiro em epoch ou texto ISO),
+        convertidas apenas no primeiro acesso.
+        
+        Args:
+            row: Linha da tabela produtos (sqlite3.Row ou mapeamento)
+            
+        Returns:
+            Instância de Produto
+        """
+        produto = cls.__new__(cls)
+        produto.id = row['id']
+        produto.nome = row['nome']
+        produto.descricao = row['descricao']
+        produto.preco_unitario = row['preco_unitario']
+        produto.estoque_atual = row['estoque_atual']
+        produto.estoque_minimo = row['estoque_minimo']
+        produto.created_at = row['created_at']
+        produto.updated_at = row['updated_at']
+        return produto
     
     def atualizar_estoque(self, nova_quantidade: int) -> None:
         """
@@ -54,6 +91,15 @@ class Produto:
         """
         return self.estoque_atual >= quantidade
     
+    def precisa_reposicao(self) -> bool:
+        """
+        Verifica se o estoque chegou ao ponto de reposição do produto
+        
+        Returns:
+            True se o estoque atual não passa do estoque mínimo
+        """
+        return self.estoque_atual <= self.estoque_minimo
+    
     def __str__(self) -> str:
         return f"Produto(id={self.id}, nome='{self.nome}', estoque={self.estoque_atual})"
     
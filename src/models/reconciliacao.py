@@ -0,0 +1,50 @@
+"""
+Modelos do relatório de reconciliação do estoque com as movimentações
+"""
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass(slots=True)
+class DivergenciaEstoque:
+    """
+    Produto cujo estoque_atual não confere com o saldo das movimentações
+    """
+    produto_id: int
+    nome: str
+    estoque_atual: int
+    saldo: int
+    
+    @property
+    def diferenca(self) -> int:
+        """Ajuste necessário para o estoque conferir com o saldo"""
+        return self.saldo - self.estoque_atual
+    
+    def __str__(self) -> str:
+        return (f"DivergenciaEstoque(produto_id={self.produto_id}, nome='{self.nome}', "
+                f"estoque_atual={self.estoque_atual}, saldo={self.saldo})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@dataclass
+class RelatorioReconciliacao:
+    """
+    Resultado da conferência do estoque de todos os produtos
+    """
+    produtos_verificados: int = 0
+    divergencias: List[DivergenciaEstoque] = field(default_factory=list)
+    corrigido: bool = False
+    
+    @property
+    def total_divergencias(self) -> int:
+        """Quantidade de produtos com estoque divergente"""
+        return len(self.divergencias)
+    
+    def __str__(self) -> str:
+        return (f"RelatorioReconciliacao(verificados={self.produtos_verificados}, "
+                f"divergencias={self.total_divergencias}, corrigido={self.corrigido})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,33 @@
+"""
+Modelo de resumo de movimentações por produto (e por dia)
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+
+@dataclass(slots=True)
+class ResumoMovimentacoes:
+    """
+    Classe que representa as quantidades movimentadas de um produto
+    
+    Vem da tabela movimentacoes_diarias: um dia de um produto ou, com
+    dia None, a soma de um período.
+    """
+    produto_id: int
+    entradas: int = 0
+    saidas: int = 0
+    dia: Optional[date] = None
+    
+    @property
+    def liquido(self) -> int:
+        """Variação do estoque (entradas - saídas)"""
+        return self.entradas - self.saidas
+    
+    def __str__(self) -> str:
+        dia = f", dia={self.dia.isoformat()}" if self.dia is not None else ""
+        return (f"ResumoMovimentacoes(produto_id={self.produto_id}{dia}, "
+                f"entradas={self.entradas}, saidas={self.saidas})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,47 @@
+"""
+Modelos do relatório de valorização do estoque
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ValorProduto:
+    """
+    Valor em estoque de um produto (estoque_atual * preco_unitario)
+    """
+    produto_id: int
+    nome: str
+    estoque_atual: int
+    preco_unitario: float
+    valor: float
+    
+    def __str__(self) -> str:
+        return f"ValorProduto(produto_id={self.produto_id}, nome='{self.nome}', valor={self.valor:.2f})"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@dataclass(frozen=True)
+class RelatorioValorizacao:
+    """
+    Valorização do estoque: totais, maiores valores e, opcionalmente, o
+    valor de cada produto
+    
+    O relatório é imutável porque a mesma instância é devolvida pelo cache
+    enquanto a geração do estoque não mudar.
+    """
+    geracao: int
+    total_produtos: int
+    total_unidades: int
+    valor_total: float
+    maiores: Tuple[ValorProduto, ...] = ()
+    por_produto: Tuple[ValorProduto, ...] = ()
+    
+    def __str__(self) -> str:
+        return (f"RelatorioValorizacao(produtos={self.total_produtos}, unidades={self.total_unidades}, "
+                f"valor_total={self.valor_total:.2f})")
+    
+    def __repr__(self) -> str:
+        return self.__str__()
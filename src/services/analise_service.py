@@ -0,0 +1,373 @@
+"""
+Análises vetorizadas do histórico de movimentações (requer NumPy)
+
+As colunas necessárias são lidas direto do banco para arrays NumPy, em
+blocos, sem criar objetos Movimentacao; as agregações usam np.bincount.
+O NumPy é opcional: sem ele, apenas este módulo fica indisponível.
+"""
+import itertools
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+from ..models.datas import para_banco, para_epoch_us, para_datetime
+from ..database.connection import get_database_connection
+from ..database.partitions import bounds_filter, movement_tables, read_partitioned
+
+
+# Linhas lidas por fetchmany e convertidas em arrays de uma vez
+TAMANHO_BLOCO_ANALISE = 100_000
+
+# Larguras dos períodos de fluxo_por_periodo, em microssegundos
+INTERVALOS = {
+    "hora": 3_600 * 1_000_000,
+    "dia": 86_400 * 1_000_000,
+    "semana": 7 * 86_400 * 1_000_000,
+}
+
+# Colunas disponíveis em carregar_colunas. A quantidade vem com sinal
+# (negativa nas saídas) e o instante em microssegundos desde a época,
+# qualquer que seja o formato de timestamp do banco. Textos sem fração de
+# segundo vêm de CURRENT_TIMESTAMP (UTC); os demais estão em horário local.
+COLUNAS = {
+    "produto_id": "produto_id",
+    "quantidade": "CASE WHEN tipo = 'entrada' THEN quantidade ELSE -quantidade END",
+    "created_at": """CASE typeof(created_at) WHEN 'integer' THEN created_at ELSE
+        CAST(ROUND((julianday(created_at, CASE WHEN length(created_at) = 19 THEN '+0 days' ELSE 'utc' END)
+            - 2440587.5) * 86400000000) AS INTEGER) END""",
+}
+
+
+@dataclass
+class TotaisPorProduto:
+    """
+    Totais de movimentação por produto (arrays alinhados por posição)
+    
+    Apenas produtos com movimentações no período aparecem.
+    """
+    produto_ids: "np.ndarray"
+    entradas: "np.ndarray"
+    saidas: "np.ndarray"
+    movimentacoes: "np.ndarray"
+    
+    @property
+    def liquido(self) -> "np.ndarray":
+        """Fluxo líquido (entradas - saídas) de cada produto"""
+        return self.entradas - self.saidas
+    
+    def __len__(self) -> int:
+        return len(self.produto_ids)
+
+
+@dataclass
+class FluxoPorPeriodo:
+    """
+    Fluxo de movimentações por período (arrays alinhados por posição)
+    
+    inicios contém o início de cada período em microssegundos desde a
+    época; só aparecem períodos com movimentações.
+    """
+    inicios: "np.ndarray"
+    entradas: "np.ndarray"
+    saidas: "np.ndarray"
+    movimentacoes: "np.ndarray"
+    
+    @property
+    def liquido(self) -> "np.ndarray":
+        """Fluxo líquido (entradas - saídas) de cada período"""
+        return self.entradas - self.saidas
+    
+    def datas(self) -> list:
+        """Início de cada período como datetime local"""
+        return [para_datetime(int(inicio)) for inicio in self.inicios]
+    
+    def __len__(self) -> int:
+        return len(self.inicios)
+
+
+@dataclass
+class GiroPorProduto:
+    """
+    Giro de estoque de cada produto no período (arrays alinhados por posição)
+    
+    giro = saídas no período / estoque médio, com o estoque médio estimado
+    pela média do estoque no início e no fim do período. Produtos sem
+    estoque médio têm giro 0.
+    """
+    produto_ids: "np.ndarray"
+    saidas: "np.ndarray"
+    estoque_medio: "np.ndarray"
+    giro: "np.ndarray"
+    
+    def __len__(self) -> int:
+        return len(self.produto_ids)
+
+
+class _Acumulador:
+    """
+    Somas por chave inteira em arrays densos, ampliados conforme as chaves
+    aparecem (produto_id ou número do período)
+    """
+    
+    def __init__(self, nomes: Sequence[str]):
+        self.base = 0
+        self.somas = {nome: np.zeros(0, dtype=np.int64) for nome in nomes}
+    
+    def somar(self, chaves: "np.ndarray", pesos: Dict[str, Optional["np.ndarray"]]) -> None:
+        """
+        Soma os pesos de cada chave (peso None conta as ocorrências)
+        
+        Args:
+            chaves: Chaves inteiras do bloco
+            pesos: Array de pesos de cada soma, alinhado com as chaves
+        """
+        if len(chaves) == 0:
+            return
+        
+        menor, maior = int(chaves.min()), int(chaves.max())
+        tamanho = len(next(iter(self.somas.values())))
+        if tamanho == 0:
+            self.base = menor
+        
+        inicio = min(self.base, menor)
+        fim = max(self.base + tamanho, maior + 1)
+        if inicio != self.base or fim != self.base + tamanho:
+            for nome, soma in self.somas.items():
+                ampliada = np.zeros(fim - inicio, dtype=np.int64)
+                ampliada[self.base - inicio:self.base - inicio + tamanho] = soma
+                self.somas[nome] = ampliada
+            self.base = inicio
+        
+        indices = chaves - self.base
+        for nome, peso in pesos.items():
+            parcial = np.bincount(indices, weights=peso, minlength=fim - inicio)
+            self.somas[nome] += parcial.astype(np.int64) if peso is not None else parcial
+    
+    def chaves_presentes(self, nome: str) -> "np.ndarray":
+        """Posições em que a soma indicada é diferente de zero"""
+        return np.flatnonzero(self.somas[nome])
+
+
+class AnaliseService:
+    """Serviço de análises agregadas sobre todo o histórico de movimentações"""
+    
+    def __init__(self, db_connection=None, tamanho_bloco: int = TAMANHO_BLOCO_ANALISE):
+        """
+        Inicializa o serviço
+        
+        Args:
+            db_connection: Conexão com banco (usado para testes)
+            tamanho_bloco: Linhas convertidas em arrays por vez; limita a
+                memória usada, independentemente do tamanho do histórico
+                
+        Raises:
+            ImportError: Se o NumPy não estiver instalado
+        """
+        if np is None:
+            raise ImportError("AnaliseService requer NumPy: pip install numpy")
+        
+        self.db = db_connection or get_database_connection()
+        self.tamanho_bloco = tamanho_bloco
+    
+    def carregar_colunas(self, colunas: Sequence[str] = ("produto_id", "quantidade", "created_at"),
+                         produto_id: Optional[int] = None, inicio: Optional[datetime] = None,
+                         fim: Optional[datetime] = None) -> Iterator[Dict[str, "np.ndarray"]]:
+        """
+        Lê colunas de movimentações em blocos de arrays int64
+        
+        Inclui as movimentações arquivadas nas partições do catálogo que
+        podem ter linhas do filtro. Todos os blocos vêm da mesma leitura
+        (uma única transação), então formam um retrato consistente do
+        histórico; com mais de MAX_ATTACHED_PARTITIONS partições no
+        período, cada grupo de meses é uma leitura à parte.
+        
+        Args:
+            colunas: Nomes das colunas (ver COLUNAS)
+            produto_id: ID do produto (opcional)
+            inicio: Considera movimentações a partir deste instante (opcional)
+            fim: Considera movimentações anteriores a este instante (opcional)
+            
+        Yields:
+            Dicionário nome da coluna -> array do bloco
+            
+        Raises:
+            ValueError: Se alguma coluna for desconhecida
+        """
+        desconhecidas = [coluna for coluna in colunas if coluna not in COLUNAS]
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas: {desconhecidas}")
+        
+        expressoes = ', '.join(COLUNAS[coluna] for coluna in colunas)
+        filtros = ""
+        params = []
+        formato = self.db.timestamp_format
+        inicio = para_banco(inicio, formato)
+        fim = para_banco(fim, formato)
+        
+        if produto_id is not None:
+            filtros += " AND produto_id = ?"
+            params.append(produto_id)
+        
+        if inicio is not None:
+            filtros += " AND created_at >= ?"
+            params.append(inicio)
+        
+        if fim is not None:
+            filtros += " AND created_at < ?"
+            params.append(fim)
+        
+        def consulta(particoes: List[str], faixa: Tuple):
+            filtro_faixa, params_faixa = bounds_filter(faixa)
+            filtros_grupo, params_grupo = filtros + filtro_faixa, params + params_faixa
+            
+            # Sem ORDER BY: as agregações não dependem da ordem das linhas
+            ramos = [
+                f"SELECT {expressoes} FROM {tabela} WHERE 1=1{filtros_grupo}" for tabela in movement_tables(particoes)
+            ]
+            return " UNION ALL ".join(ramos), params_grupo * len(ramos)
+        
+        quantidade = len(colunas)
+        with self.db.get_cursor() as cursor:
+            # Tuplas simples: sqlite3.Row custaria um objeto a mais por linha
+            cursor.row_factory = None
+            
+            for rows in read_partitioned(cursor, self.db.db_path, consulta, produto_id, inicio, fim,
+                                         block_size=self.tamanho_bloco):
+                valores = np.fromiter(
+                    itertools.chain.from_iterable(rows), dtype=np.int64, count=quantidade * len(rows)
+                ).reshape(len(rows), quantidade)
+                yield {coluna: valores[:, posicao] for posicao, coluna in enumerate(colunas)}
+    
+    def totais_por_produto(self, inicio: Optional[datetime] = None,
+                           fim: Optional[datetime] = None) -> TotaisPorProduto:
+        """
+        Soma entradas, saídas e quantidade de movimentações de cada produto
+        
+        Args:
+            inicio: Início do período (opcional)
+            fim: Fim do período, exclusivo (opcional)
+            
+        Returns:
+            Totais dos produtos com movimentações no período
+        """
+        acumulador = _Acumulador(("entradas", "saidas", "movimentacoes"))
+        
+        for bloco in self.carregar_colunas(("produto_id", "quantidade"), inicio=inicio, fim=fim):
+            quantidades = bloco["quantidade"]
+            acumulador.somar(bloco["produto_id"], {
+                "entradas": np.where(quantidades > 0, quantidades, 0),
+                "saidas": np.where(quantidades < 0, -quantidades, 0),
+                "movimentacoes": None,
+            })
+        
+        presentes = acumulador.chaves_presentes("movimentacoes")
+        return TotaisPorProduto(
+            produto_ids=presentes + acumulador.base,
+            entradas=acumulador.somas["entradas"][presentes],
+            saidas=acumulador.somas["saidas"][presentes],
+            movimentacoes=acumulador.somas["movimentacoes"][presentes],
+        )
+    
+    def fluxo_por_periodo(self, intervalo: Union[str, int] = "dia", produto_id: Optional[int] = None,
+                          inicio: Optional[datetime] = None, fim: Optional[datetime] = None) -> FluxoPorPeriodo:
+        """
+        Soma entradas e saídas por período de tempo
+        
+        Os períodos são alinhados à meia-noite local (pelo fuso atual da
+        máquina) e ocupam arrays densos entre o primeiro e o último período
+        com movimentações.
+        
+        Args:
+            intervalo: 'hora', 'dia', 'semana' ou largura em segundos
+            produto_id: ID do produto (opcional)
+            inicio: Início do período analisado (opcional)
+            fim: Fim do período analisado, exclusivo (opcional)
+            
+        Returns:
+            Fluxo dos períodos com movimentações, em ordem cronológica
+            
+        Raises:
+            ValueError: Se o intervalo for inválido
+        """
+        if isinstance(intervalo, str):
+            if intervalo not in INTERVALOS:
+                raise ValueError(f"Intervalo desconhecido: {intervalo}")
+            largura = INTERVALOS[intervalo]
+        elif intervalo > 0:
+            largura = int(intervalo) * 1_000_000
+        else:
+            raise ValueError("Intervalo deve ser maior que zero")
+        
+        deslocamento = int(datetime.now().astimezone().utcoffset().total_seconds()) * 1_000_000
+        acumulador = _Acumulador(("entradas", "saidas", "movimentacoes"))
+        
+        for bloco in self.carregar_colunas(("quantidade", "created_at"), produto_id, inicio, fim):
+            quantidades = bloco["quantidade"]
+            acumulador.somar((bloco["created_at"] + deslocamento) // largura, {
+                "entradas": np.where(quantidades > 0, quantidades, 0),
+                "saidas": np.where(quantidades < 0, -quantidades, 0),
+                "movimentacoes": None,
+            })
+        
+        presentes = acumulador.chaves_presentes("movimentacoes")
+        return FluxoPorPeriodo(
+            inicios=(presentes + acumulador.base) * largura - deslocamento,
+            entradas=acumulador.somas["entradas"][presentes],
+            saidas=acumulador.somas["saidas"][presentes],
+            movimentacoes=acumulador.somas["movimentacoes"][presentes],
+        )
+    
+    def giro_por_produto(self, inicio: datetime, fim: Optional[datetime] = None) -> GiroPorProduto:
+        """
+        Calcula o giro de estoque de cada produto no período
+        
+        O estoque no início e no fim do período é reconstruído a partir do
+        estoque atual, descontando o fluxo líquido posterior a cada instante.
+        
+        Args:
+            inicio: Início do período
+            fim: Fim do período, exclusivo (agora se None)
+            
+        Returns:
+            Giro de todos os produtos cadastrados
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute("SELECT id, estoque_atual FROM produtos ORDER BY id")
+            rows = cursor.fetchall()
+        
+        produtos = np.array(rows, dtype=np.int64).reshape(len(rows), 2)
+        produto_ids, estoque_atual = produtos[:, 0], produtos[:, 1]
+        
+        limite_fim = para_epoch_us(fim) if fim is not None else None
+        acumulador = _Acumulador(("liquido_desde_inicio", "liquido_desde_fim", "saidas"))
+        if len(produto_ids):
+            # Garante uma posição para cada produto cadastrado
+            acumulador.somar(produto_ids, {nome: np.zeros(len(produto_ids)) for nome in acumulador.somas})
+        
+        for bloco in self.carregar_colunas(("produto_id", "quantidade", "created_at"), inicio=inicio):
+            quantidades = bloco["quantidade"]
+            if limite_fim is not None:
+                depois_do_fim = bloco["created_at"] >= limite_fim
+            else:
+                depois_do_fim = np.zeros(len(quantidades), dtype=bool)
+            
+            acumulador.somar(bloco["produto_id"], {
+                "liquido_desde_inicio": quantidades,
+                "liquido_desde_fim": np.where(depois_do_fim, quantidades, 0),
+                "saidas": np.where(~depois_do_fim & (quantidades < 0), -quantidades, 0),
+            })
+        
+        posicoes = produto_ids - acumulador.base
+        estoque_inicio = estoque_atual - acumulador.somas["liquido_desde_inicio"][posicoes]
+        estoque_fim = estoque_atual - acumulador.somas["liquido_desde_fim"][posicoes]
+        estoque_medio = (estoque_inicio + estoque_fim) / 2
+        saidas = acumulador.somas["saidas"][posicoes]
+        
+        giro = np.divide(saidas, estoque_medio, out=np.zeros(len(saidas)), where=estoque_medio > 0)
+        return GiroPorProduto(produto_ids=produto_ids, saidas=saidas, estoque_medio=estoque_medio, giro=giro)
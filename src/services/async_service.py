@@ -0,0 +1,291 @@
+"""
+Fachada asyncio para ProdutoService e EstoqueService
+"""
+import asyncio
+import functools
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from ..models.produto import Produto
+from ..models.movimentacao import Movimentacao, TipoMovimentacao
+from ..models.lote import ResultadoLote
+from ..models.pagina import Pagina
+from ..models.resumo_movimentacoes import ResumoMovimentacoes
+from ..models.reconciliacao import RelatorioReconciliacao
+from ..models.valorizacao import RelatorioValorizacao
+from ..models.particao import ParticaoMovimentacoes
+from .produto_service import ProdutoService
+from .estoque_service import EstoqueService
+from .cache_produtos import CacheProdutos
+
+
+class ExecutorBanco:
+    """
+    Executa chamadas bloqueantes dos serviços fora do event loop
+    
+    Leituras vão para um pool limitado de threads; escritas vão para uma
+    única thread dedicada, já que o SQLite aceita um escritor por vez.
+    O número de operações em andamento é limitado por max_pendentes:
+    acima disso, os chamadores aguardam (sem bloquear o loop) até que
+    alguma operação termine.
+    
+    Cancelar a task que aguarda uma operação ainda na fila impede sua
+    execução. Uma operação que já começou na thread não pode ser
+    interrompida e é concluída normalmente.
+    """
+    
+    def __init__(self, max_leitores: int = 8, max_pendentes: int = 1000):
+        """
+        Inicializa os executores
+        
+        Args:
+            max_leitores: Número de threads para leituras
+            max_pendentes: Operações simultâneas aceitas antes de aplicar
+                contrapressão aos chamadores
+        """
+        self._leitura = ThreadPoolExecutor(max_workers=max_leitores, thread_name_prefix="estoque-leitura")
+        self._escrita = ThreadPoolExecutor(max_workers=1, thread_name_prefix="estoque-escrita")
+        self._semaforo = asyncio.Semaphore(max_pendentes)
+        self.max_pendentes = max_pendentes
+    
+    async def ler(self, funcao, *args, **kwargs):
+        """Executa uma leitura no pool de leitores"""
+        return await self._executar(self._leitura, funcao, *args, **kwargs)
+    
+    async def escrever(self, funcao, *args, **kwargs):
+        """Executa uma escrita na thread escritora"""
+        return await self._executar(self._escrita, funcao, *args, **kwargs)
+    
+    async def _executar(self, executor: ThreadPoolExecutor, funcao, *args, **kwargs):
+        """Agenda a chamada no executor respeitando o limite de pendentes"""
+        async with self._semaforo:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(funcao, *args, **kwargs))
+    
+    def fechar(self, aguardar: bool = True) -> None:
+        """
+        Encerra as threads dos executores
+        
+        Args:
+            aguardar: Aguarda as operações em andamento terminarem
+        """
+        self._leitura.shutdown(wait=aguardar, cancel_futures=not aguardar)
+        self._escrita.shutdown(wait=aguardar, cancel_futures=not aguardar)
+
+
+class AsyncProdutoService:
+    """Versão assíncrona de ProdutoService"""
+    
+    def __init__(self, db_connection=None, cache: Optional[CacheProdutos] = None,
+                 executor: Optional[ExecutorBanco] = None):
+        """
+        Inicializa o serviço
+        
+        Args:
+            db_connection: Conexão com banco (usado para testes)
+            cache: Cache opcional de produtos
+            executor: Executor compartilhado; se None, cria um próprio
+        """
+        self.servico = ProdutoService(db_connection, cache=cache)
+        self.executor = executor or ExecutorBanco()
+        self._executor_proprio = executor is None
+    
+    async def criar_produto(self, produto: Produto) -> Produto:
+        """Cria um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.criar_produto, produto)
+    
+    async def buscar_produto_por_id(self, produto_id: int) -> Produto:
+        """Busca um produto pelo ID no pool de leitores"""
+        return await self.executor.ler(self.servico.buscar_produto_por_id, produto_id)
+    
+    async def buscar_produtos_por_ids(self, produto_ids: Iterable[int]) -> Dict[int, Produto]:
+        """Busca vários produtos pelos IDs no pool de leitores"""
+        return await self.executor.ler(self.servico.buscar_produtos_por_ids, list(produto_ids))
+    
+    async def buscar_produto_por_nome(self, nome: str) -> Produto:
+        """Busca um produto pelo nome no pool de leitores"""
+        return await self.executor.ler(self.servico.buscar_produto_por_nome, nome)
+    
+    async def listar_produtos(self) -> List[Produto]:
+        """Lista todos os produtos no pool de leitores"""
+        return await self.executor.ler(self.servico.listar_produtos)
+    
+    async def atualizar_produto(self, produto: Produto) -> Produto:
+        """Atualiza um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.atualizar_produto, produto)
+    
+    async def excluir_produto(self, produto_id: int) -> None:
+        """Exclui um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.excluir_produto, produto_id)
+    
+    async def atualizar_estoque(self, produto_id: int, nova_quantidade: int) -> Produto:
+        """Define o estoque de um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.atualizar_estoque, produto_id, nova_quantidade)
+    
+    async def definir_estoque_minimo(self, produto_id: int, estoque_minimo: int) -> Produto:
+        """Define o estoque mínimo de um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.definir_estoque_minimo, produto_id, estoque_minimo)
+    
+    def fechar(self) -> None:
+        """Encerra o executor, se tiver sido criado por este serviço"""
+        if self._executor_proprio:
+            self.executor.fechar()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.fechar()
+
+
+class AsyncEstoqueService:
+    """Versão assíncrona de EstoqueService"""
+    
+    def __init__(self, db_connection=None, cache: Optional[CacheProdutos] = None,
+                 executor: Optional[ExecutorBanco] = None, **opcoes):
+        """
+        Inicializa o serviço
+        
+        Args:
+            db_connection: Conexão com banco (usado para testes)
+            cache: Cache opcional de produtos
+            executor: Executor compartilhado; se None, cria um próprio
+            opcoes: Demais argumentos repassados a EstoqueService
+        """
+        self.servico = EstoqueService(db_connection, cache=cache, **opcoes)
+        self.executor = executor or ExecutorBanco()
+        self._executor_proprio = executor is None
+    
+    async def registrar_entrada(self, produto_id: int, quantidade: int,
+                                observacao: Optional[str] = None) -> Movimentacao:
+        """Registra uma entrada de estoque na thread escritora"""
+        return await self.executor.escrever(self.servico.registrar_entrada, produto_id, quantidade, observacao)
+    
+    async def registrar_saida(self, produto_id: int, quantidade: int,
+                              observacao: Optional[str] = None) -> Movimentacao:
+        """Registra uma saída de estoque na thread escritora"""
+        return await self.executor.escrever(self.servico.registrar_saida, produto_id, quantidade, observacao)
+    
+    async def registrar_movimentacoes_em_lote(self, movimentacoes: Iterable) -> ResultadoLote:
+        """Registra um lote de movimentações na thread escritora"""
+        return await self.executor.escrever(self.servico.registrar_movimentacoes_em_lote, list(movimentacoes))
+    
+    async def listar_movimentacoes(self, produto_id: Optional[int] = None,
+                                   tipo: Optional[TipoMovimentacao] = None,
+                                   incluir_produto: bool = False,
+                                   inicio: Optional[datetime] = None,
+                                   fim: Optional[datetime] = None) -> List[Movimentacao]:
+        """Lista movimentações no pool de leitores"""
+        return await self.executor.ler(
+            self.servico.listar_movimentacoes, produto_id, tipo, incluir_produto, inicio, fim
+        )
+    
+    async def listar_movimentacoes_paginado(self, limite: int = 50, apos: Optional[str] = None,
+                                            produto_id: Optional[int] = None,
+                                            tipo: Optional[TipoMovimentacao] = None,
+                                            incluir_produto: bool = False) -> Pagina[Movimentacao]:
+        """Lista uma página de movimentações no pool de leitores"""
+        return await self.executor.ler(
+            self.servico.listar_movimentacoes_paginado, limite, apos, produto_id, tipo, incluir_produto
+        )
+    
+    async def iterar_movimentacoes(self, produto_id: Optional[int] = None,
+                                   tipo: Optional[TipoMovimentacao] = None,
+                                   apos: Optional[str] = None,
+                                   limite: Optional[int] = None,
+                                   tamanho_bloco: int = 1000,
+                                   incluir_produto: bool = False) -> AsyncIterator[Movimentacao]:
+        """
+        Percorre movimentações buscando uma página por vez no executor
+        
+        Args:
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            apos: Cursor de paginação a partir do qual continuar (opcional)
+            limite: Quantidade máxima de movimentações (opcional)
+            tamanho_bloco: Quantidade de movimentações por página
+            incluir_produto: Preenche produto_nome e produto_preco
+            
+        Yields:
+            Movimentações em ordem decrescente de created_at
+        """
+        restantes = limite
+        while restantes is None or restantes > 0:
+            tamanho = tamanho_bloco if restantes is None else min(tamanho_bloco, restantes)
+            pagina = await self.listar_movimentacoes_paginado(tamanho, apos, produto_id, tipo, incluir_produto)
+            for movimentacao in pagina:
+                yield movimentacao
+            
+            if restantes is not None:
+                restantes -= len(pagina)
+            if not pagina.tem_proxima:
+                break
+            apos = pagina.proximo
+    
+    async def listar_movimentacoes_diarias(self, inicio: date, fim: date,
+                                           produto_id: Optional[int] = None) -> List[ResumoMovimentacoes]:
+        """Lista o resumo diário de movimentações no pool de leitores"""
+        return await self.executor.ler(self.servico.listar_movimentacoes_diarias, inicio, fim, produto_id)
+    
+    async def obter_totais_periodo(self, inicio: date, fim: date) -> List[ResumoMovimentacoes]:
+        """Soma as movimentações de um período no pool de leitores"""
+        return await self.executor.ler(self.servico.obter_totais_periodo, inicio, fim)
+    
+    async def obter_saldo_produto(self, produto_id: int) -> int:
+        """Calcula o saldo de um produto no pool de leitores (a leitura não grava checkpoints)"""
+        return await self.executor.ler(self.servico.obter_saldo_produto, produto_id)
+    
+    async def obter_saldos(self, produto_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """Calcula o saldo de vários produtos no pool de leitores"""
+        ids = list(produto_ids) if produto_ids is not None else None
+        return await self.executor.ler(self.servico.obter_saldos, ids)
+    
+    async def criar_checkpoint_saldo(self, produto_id: Optional[int] = None) -> int:
+        """Grava checkpoints de saldo na thread escritora"""
+        return await self.executor.escrever(self.servico.criar_checkpoint_saldo, produto_id)
+    
+    async def recalcular_estoque_produto(self, produto_id: int) -> Produto:
+        """Recalcula o estoque de um produto na thread escritora"""
+        return await self.executor.escrever(self.servico.recalcular_estoque_produto, produto_id)
+    
+    async def recalcular_todos(self, corrigir: bool = True) -> RelatorioReconciliacao:
+        """Reconcilia o estoque de todos os produtos na thread escritora"""
+        return await self.executor.escrever(self.servico.recalcular_todos, corrigir)
+    
+    async def arquivar_movimentacoes(self, ate: Optional[date] = None, diretorio: Optional[str] = None,
+                                     somente_leitura: bool = True) -> List[ParticaoMovimentacoes]:
+        """Arquiva os meses fechados de movimentações na thread escritora"""
+        return await self.executor.escrever(self.servico.arquivar_movimentacoes, ate, diretorio, somente_leitura)
+    
+    async def listar_particoes(self) -> List[ParticaoMovimentacoes]:
+        """Lista as partições arquivadas no pool de leitores"""
+        return await self.executor.ler(self.servico.listar_particoes)
+    
+    async def verificar_estoque_disponivel(self, produto_id: int, quantidade: int) -> bool:
+        """Verifica se há estoque suficiente no pool de leitores"""
+        return await self.executor.ler(self.servico.verificar_estoque_disponivel, produto_id, quantidade)
+    
+    async def obter_produtos_com_estoque_baixo(self, limite: int = 5) -> List[Produto]:
+        """Lista produtos com estoque baixo no pool de leitores"""
+        return await self.executor.ler(self.servico.obter_produtos_com_estoque_baixo, limite)
+    
+    async def listar_produtos_para_reposicao(self, limite: int = 50,
+                                             apos: Optional[str] = None) -> Pagina[Produto]:
+        """Lista uma página de produtos para reposição no pool de leitores"""
+        return await self.executor.ler(self.servico.listar_produtos_para_reposicao, limite, apos)
+    
+    async def relatorio_valorizacao(self, top: int = 10, por_produto: bool = False) -> RelatorioValorizacao:
+        """Gera o relatório de valorização do estoque no pool de leitores"""
+        return await self.executor.ler(self.servico.relatorio_valorizacao, top, por_produto)
+    
+    def fechar(self) -> None:
+        """Encerra o executor, se tiver sido criado por este serviço"""
+        if self._executor_proprio:
+            self.executor.fechar()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.fechar()
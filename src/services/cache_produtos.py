@@ -0,0 +1,272 @@
+"""
+Cache LRU/TTL para consultas de produtos
+"""
+import copy
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ..models.produto import Produto
+
+
+def ler_geracao_produtos(cursor) -> Optional[int]:
+    """
+    Lê a geração dos produtos: soma de metadados.geracao_estoque e
+    metadados.geracao_cadastro
+    
+    Os dois contadores são avançados por triggers a cada alteração em
+    produtos, feita por qualquer conexão ou processo.
+    
+    Args:
+        cursor: Cursor do banco
+        
+    Returns:
+        Geração atual ou None em bancos sem os contadores
+    """
+    cursor.execute(
+        "SELECT SUM(valor) FROM metadados WHERE chave IN ('geracao_estoque', 'geracao_cadastro')"
+    )
+    valor = cursor.fetchone()[0]
+    return int(valor) if valor is not None else None
+
+
+@dataclass
+class EstatisticasCache:
+    """
+    Contadores de uso do cache de produtos
+    """
+    acertos: int
+    falhas: int
+    remocoes: int
+    invalidacoes: int
+    tamanho: int
+    capacidade: int
+    
+    @property
+    def taxa_acerto(self) -> float:
+        """Proporção de consultas atendidas pelo cache"""
+        total = self.acertos + self.falhas
+        return self.acertos / total if total else 0.0
+
+
+class CacheProdutos:
+    """
+    Cache limitado de produtos por ID e por nome
+    
+    Os itens menos usados recentemente são removidos quando a capacidade
+    é atingida e, se ttl for informado, expiram após ttl segundos. Os
+    produtos são copiados na entrada e na saída, de modo que alterações
+    feitas pelo chamador não afetam o cache.
+    """
+    
+    def __init__(self, capacidade: int = 1024, ttl: Optional[float] = None,
+                 verificar_versao: bool = True):
+        """
+        Inicializa o cache
+        
+        Args:
+            capacidade: Quantidade máxima de produtos armazenados
+            ttl: Tempo de vida (segundos) de cada item; None para não expirar
+            verificar_versao: Consulta PRAGMA data_version a cada busca para
+                detectar escritas de outras conexões/processos (ver
+                sincronizar). Desative quando todas as escritas passam pelos
+                serviços deste processo: os acertos deixam de acessar o banco.
+        """
+        if capacidade < 1:
+            raise ValueError("Capacidade do cache deve ser maior que zero")
+        
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.verificar_versao = verificar_versao
+        
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[int, Tuple[Produto, Optional[float]]]" = OrderedDict()
+        self._ids_por_nome: Dict[str, int] = {}
+        self._versoes = weakref.WeakKeyDictionary()
+        self._geracao = 0
+        self._geracao_banco: Optional[int] = None
+        
+        self._acertos = 0
+        self._falhas = 0
+        self._remocoes = 0
+        self._invalidacoes = 0
+    
+    @property
+    def geracao(self) -> int:
+        """Contador incrementado a cada invalidação"""
+        return self._geracao
+    
+    def sincronizar(self, cursor) -> None:
+        """
+        Descarta o cache se outra conexão alterou produtos
+        
+        PRAGMA data_version muda quando qualquer outra conexão (inclusive
+        de outro processo) confirma uma escrita no arquivo. Enquanto ele não
+        muda, nada mais é lido. Quando muda, ou na primeira vez que a
+        conexão é vista, a geração dos produtos é comparada à que o cache
+        reflete: as escritas dos serviços deste processo já avançaram essa
+        referência (ver registrar_escrita) e não descartam o cache; qualquer
+        outra alteração em produtos, sim.
+        
+        Args:
+            cursor: Cursor da conexão usada na consulta
+        """
+        cursor.execute("PRAGMA data_version")
+        versao = cursor.fetchone()[0]
+        conexao = cursor.connection
+        
+        with self._lock:
+            anterior = self._versoes.get(conexao)
+        if anterior == versao:
+            return
+        
+        geracao = ler_geracao_produtos(cursor)
+        
+        with self._lock:
+            self._versoes[conexao] = versao
+            if geracao is not None and geracao == self._geracao_banco:
+                return
+            self._geracao_banco = geracao
+            self._limpar()
+    
+    def registrar_escrita(self, antes: Optional[int], depois: Optional[int]) -> None:
+        """
+        Informa uma escrita em produtos feita por este processo, já confirmada
+        
+        Se o cache refletia a geração anterior à escrita, passa a refletir a
+        posterior: as outras conexões do pool verão o data_version mudar,
+        mas não descartarão o cache por causa desta escrita. Os produtos
+        alterados continuam sendo removidos por invalidar.
+        
+        Args:
+            antes: Geração dos produtos no início da transação
+            depois: Geração dos produtos ao final da transação
+        """
+        with self._lock:
+            if antes is not None and antes == self._geracao_banco:
+                self._geracao_banco = depois
+    
+    def obter_por_id(self, produto_id: int) -> Optional[Produto]:
+        """
+        Busca um produto no cache pelo ID
+        
+        Args:
+            produto_id: ID do produto
+            
+        Returns:
+            Cópia do produto ou None se ausente/expirado
+        """
+        with self._lock:
+            return self._obter(produto_id)
+    
+    def obter_por_nome(self, nome: str) -> Optional[Produto]:
+        """
+        Busca um produto no cache pelo nome
+        
+        Args:
+            nome: Nome do produto
+            
+        Returns:
+            Cópia do produto ou None se ausente/expirado
+        """
+        with self._lock:
+            return self._obter(self._ids_por_nome.get(nome))
+    
+    def armazenar(self, produto: Produto, geracao: Optional[int] = None) -> None:
+        """
+        Armazena um produto lido do banco
+        
+        Args:
+            produto: Produto com ID preenchido
+            geracao: Valor de geracao lido antes da consulta; se houve
+                invalidação desde então, o produto não é armazenado
+        """
+        expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+        
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                return
+            
+            self._remover(produto.id)
+            self._itens[produto.id] = (copy.copy(produto), expira_em)
+            self._ids_por_nome[produto.nome] = produto.id
+            
+            while len(self._itens) > self.capacidade:
+                _, (removido, _) = self._itens.popitem(last=False)
+                self._remover_nome(removido)
+                self._remocoes += 1
+    
+    def invalidar(self, produto_id: Optional[int] = None, nome: Optional[str] = None) -> None:
+        """
+        Remove um produto do cache (por ID e/ou nome)
+        
+        Args:
+            produto_id: ID do produto
+            nome: Nome do produto
+        """
+        with self._lock:
+            self._geracao += 1
+            self._invalidacoes += 1
+            
+            if nome is not None and nome in self._ids_por_nome:
+                self._remover(self._ids_por_nome[nome])
+            if produto_id is not None:
+                self._remover(produto_id)
+    
+    def limpar(self) -> None:
+        """Remove todos os produtos do cache"""
+        with self._lock:
+            self._limpar()
+    
+    def estatisticas(self) -> EstatisticasCache:
+        """
+        Retorna os contadores de uso do cache
+        
+        Returns:
+            Instância de EstatisticasCache
+        """
+        with self._lock:
+            return EstatisticasCache(
+                acertos=self._acertos,
+                falhas=self._falhas,
+                remocoes=self._remocoes,
+                invalidacoes=self._invalidacoes,
+                tamanho=len(self._itens),
+                capacidade=self.capacidade
+            )
+    
+    def _obter(self, produto_id: Optional[int]) -> Optional[Produto]:
+        """Consulta o cache (chamado com o lock)"""
+        item = self._itens.get(produto_id) if produto_id is not None else None
+        
+        if item is not None:
+            produto, expira_em = item
+            if expira_em is None or expira_em > time.monotonic():
+                self._itens.move_to_end(produto_id)
+                self._acertos += 1
+                return copy.copy(produto)
+            self._remover(produto_id)
+        
+        self._falhas += 1
+        return None
+    
+    def _limpar(self) -> None:
+        """Remove todos os produtos (chamado com o lock)"""
+        self._geracao += 1
+        self._invalidacoes += 1
+        self._itens.clear()
+        self._ids_por_nome.clear()
+    
+    def _remover(self, produto_id: int) -> None:
+        """Remove um item e seu índice por nome (chamado com o lock)"""
+        item = self._itens.pop(produto_id, None)
+        if item is not None:
+            self._remover_nome(item[0])
+    
+    def _remover_nome(self, produto: Produto) -> None:
+        """Remove o índice por nome do produto (chamado com o lock)"""
+        if self._ids_por_nome.get(produto.nome) == produto.id:
+            del self._ids_por_nome[produto.nome]
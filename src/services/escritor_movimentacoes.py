@@ -0,0 +1,229 @@
+"""
+Escritor com group commit para movimentações de estoque concorrentes
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from ..models.movimentacao import Movimentacao, TipoMovimentacao
+from ..exceptions.estoque_exceptions import MovimentacaoInvalidaException
+from .estoque_service import EstoqueService
+
+
+# Sinal de parada da thread escritora
+_PARAR = object()
+
+
+@dataclass
+class EstatisticasEscritor:
+    """
+    Contadores do escritor de movimentações
+    """
+    lotes: int
+    movimentacoes: int
+    maior_lote: int
+    
+    @property
+    def tamanho_medio_lote(self) -> float:
+        """Quantidade média de movimentações por transação"""
+        return self.movimentacoes / self.lotes if self.lotes else 0.0
+
+
+class EscritorMovimentacoes:
+    """
+    Agrupa movimentações vindas de várias threads em micro-lotes
+    
+    Uma thread dedicada retira pedidos da fila e os aplica com
+    EstoqueService.registrar_movimentacoes_em_lote, uma transação (e um
+    fsync) por micro-lote. Um lote é fechado quando atinge tamanho_max ou
+    quando intervalo_max segundos se passam desde o primeiro pedido.
+    Cada chamador recebe, pelo seu Future, a própria Movimentacao ou a
+    exceção da sua linha.
+    
+    Intervalos maiores aumentam a vazão sob carga ao custo de latência;
+    com intervalo_max=0 cada lote leva apenas o que já estiver na fila.
+    
+    A primeira submissão inicia a thread escritora. Depois de parar(), o
+    escritor recusa novos pedidos até ser iniciado de novo com iniciar().
+    """
+    
+    def __init__(self, estoque_service: Optional[EstoqueService] = None,
+                 intervalo_max: float = 0.002, tamanho_max: int = 256,
+                 tamanho_fila: int = 10000):
+        """
+        Inicializa o escritor
+        
+        Args:
+            estoque_service: Serviço usado para aplicar os lotes
+            intervalo_max: Espera máxima (segundos) para completar um lote
+            tamanho_max: Quantidade máxima de movimentações por lote
+            tamanho_fila: Pedidos pendentes antes de bloquear quem submete
+        """
+        if tamanho_max < 1:
+            raise ValueError("Tamanho máximo do lote deve ser maior que zero")
+        
+        self.estoque_service = estoque_service or EstoqueService()
+        self.intervalo_max = intervalo_max
+        self.tamanho_max = tamanho_max
+        
+        self._fila: "queue.Queue" = queue.Queue(maxsize=tamanho_fila)
+        self._thread: Optional[threading.Thread] = None
+        self._trava = threading.Lock()
+        self._parado = False
+        
+        self._lotes = 0
+        self._movimentacoes = 0
+        self._maior_lote = 0
+    
+    def iniciar(self) -> "EscritorMovimentacoes":
+        """Inicia a thread escritora (idempotente), inclusive depois de parar()"""
+        with self._trava:
+            self._parado = False
+            self._garantir_thread()
+        return self
+    
+    def parar(self) -> None:
+        """
+        Aplica os pedidos pendentes e encerra a thread escritora
+        
+        O sinal de parada entra na fila sob a mesma trava de submeter, de modo
+        que todo pedido aceito antes dele é aplicado e nenhum é aceito depois.
+        """
+        with self._trava:
+            self._parado = True
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._fila.put(_PARAR)
+        
+        if thread is not None:
+            thread.join()
+    
+    def submeter(self, produto_id: int, tipo: TipoMovimentacao, quantidade: int,
+                 observacao: Optional[str] = None) -> Future:
+        """
+        Enfileira uma movimentação para o próximo micro-lote
+        
+        Args:
+            produto_id: ID do produto
+            tipo: Tipo da movimentação
+            quantidade: Quantidade movimentada
+            observacao: Observação opcional
+            
+        Returns:
+            Future resolvido com a Movimentacao criada ou com a exceção
+            (ProdutoNaoEncontradoException, EstoqueInsuficienteException...)
+            
+        Raises:
+            MovimentacaoInvalidaException: Se dados inválidos
+            RuntimeError: Se o escritor foi parado
+        """
+        if quantidade <= 0:
+            raise MovimentacaoInvalidaException("Quantidade deve ser maior que zero")
+        
+        movimentacao = Movimentacao(
+            produto_id=produto_id,
+            tipo=tipo,
+            quantidade=quantidade,
+            observacao=observacao
+        )
+        
+        futuro: Future = Future()
+        
+        with self._trava:
+            if self._parado:
+                raise RuntimeError("Escritor de movimentações parado")
+            
+            self._garantir_thread()
+            self._fila.put((movimentacao, futuro))
+        
+        return futuro
+    
+    def registrar_entrada(self, produto_id: int, quantidade: int, observacao: Optional[str] = None) -> Movimentacao:
+        """Registra uma entrada aguardando a confirmação do micro-lote"""
+        return self.submeter(produto_id, TipoMovimentacao.ENTRADA, quantidade, observacao).result()
+    
+    def registrar_saida(self, produto_id: int, quantidade: int, observacao: Optional[str] = None) -> Movimentacao:
+        """Registra uma saída aguardando a confirmação do micro-lote"""
+        return self.submeter(produto_id, TipoMovimentacao.SAIDA, quantidade, observacao).result()
+    
+    def estatisticas(self) -> EstatisticasEscritor:
+        """
+        Retorna os contadores do escritor
+        
+        Returns:
+            Instância de EstatisticasEscritor
+        """
+        return EstatisticasEscritor(
+            lotes=self._lotes,
+            movimentacoes=self._movimentacoes,
+            maior_lote=self._maior_lote
+        )
+    
+    def __enter__(self):
+        return self.iniciar()
+    
+    def __exit__(self, *exc_info):
+        self.parar()
+    
+    def _garantir_thread(self) -> None:
+        """Inicia a thread escritora se não estiver rodando (chamado com a trava)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._executar, name="escritor-movimentacoes", daemon=True
+            )
+            self._thread.start()
+    
+    def _executar(self) -> None:
+        """Laço da thread escritora"""
+        parar = False
+        
+        while not parar:
+            primeiro = self._fila.get()
+            if primeiro is _PARAR:
+                break
+            
+            pedidos: List[Tuple[Movimentacao, Future]] = [primeiro]
+            prazo = time.monotonic() + self.intervalo_max
+            
+            while len(pedidos) < self.tamanho_max:
+                restante = prazo - time.monotonic()
+                try:
+                    pedido = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if pedido is _PARAR:
+                    parar = True
+                    break
+                pedidos.append(pedido)
+            
+            self._aplicar(pedidos)
+    
+    def _aplicar(self, pedidos: List[Tuple[Movimentacao, Future]]) -> None:
+        """Aplica um micro-lote e resolve os futures dos chamadores"""
+        ativos = [(movimentacao, futuro) for movimentacao, futuro in pedidos
+                  if futuro.set_running_or_notify_cancel()]
+        if not ativos:
+            return
+        
+        try:
+            resultado = self.estoque_service.registrar_movimentacoes_em_lote(
+                movimentacao for movimentacao, _ in ativos
+            )
+        except Exception as e:
+            for _, futuro in ativos:
+                futuro.set_exception(e)
+            return
+        
+        for (_, futuro), linha in zip(ativos, resultado.linhas):
+            if linha.sucesso:
+                futuro.set_result(linha.movimentacao)
+            else:
+                futuro.set_exception(linha.erro)
+        
+        self._lotes += 1
+        self._movimentacoes += len(ativos)
+        self._maior_lote = max(self._maior_lote, len(ativos))
@@ -1,34 +1,99 @@
 """
 Serviço para gerenciamento de estoque e movimentações
 """
+import json
+import os
 import sqlite3
-from typing import List, Optional
-from datetime import datetime
+import stat
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from ..models.produto import Produto
 from ..models.movimentacao import Movimentacao, TipoMovimentacao
+from ..models.datas import para_banco, para_datetime
+from ..models.lote import ResultadoLinha, ResultadoLote
+from ..models.pagina import Pagina, codificar_cursor, decodificar_cursor
+from ..models.resumo_movimentacoes import ResumoMovimentacoes
+from ..models.reconciliacao import DivergenciaEstoque, RelatorioReconciliacao
+from ..models.valorizacao import RelatorioValorizacao, ValorProduto
+from ..models.particao import ParticaoMovimentacoes
 from ..database.connection import get_database_connection
+from ..database.partitions import (
+    MAX_ATTACHED_PARTITIONS,
+    attach_partitions,
+    bounds_filter,
+    create_partition_file,
+    movement_tables,
+    partition_path,
+    partition_schema,
+    read_partitioned
+)
 from ..exceptions.estoque_exceptions import (
     EstoqueInsuficienteException,
     ProdutoNaoEncontradoException,
     MovimentacaoInvalidaException,
     EstoqueNegativoException
 )
-from .produto_service import ProdutoService
+from .produto_service import ProdutoService, TAMANHO_BLOCO_IN
+from .cache_produtos import CacheProdutos
+from .metricas import instrumentar
+
+
+# Movimentações somadas além do checkpoint antes de gravar um novo
+INTERVALO_CHECKPOINT = 1000
+
+# Soma uma movimentação (ou um grupo) ao resumo diário do produto
+SQL_SOMAR_RESUMO_DIARIO = """
+    INSERT INTO movimentacoes_diarias (dia, produto_id, entradas, saidas)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (dia, produto_id) DO UPDATE SET
+        entradas = entradas + excluded.entradas,
+        saidas = saidas + excluded.saidas
+"""
+
 
+# Saldo de cada produto pelas movimentações: checkpoint (ou estoque inicial)
+# mais as movimentações posteriores a ele, em uma única agregação
+SQL_SALDOS = """
+    SELECT
+        p.id AS produto_id,
+        p.nome,
+        p.estoque_atual,
+        COALESCE(c.saldo, p.estoque_inicial, 0)
+            + COALESCE(SUM(CASE WHEN m.tipo = 'entrada' THEN m.quantidade ELSE -m.quantidade END), 0) AS saldo_calculado
+    FROM produtos p
+    LEFT JOIN saldos_checkpoint c ON c.produto_id = p.id
+    LEFT JOIN movimentacoes m ON m.produto_id = p.id AND m.id > COALESCE(c.movimentacao_id, 0)
+    WHERE {filtro}
+    GROUP BY p.id
+"""
 
+@instrumentar("estoque")
 class EstoqueService:
-    """Serviço para gerenciamento de movimentações de estoque"""
+    """
+    Serviço para gerenciamento de movimentações de estoque
+    
+    Os métodos públicos são medidos pelo registro de métricas (ver
+    src/services/metricas.py).
+    """
     
-    def __init__(self, db_connection=None):
+    def __init__(self, db_connection=None, intervalo_checkpoint: int = INTERVALO_CHECKPOINT,
+                 cache: Optional[CacheProdutos] = None):
         """
         Inicializa o serviço
         
         Args:
             db_connection: Conexão com banco (usado para testes)
+            intervalo_checkpoint: Movimentações do produto desde o seu
+                último checkpoint de saldo a partir das quais uma escrita
+                grava um novo
+            cache: Cache opcional de produtos, invalidado pelas escritas de estoque
         """
         self.db = db_connection or get_database_connection()
-        self.produto_service = ProdutoService(db_connection)
+        self.produto_service = ProdutoService(db_connection, cache=cache)
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self._cache_valorizacao: Dict[Tuple[int, bool], RelatorioValorizacao] = {}
     
     def registrar_entrada(self, produto_id: int, quantidade: int, observacao: Optional[str] = None) -> Movimentacao:
         """
@@ -46,44 +111,7 @@ class EstoqueService:
             ProdutoNaoEncontradoException: Se produto não existir
             MovimentacaoInvalidaException: Se dados inválidos
         """
-        if quantidade <= 0:
-            raise MovimentacaoInvalidaException("Quantidade deve ser maior que zero")
-        
-        # Verifica se produto existe
-        produto = self.produto_service.buscar_produto_por_id(produto_id)
-        
-        # Cria a movimentação
-        movimentacao = Movimentacao(
-            produto_id=produto_id,
-            tipo=TipoMovimentacao.ENTRADA,
-            quantidade=quantidade,
-            observacao=observacao
-        )
-        
-        # Salva movimentação e atualiza estoque em transação
-        with self.db.get_cursor() as cursor:
-            # Insere movimentação
-            cursor.execute("""
-                INSERT INTO movimentacoes (produto_id, tipo, quantidade, observacao, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                movimentacao.produto_id,
-                movimentacao.tipo.value,
-                movimentacao.quantidade,
-                movimentacao.observacao,
-                movimentacao.created_at
-            ))
-            
-            movimentacao.id = cursor.lastrowid
-            
-            # Atualiza estoque do produto
-            novo_estoque = produto.estoque_atual + quantidade
-            cursor.execute("""
-                UPDATE produtos SET estoque_atual = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (novo_estoque, produto_id))
-        
-        return movimentacao
+        return self._registrar_movimentacao(produto_id, TipoMovimentacao.ENTRADA, quantidade, observacao)
     
     def registrar_saida(self, produto_id: int, quantidade: int, observacao: Optional[str] = None) -> Movimentacao:
         """
@@ -102,31 +130,69 @@ class EstoqueService:
             EstoqueInsuficienteException: Se não há estoque suficiente
             MovimentacaoInvalidaException: Se dados inválidos
         """
-        if quantidade <= 0:
-            raise MovimentacaoInvalidaException("Quantidade deve ser maior que zero")
+        return self._registrar_movimentacao(produto_id, TipoMovimentacao.SAIDA, quantidade, observacao)
+    
+    def _registrar_movimentacao(self, produto_id: int, tipo: TipoMovimentacao,
+                                quantidade: int, observacao: Optional[str]) -> Movimentacao:
+        """
+        Atualiza o estoque, grava a movimentação e soma ao resumo diário em
+        uma única transação
         
-        # Verifica se produto existe
-        produto = self.produto_service.buscar_produto_por_id(produto_id)
+        O estoque é alterado por um UPDATE condicional relativo ao valor
+        armazenado (estoque_atual = estoque_atual +/- ?), sem leitura prévia,
+        o que impede atualizações perdidas entre processos ou threads
+        concorrentes. O produto só é consultado quando o UPDATE não afeta
+        nenhuma linha, para identificar a causa.
         
-        # Verifica se há estoque suficiente
-        if not produto.tem_estoque_suficiente(quantidade):
-            raise EstoqueInsuficienteException(
-                produto_nome=produto.nome,
-                estoque_atual=produto.estoque_atual,
-                quantidade_solicitada=quantidade
-            )
+        Args:
+            produto_id: ID do produto
+            tipo: Tipo da movimentação
+            quantidade: Quantidade movimentada
+            observacao: Observação opcional
+            
+        Returns:
+            Movimentação criada
+            
+        Raises:
+            ProdutoNaoEncontradoException: Se produto não existir
+            EstoqueInsuficienteException: Se não há estoque suficiente
+            MovimentacaoInvalidaException: Se dados inválidos
+        """
+        if quantidade <= 0:
+            raise MovimentacaoInvalidaException("Quantidade deve ser maior que zero")
         
-        # Cria a movimentação
         movimentacao = Movimentacao(
             produto_id=produto_id,
-            tipo=TipoMovimentacao.SAIDA,
+            tipo=tipo,
             quantidade=quantidade,
             observacao=observacao
         )
         
-        # Salva movimentação e atualiza estoque em transação
-        with self.db.get_cursor() as cursor:
-            # Insere movimentação
+        with self.produto_service.transacao_escrita() as cursor:
+            if movimentacao.is_entrada():
+                cursor.execute("""
+                    UPDATE produtos SET estoque_atual = estoque_atual + ?
+                    WHERE id = ?
+                """, (quantidade, produto_id))
+            else:
+                cursor.execute("""
+                    UPDATE produtos SET estoque_atual = estoque_atual - ?
+                    WHERE id = ? AND estoque_atual >= ?
+                """, (quantidade, produto_id, quantidade))
+            
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT nome, estoque_atual FROM produtos WHERE id = ?", (produto_id,))
+                row = cursor.fetchone()
+                
+                if not row:
+                    raise ProdutoNaoEncontradoException(produto_id)
+                
+                raise EstoqueInsuficienteException(
+                    produto_nome=row['nome'],
+                    estoque_atual=row['estoque_atual'],
+                    quantidade_solicitada=quantidade
+                )
+            
             cursor.execute("""
                 INSERT INTO movimentacoes (produto_id, tipo, quantidade, observacao, created_at)
                 VALUES (?, ?, ?, ?, ?)
@@ -135,54 +201,535 @@ class EstoqueService:
                 movimentacao.tipo.value,
                 movimentacao.quantidade,
                 movimentacao.observacao,
-                movimentacao.created_at
+                para_banco(movimentacao.created_at, self.db.timestamp_format)
             ))
             
             movimentacao.id = cursor.lastrowid
             
-            # Atualiza estoque do produto
-            novo_estoque = produto.estoque_atual - quantidade
+            entradas = quantidade if movimentacao.is_entrada() else 0
+            cursor.execute(SQL_SOMAR_RESUMO_DIARIO, (
+                movimentacao.created_at.date().isoformat(), produto_id, entradas, quantidade - entradas
+            ))
+            
+            self._avancar_checkpoints(cursor, {produto_id: 1})
+        
+        self.produto_service.invalidar_cache(produto_id)
+        return movimentacao
+    
+    def registrar_movimentacoes_em_lote(self, movimentacoes: Iterable,
+                                        cursor: Optional[sqlite3.Cursor] = None) -> ResultadoLote:
+        """
+        Registra um lote de movimentações em uma única transação
+        
+        Cada item pode ser uma Movimentacao, uma tupla
+        (produto_id, tipo, quantidade[, observacao]) ou um dicionário com
+        essas chaves. As linhas são aplicadas na ordem recebida, com o saldo
+        de cada produto acumulado ao longo do lote: uma saída só é aceita se
+        o estoque resultante das linhas anteriores for suficiente. Linhas
+        inválidas são rejeitadas individualmente, sem abortar o restante.
+        
+        Com cursor, o lote entra na transação de escrita já aberta pelo
+        chamador (por exemplo, de ProdutoService.transacao_escrita), que
+        responde pelo commit e por invalidar o cache dos produtos depois dele.
+        
+        Args:
+            movimentacoes: Itens do lote
+            cursor: Cursor de uma transação de escrita aberta (opcional)
+            
+        Returns:
+            Relatório com o resultado de cada linha
+        """
+        resultado = ResultadoLote()
+        
+        for indice, item in enumerate(movimentacoes):
+            try:
+                movimentacao = self._item_lote_para_movimentacao(item)
+            except (ValueError, TypeError, KeyError) as e:
+                erro = e if isinstance(e, MovimentacaoInvalidaException) else MovimentacaoInvalidaException(str(e))
+                resultado.linhas.append(ResultadoLinha(indice=indice, erro=erro))
+                continue
+            
+            resultado.linhas.append(ResultadoLinha(indice=indice, movimentacao=movimentacao))
+        
+        pendentes = [linha for linha in resultado.linhas if linha.sucesso]
+        if not pendentes:
+            return resultado
+        
+        if cursor is not None:
+            self._aplicar_lote(cursor, pendentes)
+            return resultado
+        
+        # Reserva a escrita antes de ler os saldos para que o lote seja
+        # aplicado sobre um estoque consistente
+        with self.produto_service.transacao_escrita() as cursor:
+            self._aplicar_lote(cursor, pendentes)
+        
+        for produto_id in {linha.movimentacao.produto_id for linha in resultado.linhas if linha.sucesso}:
+            self.produto_service.invalidar_cache(produto_id)
+        
+        return resultado
+    
+    def _aplicar_lote(self, cursor, linhas: List[ResultadoLinha]) -> None:
+        """
+        Aplica linhas de lote já validadas usando o cursor informado
+        
+        Linhas cujo produto não existe ou cuja saída excede o saldo acumulado
+        recebem o erro correspondente; as demais são inseridas com
+        executemany, têm o ID da movimentação preenchido e são somadas ao
+        resumo diário.
+        
+        Args:
+            cursor: Cursor dentro de uma transação de escrita
+            linhas: Linhas com movimentação a aplicar, na ordem do lote
+        """
+        produto_ids = list({linha.movimentacao.produto_id for linha in linhas})
+        produtos: Dict[int, sqlite3.Row] = {}
+        
+        for inicio in range(0, len(produto_ids), TAMANHO_BLOCO_IN):
+            bloco = produto_ids[inicio:inicio + TAMANHO_BLOCO_IN]
+            marcadores = ", ".join("?" * len(bloco))
+            cursor.execute(
+                f"SELECT id, nome, estoque_atual FROM produtos WHERE id IN ({marcadores})",
+                bloco
+            )
+            for row in cursor.fetchall():
+                produtos[row['id']] = row
+        
+        saldos = {produto_id: row['estoque_atual'] for produto_id, row in produtos.items()}
+        aceitas: List[ResultadoLinha] = []
+        
+        for linha in linhas:
+            movimentacao = linha.movimentacao
+            produto_id = movimentacao.produto_id
+            
+            if produto_id not in produtos:
+                linha.movimentacao = None
+                linha.erro = ProdutoNaoEncontradoException(produto_id)
+                continue
+            
+            saldo = saldos[produto_id]
+            if movimentacao.is_saida() and saldo < movimentacao.quantidade:
+                linha.movimentacao = None
+                linha.erro = EstoqueInsuficienteException(
+                    produto_nome=produtos[produto_id]['nome'],
+                    estoque_atual=saldo,
+                    quantidade_solicitada=movimentacao.quantidade
+                )
+                continue
+            
+            saldos[produto_id] = saldo + movimentacao.get_impacto_estoque()
+            aceitas.append(linha)
+        
+        if not aceitas:
+            return
+        
+        formato = self.db.timestamp_format
+        cursor.executemany("""
+            INSERT INTO movimentacoes (produto_id, tipo, quantidade, observacao, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (
+                linha.movimentacao.produto_id,
+                linha.movimentacao.tipo.value,
+                linha.movimentacao.quantidade,
+                linha.movimentacao.observacao,
+                para_banco(linha.movimentacao.created_at, formato)
+            )
+            for linha in aceitas
+        ])
+        
+        # A transação detém o lock de escrita, então os IDs gerados pelo
+        # AUTOINCREMENT são consecutivos e terminam em last_insert_rowid()
+        cursor.execute("SELECT last_insert_rowid()")
+        primeiro_id = cursor.fetchone()[0] - len(aceitas) + 1
+        for deslocamento, linha in enumerate(aceitas):
+            linha.movimentacao.id = primeiro_id + deslocamento
+        
+        alterados = {linha.movimentacao.produto_id for linha in aceitas}
+        cursor.executemany("""
+            UPDATE produtos SET estoque_atual = ?
+            WHERE id = ?
+        """, [(saldos[produto_id], produto_id) for produto_id in alterados])
+        
+        # Resumo diário: um UPSERT por produto e dia do lote
+        resumo = defaultdict(lambda: [0, 0])
+        for linha in aceitas:
+            movimentacao = linha.movimentacao
+            chave = (movimentacao.created_at.date().isoformat(), movimentacao.produto_id)
+            resumo[chave][0 if movimentacao.is_entrada() else 1] += movimentacao.quantidade
+        
+        cursor.executemany(SQL_SOMAR_RESUMO_DIARIO, [
+            (dia, produto_id, entradas, saidas) for (dia, produto_id), (entradas, saidas) in resumo.items()
+        ])
+        
+        self._avancar_checkpoints(cursor, Counter(linha.movimentacao.produto_id for linha in aceitas))
+    
+    def _avancar_checkpoints(self, cursor, novas: Dict[int, int]) -> None:
+        """
+        Conta as movimentações gravadas no checkpoint de saldo de cada
+        produto e avança os que chegaram a intervalo_checkpoint
+        
+        A contagem é por produto, então limita quantas movimentações
+        obter_saldo_produto precisa somar, qualquer que seja o número de
+        produtos movimentados. Com checkpoint, ela fica em
+        movimentacoes_pendentes (um UPDATE pela chave); sem checkpoint, as
+        movimentações do produto são contadas pelo índice, até
+        intervalo_checkpoint. Roda na transação da escrita, de modo que a
+        leitura do saldo não grava nada. Um produto com movimentações
+        arquivadas depois do checkpoint (ver arquivar_movimentacoes) não é
+        avançado, pois o checkpoint só soma a tabela principal.
+        
+        Args:
+            cursor: Cursor dentro da transação de escrita
+            novas: Produto -> quantidade de movimentações gravadas
+        """
+        for produto_id, quantidade in novas.items():
             cursor.execute("""
-                UPDATE produtos SET estoque_atual = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (novo_estoque, produto_id))
+                UPDATE saldos_checkpoint SET movimentacoes_pendentes = movimentacoes_pendentes + ?
+                WHERE produto_id = ?
+                RETURNING movimentacao_id, movimentacoes_pendentes
+            """, (quantidade, produto_id))
+            row = cursor.fetchone()
+            
+            if row is not None:
+                if row['movimentacoes_pendentes'] < self.intervalo_checkpoint:
+                    continue
+                movimentacao_id = row['movimentacao_id']
+            else:
+                # Existe a movimentação de número intervalo_checkpoint?
+                cursor.execute(
+                    "SELECT 1 FROM movimentacoes WHERE produto_id = ? LIMIT 1 OFFSET ?",
+                    (produto_id, self.intervalo_checkpoint - 1)
+                )
+                if cursor.fetchone() is None:
+                    continue
+                movimentacao_id = 0
+            
+            if not self._particoes_apos_checkpoint(cursor, produto_id, movimentacao_id):
+                self._atualizar_checkpoints(cursor, produto_id)
+    
+    def _item_lote_para_movimentacao(self, item) -> Movimentacao:
+        """
+        Converte um item de lote em objeto Movimentacao
+        
+        Args:
+            item: Movimentacao, tupla ou dicionário
+            
+        Returns:
+            Instância de Movimentacao
+            
+        Raises:
+            MovimentacaoInvalidaException: Se quantidade não for positiva
+            ValueError: Se tipo for inválido
+            TypeError: Se o formato do item não for suportado
+        """
+        if isinstance(item, Movimentacao):
+            movimentacao = item
+        elif isinstance(item, dict):
+            movimentacao = Movimentacao(
+                produto_id=item['produto_id'],
+                tipo=item['tipo'],
+                quantidade=item['quantidade'],
+                observacao=item.get('observacao')
+            )
+        elif isinstance(item, (tuple, list)):
+            movimentacao = Movimentacao(*item)
+        else:
+            raise TypeError(f"Item de lote não suportado: {item!r}")
+        
+        if movimentacao.quantidade <= 0:
+            raise MovimentacaoInvalidaException("Quantidade deve ser maior que zero")
         
         return movimentacao
     
     def listar_movimentacoes(self, produto_id: Optional[int] = None, 
-                           tipo: Optional[TipoMovimentacao] = None) -> List[Movimentacao]:
+                           tipo: Optional[TipoMovimentacao] = None,
+                           incluir_produto: bool = False,
+                           inicio: Optional[datetime] = None,
+                           fim: Optional[datetime] = None) -> List[Movimentacao]:
         """
         Lista movimentações com filtros opcionais
         
+        Com meses arquivados (ver arquivar_movimentacoes), só as partições
+        cujo mês cruza [inicio, fim) e cuja faixa de produtos contém
+        produto_id são anexadas e consultadas.
+        
         Args:
             produto_id: ID do produto (opcional)
             tipo: Tipo de movimentação (opcional)
+            incluir_produto: Preenche produto_nome e produto_preco na mesma
+                consulta (junção com produtos), sem uma busca por movimentação
+            inicio: Data/hora mínima de created_at, inclusive (opcional)
+            fim: Data/hora máxima de created_at, exclusive (opcional)
             
         Returns:
             Lista de movimentações
         """
-        query = "SELECT * FROM movimentacoes WHERE 1=1"
+        with self.db.get_cursor() as cursor:
+            return [
+                self._row_to_movimentacao(row, incluir_produto)
+                for rows in self._ler_movimentacoes(cursor, produto_id, tipo, None, incluir_produto, inicio, fim)
+                for row in rows
+            ]
+    
+    def listar_movimentacoes_paginado(self, limite: int = 50, apos: Optional[str] = None,
+                                      produto_id: Optional[int] = None,
+                                      tipo: Optional[TipoMovimentacao] = None,
+                                      incluir_produto: bool = False) -> Pagina[Movimentacao]:
+        """
+        Lista uma página de movimentações, da mais recente para a mais antiga
+        
+        A paginação é por cursor (keyset sobre created_at, id): o custo de
+        cada página não depende de quantas páginas já foram lidas.
+        
+        Args:
+            limite: Quantidade máxima de movimentações na página
+            apos: Cursor retornado em Pagina.proximo da página anterior
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            incluir_produto: Preenche produto_nome e produto_preco (junção com produtos)
+            
+        Returns:
+            Página de movimentações
+            
+        Raises:
+            ValueError: Se limite não for positivo ou o cursor for inválido
+        """
+        if limite <= 0:
+            raise ValueError("Limite deve ser maior que zero")
+        
+        with self.db.get_cursor() as cursor:
+            rows = [
+                row
+                for bloco in self._ler_movimentacoes(cursor, produto_id, tipo, apos, incluir_produto,
+                                                     limite=limite + 1)
+                for row in bloco
+            ]
+        
+        proximo = None
+        if len(rows) > limite:
+            rows = rows[:limite]
+            proximo = codificar_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        
+        return Pagina(itens=[self._row_to_movimentacao(row, incluir_produto) for row in rows], proximo=proximo)
+    
+    def iterar_movimentacoes(self, produto_id: Optional[int] = None,
+                             tipo: Optional[TipoMovimentacao] = None,
+                             apos: Optional[str] = None, limite: Optional[int] = None,
+                             tamanho_bloco: int = 1000,
+                             incluir_produto: bool = False) -> Iterator[Movimentacao]:
+        """
+        Percorre movimentações, da mais recente para a mais antiga, sem
+        carregar o histórico inteiro em memória
+        
+        As linhas são lidas do cursor em blocos com fetchmany, de modo que
+        o consumo de memória é constante independentemente do histórico.
+        
+        Args:
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            apos: Cursor de paginação a partir do qual continuar (opcional)
+            limite: Quantidade máxima de movimentações (opcional)
+            tamanho_bloco: Quantidade de linhas lidas por fetchmany
+            incluir_produto: Preenche produto_nome e produto_preco (junção com produtos)
+            
+        Yields:
+            Movimentações em ordem decrescente de created_at
+        """
+        with self.db.get_cursor() as cursor:
+            for rows in self._ler_movimentacoes(cursor, produto_id, tipo, apos, incluir_produto,
+                                                limite=limite, tamanho_bloco=tamanho_bloco):
+                for row in rows:
+                    yield self._row_to_movimentacao(row, incluir_produto)
+    
+    def _ler_movimentacoes(self, cursor, produto_id: Optional[int] = None,
+                           tipo: Optional[TipoMovimentacao] = None, apos: Optional[str] = None,
+                           incluir_produto: bool = False, inicio: Optional[datetime] = None,
+                           fim: Optional[datetime] = None, limite: Optional[int] = None,
+                           tamanho_bloco: Optional[int] = None) -> Iterator[List[sqlite3.Row]]:
+        """
+        Lê movimentações da tabela principal e das partições que podem conter
+        linhas do filtro, da mais recente para a mais antiga
+        
+        As partições são descartadas pelo catálogo (mês, faixa de produtos e
+        cursor). Até MAX_ATTACHED_PARTITIONS partições, tudo é uma única
+        consulta UNION ALL; além disso, as partições são lidas em grupos de
+        meses consecutivos, cada grupo restrito ao seu intervalo de datas,
+        e o limite vale para o conjunto dos grupos.
+        
+        Args:
+            cursor: Cursor do banco (fora de transação se houver partições)
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            apos: Cursor de paginação (opcional)
+            incluir_produto: Acrescenta produto_nome e produto_preco
+            inicio: Data/hora mínima de created_at, inclusive (opcional)
+            fim: Data/hora máxima de created_at, exclusive (opcional)
+            limite: Quantidade máxima de linhas (opcional)
+            tamanho_bloco: Linhas por fetchmany (None lê tudo com fetchall)
+            
+        Yields:
+            Blocos de linhas em ordem decrescente de (created_at, id)
+        """
+        formato = self.db.timestamp_format
+        inicio = para_banco(inicio, formato)
+        fim = para_banco(fim, formato)
+        posicao = decodificar_cursor(apos, 2) if apos is not None else None
+        
+        def consulta(particoes: List[str], faixa: Tuple):
+            return self._consulta_movimentacoes(
+                produto_id, tipo, posicao, incluir_produto, inicio, fim, particoes=particoes, faixa=faixa
+            )
+        
+        yield from read_partitioned(
+            cursor, self.db.db_path, consulta, produto_id, inicio, fim,
+            before=posicao[0] if posicao is not None else None,
+            limit=limite, block_size=tamanho_bloco
+        )
+    
+    def _consulta_movimentacoes(self, produto_id: Optional[int] = None,
+                                tipo: Optional[TipoMovimentacao] = None,
+                                posicao: Optional[Tuple] = None, incluir_produto: bool = False,
+                                inicio=None, fim=None, particoes: Iterable[str] = (),
+                                faixa: Tuple = (None, None)):
+        """
+        Monta a consulta de movimentações com filtros e cursor opcionais
+        
+        Sem partições, a consulta lê só a tabela principal; com partições,
+        cada tabela é um ramo de um UNION ALL com os mesmos filtros.
+        
+        Args:
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            posicao: (created_at, id) do cursor de paginação (opcional)
+            incluir_produto: Acrescenta produto_nome e produto_preco por
+                LEFT JOIN com produtos (busca pela chave primária)
+            inicio: Limite inferior de created_at no formato do banco (opcional)
+            fim: Limite superior (exclusivo) no formato do banco (opcional)
+            particoes: Esquemas das partições anexadas a incluir
+            faixa: Limites [inferior, superior) de created_at do grupo de partições
+            
+        Returns:
+            Tupla (query, params) ordenada por created_at DESC, id DESC
+        """
+        filtros = ""
         params = []
         
         if produto_id is not None:
-            query += " AND produto_id = ?"
+            filtros += " AND m.produto_id = ?"
             params.append(produto_id)
         
         if tipo is not None:
-            query += " AND tipo = ?"
+            filtros += " AND m.tipo = ?"
             params.append(tipo.value)
         
-        query += " ORDER BY created_at DESC"
+        if inicio is not None:
+            filtros += " AND m.created_at >= ?"
+            params.append(inicio)
+        
+        if fim is not None:
+            filtros += " AND m.created_at < ?"
+            params.append(fim)
+        
+        filtro_faixa, params_faixa = bounds_filter(faixa, "m.created_at")
+        filtros += filtro_faixa
+        params.extend(params_faixa)
+        
+        if posicao is not None:
+            filtros += " AND (m.created_at, m.id) < (?, ?)"
+            params.extend(posicao)
+        
+        if incluir_produto:
+            colunas = "m.*, p.nome AS produto_nome, p.preco_unitario AS produto_preco"
+            juncao = " LEFT JOIN produtos p ON p.id = m.produto_id"
+        else:
+            colunas = "m.*"
+            juncao = ""
+        
+        ramos = [
+            f"SELECT {colunas} FROM {tabela} m{juncao} WHERE 1=1{filtros}" for tabela in movement_tables(particoes)
+        ]
+        
+        if len(ramos) == 1:
+            return ramos[0] + " ORDER BY m.created_at DESC, m.id DESC", params
+        
+        return " UNION ALL ".join(ramos) + " ORDER BY created_at DESC, id DESC", params * len(ramos)
+    
+    def listar_movimentacoes_diarias(self, inicio: date, fim: date,
+                                     produto_id: Optional[int] = None) -> List[ResumoMovimentacoes]:
+        """
+        Lista o resumo diário de movimentações no período
+        
+        Lê a tabela movimentacoes_diarias, mantida junto com cada
+        movimentação: o custo depende de dias x produtos movimentados,
+        não da quantidade de movimentações.
+        
+        Args:
+            inicio: Primeiro dia (inclusive)
+            fim: Último dia (inclusive)
+            produto_id: ID do produto (opcional)
+            
+        Returns:
+            Resumos por dia e produto, em ordem de dia e produto
+        """
+        query = """
+            SELECT dia, produto_id, entradas, saidas FROM movimentacoes_diarias
+            WHERE dia BETWEEN ? AND ?
+        """
+        params = [inicio.isoformat(), fim.isoformat()]
+        
+        if produto_id is not None:
+            query += " AND produto_id = ?"
+            params.append(produto_id)
+        
+        query += " ORDER BY dia, produto_id"
         
         with self.db.get_cursor() as cursor:
             cursor.execute(query, params)
             rows = cursor.fetchall()
+        
+        return [
+            ResumoMovimentacoes(
+                produto_id=row['produto_id'], entradas=row['entradas'], saidas=row['saidas'],
+                dia=date.fromisoformat(row['dia'])
+            )
+            for row in rows
+        ]
+    
+    def obter_totais_periodo(self, inicio: date, fim: date) -> List[ResumoMovimentacoes]:
+        """
+        Soma as movimentações de cada produto no período, pelo resumo diário
+        
+        Args:
+            inicio: Primeiro dia (inclusive)
+            fim: Último dia (inclusive)
             
-            return [self._row_to_movimentacao(row) for row in rows]
+        Returns:
+            Totais dos produtos movimentados no período, em ordem de produto
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT produto_id, SUM(entradas) AS entradas, SUM(saidas) AS saidas
+                FROM movimentacoes_diarias
+                WHERE dia BETWEEN ? AND ?
+                GROUP BY produto_id
+                ORDER BY produto_id
+            """, (inicio.isoformat(), fim.isoformat()))
+            rows = cursor.fetchall()
+        
+        return [
+            ResumoMovimentacoes(produto_id=row['produto_id'], entradas=row['entradas'], saidas=row['saidas'])
+            for row in rows
+        ]
     
     def obter_saldo_produto(self, produto_id: int) -> int:
         """
-        Calcula o saldo atual de um produto baseado nas movimentações
+        Calcula o saldo atual de um produto baseado no estoque inicial
+        e nas movimentações
+        
+        O saldo parte do checkpoint do produto (se houver) e soma apenas as
+        movimentações posteriores a ele. A leitura não grava nada: os
+        checkpoints são avançados pelas escritas de movimentações.
         
         Args:
             produto_id: ID do produto
@@ -193,23 +740,191 @@ class EstoqueService:
         Raises:
             ProdutoNaoEncontradoException: Se produto não existir
         """
-        # Verifica se produto existe
-        self.produto_service.buscar_produto_por_id(produto_id)
-        
         with self.db.get_cursor() as cursor:
             cursor.execute("""
                 SELECT 
-                    COALESCE(SUM(CASE WHEN tipo = 'entrada' THEN quantidade ELSE 0 END), 0) as entradas,
-                    COALESCE(SUM(CASE WHEN tipo = 'saida' THEN quantidade ELSE 0 END), 0) as saidas
-                FROM movimentacoes 
-                WHERE produto_id = ?
+                    COALESCE(c.saldo, p.estoque_inicial, 0) as saldo_base,
+                    COALESCE(c.movimentacao_id, 0) as movimentacao_id
+                FROM produtos p
+                LEFT JOIN saldos_checkpoint c ON c.produto_id = p.id
+                WHERE p.id = ?
             """, (produto_id,))
             
             row = cursor.fetchone()
-            entradas = row['entradas'] or 0
-            saidas = row['saidas'] or 0
             
-            return entradas - saidas
+            if not row:
+                raise ProdutoNaoEncontradoException(produto_id)
+            
+            cursor.execute("""
+                SELECT 
+                    COALESCE(SUM(CASE WHEN tipo = 'entrada' THEN quantidade ELSE -quantidade END), 0) as variacao
+                FROM movimentacoes 
+                WHERE produto_id = ? AND id > ?
+            """, (produto_id, row['movimentacao_id']))
+            
+            variacao = cursor.fetchone()['variacao']
+            
+            # O arquivamento leva o checkpoint de todos os produtos até a
+            # última movimentação; só um produto sem checkpoint depois
+            # disso pode precisar somar partições
+            particoes = self._particoes_apos_checkpoint(cursor, produto_id, row['movimentacao_id'])
+            if particoes:
+                variacao += self._somar_particoes(cursor, particoes, produto_id, row['movimentacao_id'])
+            
+            return row['saldo_base'] + variacao
+    
+    def _particoes_apos_checkpoint(self, cursor, produto_id: int, movimentacao_id: int) -> List[Tuple[str, str]]:
+        """
+        Consulta no catálogo as partições com movimentações do produto
+        posteriores ao checkpoint
+        
+        Args:
+            cursor: Cursor do banco
+            produto_id: ID do produto
+            movimentacao_id: Última movimentação coberta pelo checkpoint
+            
+        Returns:
+            Pares (esquema, caminho) das partições
+        """
+        cursor.execute("""
+            SELECT mes, arquivo FROM particoes_movimentacoes
+            WHERE ultimo_id > ? AND ? BETWEEN menor_produto_id AND maior_produto_id
+        """, (movimentacao_id, produto_id))
+        return [
+            (partition_schema(row['mes']), partition_path(self.db.db_path, row['arquivo']))
+            for row in cursor.fetchall()
+        ]
+    
+    def _somar_particoes(self, cursor, particoes: List[Tuple[str, str]], produto_id: int,
+                         movimentacao_id: int) -> int:
+        """
+        Soma a variação de estoque do produto nas partições, em grupos de
+        até MAX_ATTACHED_PARTITIONS partições anexadas
+        
+        Args:
+            cursor: Cursor do banco (fora de transação)
+            particoes: Pares (esquema, caminho)
+            produto_id: ID do produto
+            movimentacao_id: Só movimentações com ID maior são somadas
+            
+        Returns:
+            Entradas menos saídas nas partições
+        """
+        variacao = 0
+        for indice in range(0, len(particoes), MAX_ATTACHED_PARTITIONS):
+            grupo = particoes[indice:indice + MAX_ATTACHED_PARTITIONS]
+            attach_partitions(cursor, grupo)
+            
+            ramos = " UNION ALL ".join(
+                f"SELECT tipo, quantidade FROM {esquema}.movimentacoes WHERE produto_id = ? AND id > ?"
+                for esquema, _ in grupo
+            )
+            cursor.execute(
+                "SELECT COALESCE(SUM(CASE WHEN tipo = 'entrada' THEN quantidade ELSE -quantidade END), 0) "
+                f"FROM ({ramos})",
+                (produto_id, movimentacao_id) * len(grupo)
+            )
+            variacao += cursor.fetchone()[0]
+        
+        return variacao
+    
+    def obter_saldos(self, produto_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """
+        Calcula o saldo de vários produtos com uma agregação GROUP BY
+        
+        Usa os checkpoints como obter_saldo_produto.
+        
+        Args:
+            produto_ids: IDs dos produtos (None para todos)
+            
+        Returns:
+            Dicionário produto_id -> saldo; IDs inexistentes ficam de fora
+        """
+        saldos: Dict[int, int] = {}
+        
+        with self.db.get_cursor() as cursor:
+            if produto_ids is None:
+                cursor.execute(SQL_SALDOS.format(filtro="1 = 1"))
+                saldos.update((row['produto_id'], row['saldo_calculado']) for row in cursor)
+                return saldos
+            
+            produto_ids = list(dict.fromkeys(produto_ids))
+            for inicio in range(0, len(produto_ids), TAMANHO_BLOCO_IN):
+                bloco = produto_ids[inicio:inicio + TAMANHO_BLOCO_IN]
+                marcadores = ", ".join("?" * len(bloco))
+                cursor.execute(SQL_SALDOS.format(filtro=f"p.id IN ({marcadores})"), bloco)
+                saldos.update((row['produto_id'], row['saldo_calculado']) for row in cursor)
+        
+        return saldos
+    
+    def criar_checkpoint_saldo(self, produto_id: Optional[int] = None) -> int:
+        """
+        Grava o checkpoint de saldo de um produto ou de todos os produtos
+        
+        O checkpoint guarda o saldo até a última movimentação do produto e é
+        calculado de forma incremental a partir do checkpoint anterior.
+        
+        Args:
+            produto_id: ID do produto (None para todos)
+            
+        Returns:
+            Quantidade de checkpoints gravados
+            
+        Raises:
+            ProdutoNaoEncontradoException: Se o produto informado não existir
+        """
+        with self.db.get_cursor() as cursor:
+            total = self._atualizar_checkpoints(cursor, produto_id)
+        
+        if produto_id is not None and total == 0:
+            raise ProdutoNaoEncontradoException(produto_id)
+        
+        return total
+    
+    def _atualizar_checkpoints(self, cursor, produto_id: Optional[int] = None,
+                               ate_id: Optional[int] = None) -> int:
+        """
+        Avança o checkpoint de saldo em uma única instrução INSERT ... SELECT
+        
+        Args:
+            cursor: Cursor do banco
+            produto_id: ID do produto (None para todos)
+            ate_id: Se informado, todo checkpoint passa a cobrir pelo menos
+                até esta movimentação, mesmo sem movimentações do produto
+            
+        Returns:
+            Quantidade de checkpoints gravados
+        """
+        filtro = "p.id = ?" if produto_id is not None else "1 = 1"
+        ultima = "COALESCE(MAX(m.id), c.movimentacao_id, 0)"
+        if ate_id is not None:
+            ultima = f"MAX({ultima}, {int(ate_id)})"
+        params = (para_banco(datetime.now(), self.db.timestamp_format),)
+        if produto_id is not None:
+            params += (produto_id,)
+        
+        cursor.execute(f"""
+            INSERT INTO saldos_checkpoint (produto_id, movimentacao_id, saldo, movimentacoes_pendentes, created_at)
+            SELECT 
+                p.id,
+                {ultima},
+                COALESCE(c.saldo, p.estoque_inicial, 0)
+                    + COALESCE(SUM(CASE WHEN m.tipo = 'entrada' THEN m.quantidade ELSE -m.quantidade END), 0),
+                0,
+                ?
+            FROM produtos p
+            LEFT JOIN saldos_checkpoint c ON c.produto_id = p.id
+            LEFT JOIN movimentacoes m ON m.produto_id = p.id AND m.id > COALESCE(c.movimentacao_id, 0)
+            WHERE {filtro}
+            GROUP BY p.id
+            ON CONFLICT (produto_id) DO UPDATE SET
+                movimentacao_id = excluded.movimentacao_id,
+                saldo = excluded.saldo,
+                movimentacoes_pendentes = 0,
+                created_at = excluded.created_at
+        """, params)
+        
+        return cursor.rowcount
     
     def recalcular_estoque_produto(self, produto_id: int) -> Produto:
         """
@@ -227,6 +942,196 @@ class EstoqueService:
         saldo_calculado = self.obter_saldo_produto(produto_id)
         return self.produto_service.atualizar_estoque(produto_id, saldo_calculado)
     
+    def recalcular_todos(self, corrigir: bool = True) -> RelatorioReconciliacao:
+        """
+        Confere o estoque de todos os produtos com o saldo das movimentações
+        
+        As divergências vêm de uma única agregação e são corrigidas por um
+        único UPDATE, na mesma transação: nenhuma escrita concorrente entra
+        entre a conferência e a correção.
+        
+        Args:
+            corrigir: Se False, apenas relata as divergências
+            
+        Returns:
+            Relatório com os produtos cujo estoque_atual não conferia
+        """
+        relatorio = RelatorioReconciliacao(corrigido=corrigir)
+        
+        with self.produto_service.transacao_escrita() if corrigir else self.db.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM produtos")
+            relatorio.produtos_verificados = cursor.fetchone()[0]
+            
+            cursor.execute(SQL_SALDOS.format(filtro="1 = 1") + " HAVING p.estoque_atual IS NOT saldo_calculado")
+            relatorio.divergencias = [
+                DivergenciaEstoque(row['produto_id'], row['nome'], row['estoque_atual'], row['saldo_calculado'])
+                for row in cursor
+            ]
+            
+            if corrigir and relatorio.divergencias:
+                correcoes = [[divergencia.produto_id, divergencia.saldo] for divergencia in relatorio.divergencias]
+                cursor.execute("""
+                    UPDATE produtos SET estoque_atual = json_extract(correcoes.value, '$[1]')
+                    FROM json_each(?) AS correcoes
+                    WHERE produtos.id = json_extract(correcoes.value, '$[0]')
+                """, (json.dumps(correcoes),))
+        
+        if corrigir:
+            for divergencia in relatorio.divergencias:
+                self.produto_service.invalidar_cache(divergencia.produto_id)
+        
+        return relatorio
+    
+    def arquivar_movimentacoes(self, ate: Optional[date] = None, diretorio: Optional[str] = None,
+                               somente_leitura: bool = True) -> List[ParticaoMovimentacoes]:
+        """
+        Move os meses fechados do histórico para arquivos mensais (partições)
+        
+        Cada mês anterior ao mês de ate que ainda tiver movimentações na
+        tabela principal é copiado para movimentacoes_AAAA_MM.db e registrado
+        no catálogo particoes_movimentacoes. As novas movimentações continuam
+        na tabela principal, gravadas na mesma transação do estoque.
+        
+        Cada mês usa duas transações: a cópia, que só escreve na partição, e
+        depois, só no banco principal, os checkpoints de saldo (avançados até
+        a última movimentação, para que o saldo não leia partições), o
+        catálogo e a exclusão das linhas copiadas. Se for interrompido entre
+        as duas, o mês continua na tabela principal e basta executar de novo.
+        
+        Args:
+            ate: Primeiro mês que permanece na tabela principal (padrão: hoje)
+            diretorio: Diretório das partições (padrão: '<banco>_particoes',
+                ao lado do banco principal)
+            somente_leitura: Remove a permissão de escrita dos arquivos ao final
+            
+        Returns:
+            Partições criadas ou atualizadas, em ordem de mês
+            
+        Raises:
+            ValueError: Se o banco for em memória
+        """
+        if self.db.db_path == ":memory:":
+            raise ValueError("Partições de movimentações exigem um banco em arquivo")
+        
+        ate = ate or date.today()
+        corte = para_banco(datetime(ate.year, ate.month, 1), self.db.timestamp_format)
+        if diretorio is None:
+            diretorio = os.path.splitext(os.path.abspath(self.db.db_path))[0] + "_particoes"
+        
+        arquivadas = []
+        while True:
+            with self.db.get_cursor() as cursor:
+                cursor.execute("SELECT MIN(created_at) FROM movimentacoes WHERE created_at < ?", (corte,))
+                mais_antiga = para_datetime(cursor.fetchone()[0])
+            
+            if mais_antiga is None:
+                break
+            
+            particao, movidas = self._arquivar_mes(date(mais_antiga.year, mais_antiga.month, 1),
+                                                   diretorio, somente_leitura)
+            arquivadas.append(particao)
+            if movidas == 0:
+                break
+        
+        return arquivadas
+    
+    def _arquivar_mes(self, mes: date, diretorio: str,
+                      somente_leitura: bool) -> Tuple[ParticaoMovimentacoes, int]:
+        """
+        Copia as movimentações de um mês para a sua partição e as remove da
+        tabela principal
+        
+        Args:
+            mes: Primeiro dia do mês
+            diretorio: Diretório das partições
+            somente_leitura: Remove a permissão de escrita do arquivo ao final
+            
+        Returns:
+            Tupla (partição, movimentações removidas da tabela principal)
+        """
+        formato = self.db.timestamp_format
+        seguinte = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        inicio = para_banco(datetime(mes.year, mes.month, 1), formato)
+        fim = para_banco(datetime(seguinte.year, seguinte.month, 1), formato)
+        caminho = os.path.join(diretorio, f"movimentacoes_{mes:%Y_%m}.db")
+        
+        os.makedirs(diretorio, exist_ok=True)
+        if os.path.exists(caminho):
+            os.chmod(caminho, stat.S_IMODE(os.stat(caminho).st_mode) | stat.S_IWUSR)
+        else:
+            create_partition_file(caminho, formato)
+        
+        with self.db.get_cursor() as cursor:
+            conexao = cursor.connection
+            cursor.execute("ATTACH DATABASE ? AS destino", (caminho,))
+            try:
+                # BEGIN simples: a cópia só trava a partição para escrita
+                cursor.execute("BEGIN")
+                cursor.execute("""
+                    INSERT OR IGNORE INTO destino.movimentacoes
+                        (id, produto_id, tipo, quantidade, observacao, created_at)
+                    SELECT id, produto_id, tipo, quantidade, observacao, created_at
+                    FROM main.movimentacoes
+                    WHERE created_at >= ? AND created_at < ?
+                """, (inicio, fim))
+                conexao.commit()
+                
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM main.movimentacoes")
+                self._atualizar_checkpoints(cursor, ate_id=cursor.fetchone()[0])
+                
+                cursor.execute("""
+                    DELETE FROM main.movimentacoes
+                    WHERE created_at >= ? AND created_at < ?
+                      AND id IN (SELECT id FROM destino.movimentacoes)
+                """, (inicio, fim))
+                movidas = cursor.rowcount
+                
+                cursor.execute("""
+                    INSERT INTO particoes_movimentacoes
+                        (mes, arquivo, inicio, fim, primeiro_id, ultimo_id,
+                         menor_produto_id, maior_produto_id, linhas)
+                    SELECT ?, ?, ?, ?, MIN(id), MAX(id), MIN(produto_id), MAX(produto_id), COUNT(*)
+                    FROM destino.movimentacoes
+                    WHERE 1 = 1  -- o upsert com INSERT ... SELECT exige um WHERE
+                    ON CONFLICT (mes) DO UPDATE SET
+                        arquivo = excluded.arquivo,
+                        primeiro_id = excluded.primeiro_id,
+                        ultimo_id = excluded.ultimo_id,
+                        menor_produto_id = excluded.menor_produto_id,
+                        maior_produto_id = excluded.maior_produto_id,
+                        linhas = excluded.linhas,
+                        arquivada_em = excluded.arquivada_em
+                """, (
+                    f"{mes:%Y-%m}",
+                    os.path.relpath(caminho, os.path.dirname(os.path.abspath(self.db.db_path))),
+                    inicio, fim
+                ))
+                cursor.execute("SELECT * FROM particoes_movimentacoes WHERE mes = ?", (f"{mes:%Y-%m}",))
+                particao = ParticaoMovimentacoes.from_row(cursor.fetchone())
+                conexao.commit()
+            finally:
+                if conexao.in_transaction:
+                    conexao.rollback()
+                cursor.execute("DETACH DATABASE destino")
+        
+        if somente_leitura:
+            permissoes = stat.S_IMODE(os.stat(caminho).st_mode)
+            os.chmod(caminho, permissoes & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+        
+        return particao, movidas
+    
+    def listar_particoes(self) -> List[ParticaoMovimentacoes]:
+        """
+        Lista as partições mensais do histórico de movimentações
+        
+        Returns:
+            Partições do catálogo, em ordem de mês
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM particoes_movimentacoes ORDER BY mes")
+            return [ParticaoMovimentacoes.from_row(row) for row in cursor.fetchall()]
+    
     def verificar_estoque_disponivel(self, produto_id: int, quantidade: int) -> bool:
         """
         Verifica se há estoque suficiente para uma operação
@@ -264,21 +1169,129 @@ class EstoqueService:
             rows = cursor.fetchall()
             return [self.produto_service._row_to_produto(row) for row in rows]
     
-    def _row_to_movimentacao(self, row) -> Movimentacao:
+    def listar_produtos_para_reposicao(self, limite: int = 50, apos: Optional[str] = None) -> Pagina[Produto]:
+        """
+        Lista uma página de produtos no ponto de reposição
+        
+        Retorna produtos com estoque atual menor ou igual ao próprio estoque
+        mínimo, do maior déficit para o menor. A consulta usa o índice parcial
+        idx_produtos_reposicao, que só contém esses produtos: o custo de cada
+        página não depende do tamanho do catálogo.
+        
+        Args:
+            limite: Quantidade máxima de produtos na página
+            apos: Cursor retornado em Pagina.proximo da página anterior
+            
+        Returns:
+            Página de produtos
+            
+        Raises:
+            ValueError: Se limite não for positivo ou o cursor for inválido
+        """
+        if limite <= 0:
+            raise ValueError("Limite deve ser maior que zero")
+        
+        # A condição do índice parcial precisa aparecer literalmente no WHERE
+        query = """
+            SELECT *, estoque_atual - estoque_minimo AS deficit FROM produtos
+            WHERE estoque_atual <= estoque_minimo
+        """
+        params = []
+        
+        if apos is not None:
+            deficit, produto_id = decodificar_cursor(apos, 2)
+            # Equivale a (deficit, id) > (?, ?); o SQLite não usa o índice de
+            # expressão com row values, mas usa o intervalo no primeiro termo
+            query += """
+                AND estoque_atual - estoque_minimo >= ?
+                AND (estoque_atual - estoque_minimo > ? OR id > ?)
+            """
+            params.extend([deficit, deficit, produto_id])
+        
+        query += " ORDER BY estoque_atual - estoque_minimo, id LIMIT ?"
+        params.append(limite + 1)
+        
+        with self.db.get_cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        proximo = None
+        if len(rows) > limite:
+            rows = rows[:limite]
+            proximo = codificar_cursor(rows[-1]['deficit'], rows[-1]['id'])
+        
+        return Pagina(itens=[self.produto_service._row_to_produto(row) for row in rows], proximo=proximo)
+    
+    def relatorio_valorizacao(self, top: int = 10, por_produto: bool = False) -> RelatorioValorizacao:
+        """
+        Calcula no banco o valor do estoque (estoque_atual * preco_unitario)
+        
+        O relatório fica em cache até a próxima alteração de estoque, preço
+        ou nome de algum produto, detectada pela geração do estoque (mantida
+        por triggers, vale também para escritas de outros processos). Com o
+        cache válido, a chamada custa uma leitura por chave primária.
+        
+        Args:
+            top: Quantidade de produtos de maior valor no relatório
+            por_produto: Inclui o valor de cada produto, em ordem de nome
+            
+        Returns:
+            Relatório de valorização (instância compartilhada pelo cache)
+        """
+        chave = (top, por_produto)
+        colunas = "id, nome, estoque_atual, preco_unitario, estoque_atual * preco_unitario AS valor"
+        
+        with self.db.get_cursor() as cursor:
+            # Geração e agregações lidas no mesmo retrato do banco
+            if not cursor.connection.in_transaction:
+                cursor.execute("BEGIN")
+            
+            cursor.execute("SELECT valor FROM metadados WHERE chave = 'geracao_estoque'")
+            geracao = int(cursor.fetchone()[0])
+            
+            relatorio = self._cache_valorizacao.get(chave)
+            if relatorio is not None and relatorio.geracao == geracao:
+                return relatorio
+            
+            cursor.execute("""
+                SELECT
+                    COUNT(*) AS produtos,
+                    COALESCE(SUM(estoque_atual), 0) AS unidades,
+                    COALESCE(SUM(estoque_atual * preco_unitario), 0.0) AS valor
+                FROM produtos
+            """)
+            totais = cursor.fetchone()
+            
+            maiores = []
+            if top > 0:
+                cursor.execute(f"SELECT {colunas} FROM produtos ORDER BY valor DESC, id LIMIT ?", (top,))
+                maiores = cursor.fetchall()
+            
+            itens = []
+            if por_produto:
+                cursor.execute(f"SELECT {colunas} FROM produtos ORDER BY nome")
+                itens = cursor.fetchall()
+        
+        relatorio = RelatorioValorizacao(
+            geracao=geracao,
+            total_produtos=totais['produtos'],
+            total_unidades=totais['unidades'],
+            valor_total=totais['valor'],
+            maiores=tuple(ValorProduto(*row) for row in maiores),
+            por_produto=tuple(ValorProduto(*row) for row in itens),
+        )
+        self._cache_valorizacao[chave] = relatorio
+        return relatorio
+    
+    def _row_to_movimentacao(self, row, com_produto: bool = False) -> Movimentacao:
         """
         Converte uma linha do banco em objeto Movimentacao
         
         Args:
             row: Linha do banco de dados
+            com_produto: A linha traz produto_nome e produto_preco
             
         Returns:
             Instância de Movimentacao
         """
-        return Movimentacao(
-            id=row['id'],
-            produto_id=row['produto_id'],
-            tipo=TipoMovimentacao(row['tipo']),
-            quantidade=row['quantidade'],
-            observacao=row['observacao'],
-            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-        )
+        return Movimentacao.from_row(row, com_produto)
@@ -0,0 +1,240 @@
+"""
+Exportação em fluxo de movimentações e produtos para CSV ou JSONL
+"""
+import csv
+import gzip
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.movimentacao import TipoMovimentacao
+from ..models.datas import para_banco
+from ..models.exportacao import ResultadoExportacao
+from ..database.connection import get_database_connection
+from ..database.partitions import bounds_filter, movement_tables, read_partitioned
+
+
+# Linhas lidas por fetchmany e gravadas de uma vez
+TAMANHO_BLOCO_EXPORTACAO = 10_000
+
+FORMATOS_EXPORTACAO = ("csv", "jsonl")
+
+# Timestamp como texto ISO em horário local, qualquer que seja o formato
+# gravado. Textos sem fração de segundo vêm de CURRENT_TIMESTAMP (UTC).
+SQL_DATA_LOCAL = """CASE typeof({coluna})
+    WHEN 'integer' THEN strftime('%Y-%m-%d %H:%M:%S', {coluna} / 1000000, 'unixepoch', 'localtime')
+        || printf('.%06d', {coluna} % 1000000)
+    WHEN 'text' THEN CASE WHEN length({coluna}) = 19 THEN datetime({coluna}, 'localtime') ELSE {coluna} END
+END"""
+
+COLUNAS_MOVIMENTACOES = {
+    "id": "id",
+    "produto_id": "produto_id",
+    "tipo": "tipo",
+    "quantidade": "quantidade",
+    "observacao": "observacao",
+    "created_at": SQL_DATA_LOCAL.format(coluna="created_at"),
+}
+
+COLUNAS_PRODUTOS = {
+    "id": "id",
+    "nome": "nome",
+    "descricao": "descricao",
+    "preco_unitario": "preco_unitario",
+    "estoque_atual": "estoque_atual",
+    "estoque_minimo": "estoque_minimo",
+    "created_at": SQL_DATA_LOCAL.format(coluna="created_at"),
+    "updated_at": SQL_DATA_LOCAL.format(coluna="updated_at"),
+}
+
+
+class Exportador:
+    """
+    Exporta tabelas em fluxo, direto do cursor para o arquivo
+    
+    As linhas são lidas em blocos com fetchmany, como tuplas simples, e
+    gravadas sem criar objetos dos modelos: a memória usada depende do
+    tamanho do bloco, não da quantidade de linhas exportadas. Cada
+    exportação é uma única leitura (um retrato consistente do banco); em
+    WAL ela não bloqueia escritas, mas adia o checkpoint até terminar.
+    Movimentações arquivadas em partições entram na exportação; com mais
+    de MAX_ATTACHED_PARTITIONS partições no período, cada grupo de meses
+    é uma leitura à parte.
+    """
+    
+    def __init__(self, db_connection=None, tamanho_bloco: int = TAMANHO_BLOCO_EXPORTACAO):
+        """
+        Inicializa o exportador
+        
+        Args:
+            db_connection: Conexão com banco (usado para testes)
+            tamanho_bloco: Linhas lidas e gravadas por vez
+        """
+        self.db = db_connection or get_database_connection()
+        self.tamanho_bloco = tamanho_bloco
+    
+    def exportar_movimentacoes(self, destino, formato: Optional[str] = None,
+                               produto_id: Optional[int] = None,
+                               tipo: Optional[TipoMovimentacao] = None,
+                               inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                               compactar: Optional[bool] = None) -> ResultadoExportacao:
+        """
+        Exporta movimentações em ordem cronológica (created_at, id)
+        
+        Inclui as partições do catálogo que podem ter linhas do filtro; os
+        grupos de partições são lidos do mais antigo ao mais recente.
+        
+        Args:
+            destino: Caminho do arquivo ou objeto de texto já aberto
+            formato: 'csv' ou 'jsonl' (se None, deduzido da extensão; padrão csv)
+            produto_id: ID do produto (opcional)
+            tipo: Tipo de movimentação (opcional)
+            inicio: Exporta movimentações a partir deste instante (opcional)
+            fim: Exporta movimentações anteriores a este instante (opcional)
+            compactar: Grava com gzip (se None, apenas quando o caminho termina em .gz)
+            
+        Returns:
+            Relatório da exportação
+            
+        Raises:
+            ValueError: Se o formato for desconhecido
+        """
+        filtros = ""
+        params = []
+        formato_timestamp = self.db.timestamp_format
+        inicio = para_banco(inicio, formato_timestamp)
+        fim = para_banco(fim, formato_timestamp)
+        
+        if produto_id is not None:
+            filtros += " AND produto_id = ?"
+            params.append(produto_id)
+        
+        if tipo is not None:
+            filtros += " AND tipo = ?"
+            params.append(tipo.value)
+        
+        if inicio is not None:
+            filtros += " AND created_at >= ?"
+            params.append(inicio)
+        
+        if fim is not None:
+            filtros += " AND created_at < ?"
+            params.append(fim)
+        
+        def consulta(particoes: List[str], faixa: Tuple):
+            filtro_faixa, params_faixa = bounds_filter(faixa)
+            filtros_grupo, params_grupo = filtros + filtro_faixa, params + params_faixa
+            
+            colunas = ', '.join(COLUNAS_MOVIMENTACOES.values())
+            if not particoes:
+                query = f"SELECT {colunas} FROM movimentacoes WHERE 1=1{filtros_grupo} ORDER BY created_at, id"
+                return query, params_grupo
+            
+            # Cada ramo traz também created_at como está gravado, para a
+            # ordenação: o SQLite intercala os ramos já ordenados pelo
+            # índice (MERGE) em vez de ordenar tudo em uma B-tree temporária
+            ramos = [
+                f"SELECT {colunas}, created_at FROM {tabela} WHERE 1=1{filtros_grupo}"
+                for tabela in movement_tables(particoes)
+            ]
+            query = f"{' UNION ALL '.join(ramos)} ORDER BY {len(COLUNAS_MOVIMENTACOES) + 1}, 1"
+            return query, params_grupo * len(ramos)
+        
+        quantidade = len(COLUNAS_MOVIMENTACOES)
+        
+        def ler(cursor):
+            for rows in read_partitioned(cursor, self.db.db_path, consulta, produto_id, inicio, fim,
+                                         oldest_first=True, block_size=self.tamanho_bloco):
+                yield rows if len(rows[0]) == quantidade else [row[:quantidade] for row in rows]
+        
+        return self._exportar(ler, list(COLUNAS_MOVIMENTACOES), destino, formato, compactar)
+    
+    def exportar_produtos(self, destino, formato: Optional[str] = None,
+                          compactar: Optional[bool] = None) -> ResultadoExportacao:
+        """
+        Exporta o catálogo de produtos em ordem de nome
+        
+        Args:
+            destino: Caminho do arquivo ou objeto de texto já aberto
+            formato: 'csv' ou 'jsonl' (se None, deduzido da extensão; padrão csv)
+            compactar: Grava com gzip (se None, apenas quando o caminho termina em .gz)
+            
+        Returns:
+            Relatório da exportação
+            
+        Raises:
+            ValueError: Se o formato for desconhecido
+        """
+        query = f"SELECT {', '.join(COLUNAS_PRODUTOS.values())} FROM produtos ORDER BY nome"
+        
+        def ler(cursor):
+            cursor.execute(query)
+            return iter(lambda: cursor.fetchmany(self.tamanho_bloco), [])
+        
+        return self._exportar(ler, list(COLUNAS_PRODUTOS), destino, formato, compactar)
+    
+    def _exportar(self, ler: Callable[[sqlite3.Cursor], Iterator[list]], colunas: List[str], destino,
+                  formato: Optional[str], compactar: Optional[bool]) -> ResultadoExportacao:
+        """
+        Lê as linhas e grava o resultado no destino, bloco a bloco
+        
+        Args:
+            ler: Recebe o cursor e retorna os blocos de linhas, com as
+                colunas na ordem de 'colunas'
+            colunas: Nomes das colunas exportadas
+            destino: Caminho do arquivo ou objeto de texto já aberto
+            formato: 'csv', 'jsonl' ou None
+            compactar: Grava com gzip (apenas para caminhos)
+            
+        Returns:
+            Relatório da exportação
+        """
+        if isinstance(destino, str):
+            nome = destino[:-3] if destino.endswith(".gz") else destino
+            if formato is None:
+                formato = "jsonl" if nome.endswith((".jsonl", ".json")) else "csv"
+            if compactar is None:
+                compactar = destino.endswith(".gz")
+        
+        formato = formato or "csv"
+        if formato not in FORMATOS_EXPORTACAO:
+            raise ValueError(f"Formato de exportação desconhecido: '{formato}'")
+        
+        if isinstance(destino, str):
+            abrir = gzip.open if compactar else open
+            with abrir(destino, "wt", newline="", encoding="utf-8") as arquivo:
+                return self._exportar(ler, colunas, arquivo, formato, None)
+        
+        inicio = time.perf_counter()
+        resultado = ResultadoExportacao()
+        gravar = self._gravador_csv(destino, colunas) if formato == "csv" else self._gravador_jsonl(destino, colunas)
+        
+        with self.db.get_cursor() as cursor:
+            # Tuplas simples: sqlite3.Row custaria um objeto a mais por linha
+            cursor.row_factory = None
+            
+            for rows in ler(cursor):
+                gravar(rows)
+                resultado.linhas += len(rows)
+        
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+    
+    @staticmethod
+    def _gravador_csv(arquivo, colunas: Sequence[str]):
+        """Grava o cabeçalho e retorna a função que grava um bloco em CSV"""
+        escritor = csv.writer(arquivo)
+        escritor.writerow(colunas)
+        return escritor.writerows
+    
+    @staticmethod
+    def _gravador_jsonl(arquivo, colunas: Sequence[str]):
+        """Retorna a função que grava um bloco em JSON Lines (um objeto por linha)"""
+        codificar = json.JSONEncoder(ensure_ascii=False).encode
+        
+        def gravar(rows):
+            arquivo.write("".join(codificar(dict(zip(colunas, row))) + "\n" for row in rows))
+        
+        return gravar
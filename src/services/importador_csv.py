@@ -0,0 +1,258 @@
+"""
+Serviço de importação de produtos e saldos a partir de arquivos CSV
+"""
+import csv
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..models.movimentacao import Movimentacao, TipoMovimentacao
+from ..models.datas import para_banco
+from ..models.importacao import LinhaRejeitada, ResultadoImportacao
+from ..database.connection import get_database_connection
+from .estoque_service import EstoqueService, TAMANHO_BLOCO_IN
+from .cache_produtos import CacheProdutos
+
+
+# Linhas do arquivo gravadas por transação
+TAMANHO_BLOCO_IMPORTACAO = 5000
+
+# Rejeições guardadas no relatório (as demais são apenas contadas)
+LIMITE_REJEICOES = 1000
+
+COLUNAS_IMPORTACAO = ("nome", "descricao", "preco_unitario", "estoque_atual", "estoque_minimo")
+
+# Insere o produto ou atualiza o cadastro; linhas iguais às gravadas não são reescritas
+SQL_UPSERT_PRODUTO = """
+    INSERT INTO produtos (nome, descricao, preco_unitario, estoque_atual, estoque_inicial,
+                          estoque_minimo, created_at, updated_at)
+    VALUES (?, ?, ?, 0, 0, ?, ?, ?)
+    ON CONFLICT (nome) DO UPDATE SET
+        descricao = excluded.descricao,
+        preco_unitario = excluded.preco_unitario,
+        estoque_minimo = excluded.estoque_minimo,
+        updated_at = excluded.updated_at
+    WHERE descricao IS NOT excluded.descricao
+       OR preco_unitario IS NOT excluded.preco_unitario
+       OR estoque_minimo IS NOT excluded.estoque_minimo
+"""
+
+
+class ImportadorCSV:
+    """
+    Importa o cadastro de produtos e os saldos de estoque de um CSV
+    
+    O arquivo é lido em fluxo e gravado em blocos, cada um numa transação:
+    os produtos são inseridos ou atualizados pelo nome (upsert) e, quando a
+    coluna estoque_atual é informada, uma movimentação de ajuste leva o
+    estoque ao valor do arquivo. Reimportar o mesmo arquivo não gera
+    escritas nem movimentações. Linhas inválidas são rejeitadas sem
+    interromper a importação.
+    """
+    
+    def __init__(self, db_connection=None, tamanho_bloco: int = TAMANHO_BLOCO_IMPORTACAO,
+                 limite_rejeicoes: int = LIMITE_REJEICOES, cache: Optional[CacheProdutos] = None):
+        """
+        Inicializa o importador
+        
+        Args:
+            db_connection: Conexão com banco (usado para testes)
+            tamanho_bloco: Linhas gravadas por transação
+            limite_rejeicoes: Rejeições guardadas no relatório
+            cache: Cache opcional de produtos, invalidado pela importação
+        """
+        if tamanho_bloco < 1:
+            raise ValueError("Tamanho do bloco deve ser maior que zero")
+        
+        self.db = db_connection or get_database_connection()
+        self.estoque_service = EstoqueService(db_connection, cache=cache)
+        self.tamanho_bloco = tamanho_bloco
+        self.limite_rejeicoes = limite_rejeicoes
+    
+    def importar(self, arquivo, delimitador: str = ",",
+                 ao_rejeitar: Optional[Callable[[LinhaRejeitada], None]] = None) -> ResultadoImportacao:
+        """
+        Importa um arquivo CSV com cabeçalho
+        
+        A coluna nome é obrigatória; descricao, preco_unitario,
+        estoque_atual e estoque_minimo são opcionais. Colunas ausentes ou
+        células vazias mantêm o valor já cadastrado (ou o padrão, em
+        produtos novos). Preços aceitam vírgula decimal.
+        
+        Args:
+            arquivo: Caminho do arquivo ou objeto de texto já aberto
+            delimitador: Separador de campos
+            ao_rejeitar: Função chamada para cada linha rejeitada
+            
+        Returns:
+            Relatório da importação
+            
+        Raises:
+            ValueError: Se o cabeçalho não tiver a coluna nome
+        """
+        if isinstance(arquivo, str):
+            with open(arquivo, newline="", encoding="utf-8-sig") as texto:
+                return self.importar(texto, delimitador, ao_rejeitar)
+        
+        inicio = time.perf_counter()
+        resultado = ResultadoImportacao()
+        leitor = csv.DictReader(arquivo, delimiter=delimitador)
+        
+        if leitor.fieldnames is None or "nome" not in leitor.fieldnames:
+            raise ValueError("O arquivo deve ter cabeçalho com a coluna 'nome'")
+        
+        bloco: Dict[str, dict] = {}
+        for registro in leitor:
+            resultado.linhas_lidas += 1
+            try:
+                dados = self._converter_registro(registro)
+            except ValueError as e:
+                self._rejeitar(resultado, LinhaRejeitada(linha=leitor.line_num, motivo=str(e)), ao_rejeitar)
+                continue
+            
+            # Nome repetido no bloco: grava o bloco antes para aplicar as linhas em ordem
+            if dados["nome"] in bloco or len(bloco) >= self.tamanho_bloco:
+                self._gravar_bloco(list(bloco.values()), resultado)
+                bloco = {}
+            bloco[dados["nome"]] = dados
+        
+        if bloco:
+            self._gravar_bloco(list(bloco.values()), resultado)
+        
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+    
+    def _rejeitar(self, resultado: ResultadoImportacao, rejeicao: LinhaRejeitada,
+                  ao_rejeitar: Optional[Callable[[LinhaRejeitada], None]]) -> None:
+        """Contabiliza uma linha rejeitada"""
+        resultado.total_rejeitadas += 1
+        if len(resultado.rejeicoes) < self.limite_rejeicoes:
+            resultado.rejeicoes.append(rejeicao)
+        if ao_rejeitar is not None:
+            ao_rejeitar(rejeicao)
+    
+    def _converter_registro(self, registro: dict) -> dict:
+        """
+        Valida e converte uma linha do CSV
+        
+        Args:
+            registro: Linha lida pelo csv.DictReader
+            
+        Returns:
+            Dicionário com as colunas de COLUNAS_IMPORTACAO (None quando não informadas)
+            
+        Raises:
+            ValueError: Se algum valor for inválido
+        """
+        valores = {coluna: (registro.get(coluna) or "").strip() or None for coluna in COLUNAS_IMPORTACAO}
+        
+        if valores["nome"] is None:
+            raise ValueError("Nome do produto não informado")
+        
+        if valores["preco_unitario"] is not None:
+            texto = valores["preco_unitario"]
+            if "," in texto and "." not in texto:
+                texto = texto.replace(",", ".")
+            try:
+                valores["preco_unitario"] = float(texto)
+            except ValueError:
+                raise ValueError(f"Preço inválido: '{valores['preco_unitario']}'")
+            if not valores["preco_unitario"] >= 0:
+                raise ValueError("Preço não pode ser negativo")
+        
+        for coluna in ("estoque_atual", "estoque_minimo"):
+            if valores[coluna] is None:
+                continue
+            try:
+                valores[coluna] = int(valores[coluna])
+            except ValueError:
+                raise ValueError(f"Valor inválido para {coluna}: '{valores[coluna]}'")
+            if valores[coluna] < 0:
+                raise ValueError(f"{coluna} não pode ser negativo")
+        
+        return valores
+    
+    def _gravar_bloco(self, registros: List[dict], resultado: ResultadoImportacao) -> None:
+        """
+        Grava um bloco de produtos e os ajustes de estoque numa transação
+        
+        Args:
+            registros: Linhas convertidas, com nomes distintos
+            resultado: Relatório atualizado com os contadores do bloco
+        """
+        formato = self.db.timestamp_format
+        agora = para_banco(datetime.now(), formato)
+        nomes = [registro["nome"] for registro in registros]
+        
+        produto_service = self.estoque_service.produto_service
+        with produto_service.transacao_escrita() as cursor:
+            existentes = self._buscar_por_nome(cursor, nomes)
+            
+            parametros = []
+            for registro in registros:
+                atual = existentes.get(registro["nome"])
+                parametros.append((
+                    registro["nome"],
+                    self._valor(registro, atual, "descricao", None),
+                    self._valor(registro, atual, "preco_unitario", 0.0),
+                    self._valor(registro, atual, "estoque_minimo", 0),
+                    agora,
+                    agora,
+                ))
+            
+            cursor.executemany(SQL_UPSERT_PRODUTO, parametros)
+            gravados = cursor.rowcount
+            
+            novos = [nome for nome in nomes if nome not in existentes]
+            if novos:
+                existentes.update(self._buscar_por_nome(cursor, novos))
+            
+            ajustes = []
+            for registro in registros:
+                alvo = registro["estoque_atual"]
+                produto = existentes[registro["nome"]]
+                if alvo is None or alvo == produto["estoque_atual"]:
+                    continue
+                
+                diferenca = alvo - produto["estoque_atual"]
+                ajustes.append(Movimentacao(
+                    produto_id=produto["id"],
+                    tipo=TipoMovimentacao.ENTRADA if diferenca > 0 else TipoMovimentacao.SAIDA,
+                    quantidade=abs(diferenca),
+                    observacao=f"Ajuste de importação: estoque informado {alvo}"
+                ))
+            
+            if ajustes:
+                self.estoque_service.registrar_movimentacoes_em_lote(ajustes, cursor=cursor)
+        
+        resultado.inseridos += len(novos)
+        resultado.atualizados += gravados - len(novos)
+        resultado.inalterados += len(registros) - gravados
+        resultado.ajustes += len(ajustes)
+        
+        for nome in nomes:
+            produto_service.invalidar_cache(existentes[nome]["id"], nome)
+    
+    def _buscar_por_nome(self, cursor, nomes: Iterable[str]) -> Dict[str, dict]:
+        """Retorna o cadastro atual dos produtos com os nomes informados, indexado por nome"""
+        nomes = list(nomes)
+        produtos = {}
+        
+        for inicio in range(0, len(nomes), TAMANHO_BLOCO_IN):
+            bloco = nomes[inicio:inicio + TAMANHO_BLOCO_IN]
+            marcadores = ", ".join("?" * len(bloco))
+            cursor.execute(f"""
+                SELECT id, nome, descricao, preco_unitario, estoque_atual, estoque_minimo
+                FROM produtos WHERE nome IN ({marcadores})
+            """, bloco)
+            for row in cursor.fetchall():
+                produtos[row['nome']] = dict(row)
+        
+        return produtos
+    
+    @staticmethod
+    def _valor(registro: dict, atual: Optional[dict], coluna: str, padrao):
+        """Valor da coluna no arquivo ou, se não informado, o cadastrado (ou o padrão)"""
+        if registro[coluna] is not None:
+            return registro[coluna]
+        return atual[coluna] if atual is not None else padrao
@@ -0,0 +1,553 @@
+"""
+Registro de métricas dos serviços com exportação no formato texto do Prometheus
+"""
+import functools
+import inspect
+import math
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Limites (segundos) dos buckets de latência: operações do SQLite vão de
+# dezenas de microssegundos (leituras em cache) a segundos (relatórios)
+LIMITES_LATENCIA = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Tipo de conteúdo do formato texto de exposição do Prometheus
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+Rotulos = Tuple[str, ...]
+
+
+class _Metrica:
+    """
+    Base das métricas: nome, ajuda, nomes dos rótulos e funções de coleta
+    
+    Além dos valores registrados pelo código, uma série pode ter uma
+    função, chamada a cada exportação (útil para expor contadores que já
+    existem em outro objeto, como os do pool e do cache).
+    """
+    tipo = "untyped"
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos: Rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores: Dict[Rotulos, float] = {}
+        self._funcoes: Dict[Rotulos, Callable[[], float]] = {}
+    
+    def definir_funcao(self, funcao: Callable[[], float], *valores_rotulos: str) -> None:
+        """
+        Associa à série uma função lida a cada exportação
+        
+        Args:
+            funcao: Função sem argumentos que retorna o valor atual
+            valores_rotulos: Valores dos rótulos da série
+        """
+        self._validar(valores_rotulos)
+        with self._lock:
+            self._funcoes[tuple(valores_rotulos)] = funcao
+    
+    def valor(self, *valores_rotulos: str) -> float:
+        """
+        Retorna o valor atual de uma série (0 se nunca registrada)
+        
+        Args:
+            valores_rotulos: Valores dos rótulos da série
+        """
+        chave = tuple(valores_rotulos)
+        with self._lock:
+            funcao = self._funcoes.get(chave)
+            valor = self._valores.get(chave, 0.0)
+        return float(funcao()) if funcao is not None else valor
+    
+    def amostras(self) -> Iterator[Tuple[str, Rotulos, Rotulos, float]]:
+        """
+        Percorre as séries para a exportação
+        
+        Yields:
+            Tuplas (nome, nomes dos rótulos, valores dos rótulos, valor)
+        """
+        with self._lock:
+            valores = dict(self._valores)
+            funcoes = dict(self._funcoes)
+        
+        for chave, funcao in funcoes.items():
+            valores[chave] = float(funcao())
+        
+        for chave in sorted(valores):
+            yield self.nome, self.rotulos, chave, valores[chave]
+    
+    def _validar(self, valores_rotulos: Sequence[str]) -> None:
+        """Confere a quantidade de valores de rótulos"""
+        if len(valores_rotulos) != len(self.rotulos):
+            raise ValueError(
+                f"Métrica '{self.nome}' espera os rótulos {self.rotulos}, recebeu {tuple(valores_rotulos)}"
+            )
+
+
+class Contador(_Metrica):
+    """Valor que só aumenta (chamadas, erros)"""
+    tipo = "counter"
+    
+    def incrementar(self, *valores_rotulos: str, quantidade: float = 1) -> None:
+        """
+        Soma uma quantidade à série
+        
+        Args:
+            valores_rotulos: Valores dos rótulos da série
+            quantidade: Valor somado (não negativo)
+            
+        Raises:
+            ValueError: Se a quantidade for negativa
+        """
+        if quantidade < 0:
+            raise ValueError("Contadores só podem ser incrementados")
+        
+        chave = tuple(valores_rotulos)
+        with self._lock:
+            if chave not in self._valores:
+                self._validar(chave)
+                self._valores[chave] = 0.0
+            self._valores[chave] += quantidade
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce (conexões em uso, itens no cache)"""
+    tipo = "gauge"
+    
+    def definir(self, valor: float, *valores_rotulos: str) -> None:
+        """
+        Define o valor da série
+        
+        Args:
+            valor: Novo valor
+            valores_rotulos: Valores dos rótulos da série
+        """
+        self._validar(valores_rotulos)
+        with self._lock:
+            self._valores[tuple(valores_rotulos)] = float(valor)
+
+
+class Histograma(_Metrica):
+    """
+    Distribuição de valores em buckets cumulativos (latências)
+    
+    Cada série guarda a contagem por bucket, a soma e o total de
+    observações, como o tipo histogram do Prometheus.
+    """
+    tipo = "histogram"
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series: Dict[Rotulos, List] = {}
+    
+    def observar(self, valor: float, *valores_rotulos: str) -> None:
+        """
+        Registra uma observação
+        
+        Args:
+            valor: Valor observado (segundos, para latências)
+            valores_rotulos: Valores dos rótulos da série
+        """
+        chave = tuple(valores_rotulos)
+        indice = bisect_left(self.limites, valor)
+        
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                self._validar(chave)
+                # Contagens por bucket (o último é +Inf), soma e total
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+    
+    def observador(self, *valores_rotulos: str) -> Callable[[float], None]:
+        """
+        Retorna uma função que registra observações em uma série fixa
+        
+        A série é criada aqui: cada observação evita montar e procurar a
+        chave dos rótulos (usado no caminho quente dos serviços).
+        
+        Args:
+            valores_rotulos: Valores dos rótulos da série
+            
+        Returns:
+            Função que recebe o valor observado
+        """
+        self._validar(valores_rotulos)
+        with self._lock:
+            serie = self._series.setdefault(tuple(valores_rotulos), [[0] * (len(self.limites) + 1), 0.0, 0])
+        
+        contagens, limites, lock = serie[0], self.limites, self._lock
+        
+        def observar(valor: float) -> None:
+            indice = bisect_left(limites, valor)
+            with lock:
+                contagens[indice] += 1
+                serie[1] += valor
+                serie[2] += 1
+        
+        return observar
+    
+    def contagem(self, *valores_rotulos: str) -> int:
+        """Total de observações da série"""
+        with self._lock:
+            serie = self._series.get(tuple(valores_rotulos))
+            return serie[2] if serie else 0
+    
+    def quantil(self, q: float, *valores_rotulos: str) -> float:
+        """
+        Estima um quantil da série a partir dos buckets
+        
+        Usa a mesma interpolação linear dentro do bucket que
+        histogram_quantile do Prometheus.
+        
+        Args:
+            q: Quantil entre 0 e 1 (0.99 para o p99)
+            valores_rotulos: Valores dos rótulos da série
+            
+        Returns:
+            Valor estimado (NaN sem observações)
+        """
+        with self._lock:
+            serie = self._series.get(tuple(valores_rotulos))
+            if not serie or not serie[2]:
+                return math.nan
+            contagens, total = list(serie[0]), serie[2]
+        
+        alvo = q * total
+        acumulado = 0
+        for indice, contagem in enumerate(contagens):
+            if acumulado + contagem >= alvo and contagem:
+                if indice == len(self.limites):
+                    return self.limites[-1]
+                inferior = self.limites[indice - 1] if indice else 0.0
+                return inferior + (self.limites[indice] - inferior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+        return self.limites[-1]
+    
+    def amostras(self) -> Iterator[Tuple[str, Rotulos, Rotulos, float]]:
+        with self._lock:
+            series = {chave: (list(serie[0]), serie[1], serie[2]) for chave, serie in self._series.items()}
+        
+        nomes_bucket = self.rotulos + ("le",)
+        for chave in sorted(series):
+            contagens, soma, total = series[chave]
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (math.inf,), contagens):
+                acumulado += contagem
+                yield f"{self.nome}_bucket", nomes_bucket, chave + (_formatar_numero(limite),), acumulado
+            yield f"{self.nome}_sum", self.rotulos, chave, soma
+            yield f"{self.nome}_count", self.rotulos, chave, total
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas exportadas juntas
+    
+    As métricas são criadas (ou reaproveitadas, pelo nome) com contador,
+    medidor e histograma, e exportadas no formato texto do Prometheus por
+    exportar_prometheus, gravar_arquivo ou iniciar_servidor.
+    """
+    
+    def __init__(self):
+        """Inicializa um registro vazio"""
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, _Metrica] = {}
+    
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        """Retorna o contador com o nome, criando-o se necessário"""
+        return self._obter(Contador, nome, ajuda, rotulos)
+    
+    def medidor(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Medidor:
+        """Retorna o medidor com o nome, criando-o se necessário"""
+        return self._obter(Medidor, nome, ajuda, rotulos)
+    
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_LATENCIA) -> Histograma:
+        """Retorna o histograma com o nome, criando-o se necessário"""
+        return self._obter(Histograma, nome, ajuda, rotulos, limites=limites)
+    
+    def obter(self, nome: str) -> Optional[_Metrica]:
+        """
+        Retorna a métrica registrada com o nome
+        
+        Args:
+            nome: Nome da métrica
+            
+        Returns:
+            Métrica ou None
+        """
+        with self._lock:
+            return self._metricas.get(nome)
+    
+    def observar_pool(self, db_connection) -> None:
+        """
+        Expõe o estado do pool de conexões como medidores e contadores
+        
+        Os valores são lidos de pool_metrics() a cada exportação.
+        
+        Args:
+            db_connection: Instância de DatabaseConnection
+        """
+        banco = str(db_connection.db_path)
+        metricas = db_connection.pool_metrics
+        
+        conexoes = self.medidor("estoque_pool_conexoes", "Conexões do pool por estado", ("banco", "estado"))
+        conexoes.definir_funcao(lambda: metricas().open_connections, banco, "abertas")
+        conexoes.definir_funcao(lambda: metricas().in_use, banco, "em_uso")
+        conexoes.definir_funcao(lambda: metricas().idle, banco, "ociosas")
+        self.medidor("estoque_pool_tamanho_maximo", "Conexões permitidas no pool", ("banco",)).definir_funcao(
+            lambda: metricas().max_size, banco
+        )
+        self.contador("estoque_pool_checkouts_total", "Reservas de conexão", ("banco",)).definir_funcao(
+            lambda: metricas().checkouts, banco
+        )
+        self.contador("estoque_pool_esperas_total", "Reservas que aguardaram conexão livre", ("banco",)).definir_funcao(
+            lambda: metricas().waits, banco
+        )
+        self.contador("estoque_pool_timeouts_total", "Reservas que esgotaram o timeout", ("banco",)).definir_funcao(
+            lambda: metricas().timeouts, banco
+        )
+        self.contador("estoque_pool_espera_segundos_total", "Tempo total de espera por conexão",
+                      ("banco",)).definir_funcao(lambda: metricas().total_wait_time, banco)
+    
+    def observar_cache(self, cache, nome: str = "produtos") -> None:
+        """
+        Expõe os contadores de um CacheProdutos
+        
+        Args:
+            cache: Instância de CacheProdutos
+            nome: Valor do rótulo 'cache'
+        """
+        estatisticas = cache.estatisticas
+        
+        for campo, ajuda in (("acertos", "Consultas atendidas pelo cache"),
+                             ("falhas", "Consultas que foram ao banco"),
+                             ("remocoes", "Itens removidos por capacidade ou expiração"),
+                             ("invalidacoes", "Invalidações por escrita")):
+            self.contador(f"estoque_cache_{campo}_total", ajuda, ("cache",)).definir_funcao(
+                lambda campo=campo: getattr(estatisticas(), campo), nome
+            )
+        self.medidor("estoque_cache_itens", "Itens no cache", ("cache",)).definir_funcao(
+            lambda: estatisticas().tamanho, nome
+        )
+        self.medidor("estoque_cache_capacidade", "Capacidade do cache", ("cache",)).definir_funcao(
+            lambda: estatisticas().capacidade, nome
+        )
+    
+    def exportar_prometheus(self) -> str:
+        """
+        Gera o texto de exposição do Prometheus com todas as métricas
+        
+        Returns:
+            Texto no formato 0.0.4 (uma família por métrica, com HELP e TYPE)
+        """
+        with self._lock:
+            metricas = sorted(self._metricas.values(), key=lambda metrica: metrica.nome)
+        
+        linhas = []
+        for metrica in metricas:
+            linhas.append(f"# HELP {metrica.nome} {_escapar_ajuda(metrica.ajuda)}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            for nome, rotulos, valores, valor in metrica.amostras():
+                if rotulos:
+                    pares = ",".join(f'{rotulo}="{_escapar_rotulo(v)}"' for rotulo, v in zip(rotulos, valores))
+                    linhas.append(f"{nome}{{{pares}}} {_formatar_numero(valor)}")
+                else:
+                    linhas.append(f"{nome} {_formatar_numero(valor)}")
+        
+        return "\n".join(linhas) + "\n"
+    
+    def gravar_arquivo(self, caminho: str) -> None:
+        """
+        Grava a exportação em um arquivo, de forma atômica
+        
+        O texto é gravado em um arquivo temporário no mesmo diretório e
+        renomeado: quem lê o arquivo (por exemplo, o textfile collector do
+        node_exporter) nunca vê uma exportação pela metade.
+        
+        Args:
+            caminho: Caminho do arquivo (.prom)
+        """
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".metricas-", suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+                arquivo.write(self.exportar_prometheus())
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+    
+    def iniciar_servidor(self, porta: int = 9464, endereco: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve a exportação por HTTP (GET /metrics) em uma thread daemon
+        
+        Args:
+            porta: Porta TCP (0 escolhe uma livre)
+            endereco: Endereço de escuta; o padrão aceita apenas conexões locais
+            
+        Returns:
+            Servidor em execução (encerre com shutdown() e server_close())
+        """
+        registro = self
+        
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                
+                corpo = registro.exportar_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE_PROMETHEUS)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+            
+            def log_message(self, *args):
+                pass
+        
+        servidor = ThreadingHTTPServer((endereco, porta), Manipulador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="estoque-metricas", daemon=True).start()
+        return servidor
+    
+    def _obter(self, classe, nome: str, ajuda: str, rotulos: Sequence[str], **kwargs) -> _Metrica:
+        """Retorna a métrica existente ou registra uma nova"""
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **kwargs)
+            elif not isinstance(metrica, classe) or metrica.rotulos != tuple(rotulos):
+                raise ValueError(f"Métrica '{nome}' já registrada com outro tipo ou rótulos")
+            return metrica
+
+
+# Registro usado pelos serviços instrumentados
+REGISTRO_PADRAO = RegistroMetricas()
+
+
+def nao_medir(funcao):
+    """
+    Marca um método público de infraestrutura para instrumentar ignorá-lo
+    
+    Usado em auxiliares que outros serviços chamam a cada operação (como
+    transações e invalidação de cache): medi-los inflaria as chamadas do
+    serviço e, em context managers, mediria só a criação do objeto.
+    
+    Args:
+        funcao: Método a excluir (aplicar por fora de @contextmanager)
+        
+    Returns:
+        O próprio método, marcado
+    """
+    funcao.nao_medir = True
+    return funcao
+
+
+def instrumentar(servico: str, registro: RegistroMetricas = REGISTRO_PADRAO):
+    """
+    Decorador de classe que mede os métodos públicos de um serviço
+    
+    Cada método público definido na classe passa a registrar, com os
+    rótulos servico e metodo:
+    
+    - estoque_chamadas_total: chamadas concluídas (com ou sem erro);
+    - estoque_erros_total: exceções, também pelo rótulo excecao (nome da classe);
+    - estoque_duracao_segundos: histograma da duração, com ou sem erro.
+    
+    Em geradores, a duração vai da primeira leitura até o fim da iteração.
+    Chamadas internas entre métodos públicos também são contadas. Métodos
+    marcados com nao_medir não são medidos.
+    
+    Args:
+        servico: Valor do rótulo servico ('produto', 'estoque')
+        registro: Registro onde as métricas são criadas
+        
+    Returns:
+        Decorador de classe
+    """
+    chamadas = registro.contador("estoque_chamadas_total", "Chamadas aos métodos dos serviços",
+                                 ("servico", "metodo"))
+    erros = registro.contador("estoque_erros_total", "Exceções lançadas pelos métodos dos serviços",
+                              ("servico", "metodo", "excecao"))
+    duracao = registro.histograma("estoque_duracao_segundos", "Duração dos métodos dos serviços",
+                                  ("servico", "metodo"))
+    
+    def medir(metodo: str, funcao):
+        # As chamadas são o total de observações do histograma: no caminho
+        # quente, cada chamada faz uma única atualização sob lock
+        observar = duracao.observador(servico, metodo)
+        chamadas.definir_funcao(lambda: duracao.contagem(servico, metodo), servico, metodo)
+        relogio = time.perf_counter
+        
+        if inspect.isgeneratorfunction(funcao):
+            @functools.wraps(funcao)
+            def gerador_medido(*args, **kwargs):
+                inicio = relogio()
+                try:
+                    yield from funcao(*args, **kwargs)
+                except Exception as e:
+                    erros.incrementar(servico, metodo, type(e).__name__)
+                    raise
+                finally:
+                    observar(relogio() - inicio)
+            
+            return gerador_medido
+        
+        @functools.wraps(funcao)
+        def medido(*args, **kwargs):
+            inicio = relogio()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception as e:
+                erros.incrementar(servico, metodo, type(e).__name__)
+                raise
+            finally:
+                observar(relogio() - inicio)
+        
+        return medido
+    
+    def decorar(classe):
+        for nome, atributo in list(vars(classe).items()):
+            if not nome.startswith("_") and inspect.isfunction(atributo) and not getattr(atributo, "nao_medir", False):
+                setattr(classe, nome, medir(nome, atributo))
+        return classe
+    
+    return decorar
+
+
+def _formatar_numero(valor: float) -> str:
+    """Formata um valor como no formato texto do Prometheus"""
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if math.isnan(valor):
+        return "NaN"
+    if float(valor).is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar_rotulo(valor: str) -> str:
+    """Escapa barra invertida, aspas e quebra de linha em valores de rótulos"""
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escapar_ajuda(texto: str) -> str:
+    """Escapa barra invertida e quebra de linha no texto de HELP"""
+    return texto.replace("\\", "\\\\").replace("\n", "\\n")
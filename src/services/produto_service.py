@@ -2,25 +2,42 @@
 Serviço para gerenciamento de produtos
 """
 import sqlite3
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
 
 from ..models.produto import Produto
+from ..models.datas import para_banco
 from ..database.connection import get_database_connection
 from ..exceptions.estoque_exceptions import ProdutoNaoEncontradoException
+from .cache_produtos import CacheProdutos, ler_geracao_produtos
+from .metricas import instrumentar, nao_medir
 
 
+# Quantidade máxima de parâmetros por consulta IN (...)
+TAMANHO_BLOCO_IN = 500
+
+
+@instrumentar("produto")
 class ProdutoService:
-    """Serviço para operações CRUD de produtos"""
+    """
+    Serviço para operações CRUD de produtos
+    
+    Os métodos públicos são medidos pelo registro de métricas (ver
+    src/services/metricas.py), exceto os auxiliares transacao_escrita e
+    invalidar_cache, usados também pelas escritas de estoque.
+    """
     
-    def __init__(self, db_connection=None):
+    def __init__(self, db_connection=None, cache: Optional[CacheProdutos] = None):
         """
         Inicializa o serviço
         
         Args:
             db_connection: Conexão com banco (usado para testes)
+            cache: Cache opcional para buscas por ID e por nome
         """
         self.db = db_connection or get_database_connection()
+        self.cache = cache
     
     def criar_produto(self, produto: Produto) -> Produto:
         """
@@ -35,21 +52,26 @@ class ProdutoService:
         Raises:
             ValueError: Se já existe produto com o mesmo nome
         """
-        with self.db.get_cursor() as cursor:
+        formato = self.db.timestamp_format
+        with self.transacao_escrita() as cursor:
             try:
                 cursor.execute("""
-                    INSERT INTO produtos (nome, descricao, preco_unitario, estoque_atual, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO produtos (nome, descricao, preco_unitario, estoque_atual, estoque_inicial,
+                                          estoque_minimo, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     produto.nome,
                     produto.descricao,
                     produto.preco_unitario,
                     produto.estoque_atual,
-                    produto.created_at,
-                    produto.updated_at
+                    produto.estoque_atual,
+                    produto.estoque_minimo,
+                    para_banco(produto.created_at, formato),
+                    para_banco(produto.updated_at, formato)
                 ))
                 
                 produto.id = cursor.lastrowid
+                self.invalidar_cache(produto.id, produto.nome)
                 return produto
                 
             except sqlite3.IntegrityError as e:
@@ -70,14 +92,32 @@ class ProdutoService:
         Raises:
             ProdutoNaoEncontradoException: Se produto não for encontrado
         """
+        if self.cache is not None and not self.cache.verificar_versao:
+            produto = self.cache.obter_por_id(produto_id)
+            if produto is not None:
+                return produto
+        
         with self.db.get_cursor() as cursor:
+            if self.cache is not None:
+                if self.cache.verificar_versao:
+                    self.cache.sincronizar(cursor)
+                    produto = self.cache.obter_por_id(produto_id)
+                    if produto is not None:
+                        return produto
+                geracao = self.cache.geracao
+            
             cursor.execute("SELECT * FROM produtos WHERE id = ?", (produto_id,))
             row = cursor.fetchone()
             
             if not row:
                 raise ProdutoNaoEncontradoException(produto_id)
             
-            return self._row_to_produto(row)
+            produto = self._row_to_produto(row)
+            
+            if self.cache is not None:
+                self.cache.armazenar(produto, geracao)
+            
+            return produto
     
     def buscar_produto_por_nome(self, nome: str) -> Produto:
         """
@@ -92,14 +132,75 @@ class ProdutoService:
         Raises:
             ProdutoNaoEncontradoException: Se produto não for encontrado
         """
+        if self.cache is not None and not self.cache.verificar_versao:
+            produto = self.cache.obter_por_nome(nome)
+            if produto is not None:
+                return produto
+        
         with self.db.get_cursor() as cursor:
+            if self.cache is not None:
+                if self.cache.verificar_versao:
+                    self.cache.sincronizar(cursor)
+                    produto = self.cache.obter_por_nome(nome)
+                    if produto is not None:
+                        return produto
+                geracao = self.cache.geracao
+            
             cursor.execute("SELECT * FROM produtos WHERE nome = ?", (nome,))
             row = cursor.fetchone()
             
             if not row:
                 raise ProdutoNaoEncontradoException(nome)
             
-            return self._row_to_produto(row)
+            produto = self._row_to_produto(row)
+            
+            if self.cache is not None:
+                self.cache.armazenar(produto, geracao)
+            
+            return produto
+    
+    def buscar_produtos_por_ids(self, produto_ids: Iterable[int]) -> Dict[int, Produto]:
+        """
+        Busca vários produtos pelo ID em poucas consultas
+        
+        Os IDs são consultados em blocos de TAMANHO_BLOCO_IN com IN (...),
+        em vez de uma consulta por produto. Com cache configurado, apenas os
+        IDs ausentes do cache vão ao banco.
+        
+        Args:
+            produto_ids: IDs dos produtos (repetições são ignoradas)
+            
+        Returns:
+            Dicionário ID -> Produto; IDs inexistentes ficam de fora
+        """
+        pendentes = list(dict.fromkeys(produto_ids))
+        produtos: Dict[int, Produto] = {}
+        
+        if self.cache is not None and not self.cache.verificar_versao:
+            pendentes = self._obter_do_cache(pendentes, produtos)
+            if not pendentes:
+                return produtos
+        
+        with self.db.get_cursor() as cursor:
+            if self.cache is not None:
+                if self.cache.verificar_versao:
+                    self.cache.sincronizar(cursor)
+                    pendentes = self._obter_do_cache(pendentes, produtos)
+                geracao = self.cache.geracao
+            
+            for inicio in range(0, len(pendentes), TAMANHO_BLOCO_IN):
+                bloco = pendentes[inicio:inicio + TAMANHO_BLOCO_IN]
+                marcadores = ", ".join("?" * len(bloco))
+                cursor.execute(f"SELECT * FROM produtos WHERE id IN ({marcadores})", bloco)
+                
+                for row in cursor.fetchall():
+                    produto = self._row_to_produto(row)
+                    produtos[produto.id] = produto
+                    
+                    if self.cache is not None:
+                        self.cache.armazenar(produto, geracao)
+        
+        return produtos
     
     def listar_produtos(self) -> List[Produto]:
         """
@@ -131,25 +232,27 @@ class ProdutoService:
             raise ValueError("Produto deve ter ID para ser atualizado")
         
         # Verifica se produto existe
-        self.buscar_produto_por_id(produto.id)
+        anterior = self.buscar_produto_por_id(produto.id)
         
         produto.updated_at = datetime.now()
         
-        with self.db.get_cursor() as cursor:
+        with self.transacao_escrita() as cursor:
             cursor.execute("""
                 UPDATE produtos 
-                SET nome = ?, descricao = ?, preco_unitario = ?, estoque_atual = ?, updated_at = ?
+                SET nome = ?, descricao = ?, preco_unitario = ?, estoque_atual = ?, estoque_minimo = ?, updated_at = ?
                 WHERE id = ?
             """, (
                 produto.nome,
                 produto.descricao,
                 produto.preco_unitario,
                 produto.estoque_atual,
-                produto.updated_at,
+                produto.estoque_minimo,
+                para_banco(produto.updated_at, self.db.timestamp_format),
                 produto.id
             ))
-            
-            return produto
+        
+        self.invalidar_cache(produto.id, anterior.nome)
+        return produto
     
     def excluir_produto(self, produto_id: int) -> None:
         """
@@ -164,8 +267,10 @@ class ProdutoService:
         # Verifica se produto existe
         self.buscar_produto_por_id(produto_id)
         
-        with self.db.get_cursor() as cursor:
+        with self.transacao_escrita() as cursor:
             cursor.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
+        
+        self.invalidar_cache(produto_id)
     
     def atualizar_estoque(self, produto_id: int, nova_quantidade: int) -> Produto:
         """
@@ -190,6 +295,99 @@ class ProdutoService:
         
         return self.atualizar_produto(produto)
     
+    def definir_estoque_minimo(self, produto_id: int, estoque_minimo: int) -> Produto:
+        """
+        Define o ponto de reposição de um produto
+        
+        Args:
+            produto_id: ID do produto
+            estoque_minimo: Quantidade a partir da qual o produto precisa de reposição
+            
+        Returns:
+            Produto atualizado
+            
+        Raises:
+            ProdutoNaoEncontradoException: Se produto não for encontrado
+            ValueError: Se o estoque mínimo for negativo
+        """
+        if estoque_minimo < 0:
+            raise ValueError("Estoque mínimo não pode ser negativo")
+        
+        produto = self.buscar_produto_por_id(produto_id)
+        produto.estoque_minimo = estoque_minimo
+        
+        return self.atualizar_produto(produto)
+    
+    @nao_medir
+    @contextmanager
+    def transacao_escrita(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Abre uma transação de escrita (BEGIN IMMEDIATE) para alterar produtos
+        
+        Com cache que verifica a versão do banco, a geração dos produtos é lida
+        no início e no fim da transação e, após o commit, informada ao cache
+        (CacheProdutos.registrar_escrita), para que as outras conexões do
+        pool não tratem a escrita como externa. Dentro de uma transação já
+        aberta, apenas devolve o cursor: quem a abriu responde por ela.
+        
+        Yields:
+            Cursor dentro da transação
+        """
+        with self.db.get_cursor() as cursor:
+            if cursor.connection.in_transaction:
+                yield cursor
+                return
+            
+            cursor.execute("BEGIN IMMEDIATE")
+            if self.cache is None or not self.cache.verificar_versao:
+                yield cursor
+                return
+            
+            antes = ler_geracao_produtos(cursor)
+            yield cursor
+            depois = ler_geracao_produtos(cursor)
+        
+        self.cache.registrar_escrita(antes, depois)
+    
+    @nao_medir
+    def invalidar_cache(self, produto_id: Optional[int] = None, nome: Optional[str] = None) -> None:
+        """
+        Remove um produto do cache, se houver cache configurado
+        
+        Sem argumentos, descarta o cache inteiro.
+        
+        Args:
+            produto_id: ID do produto
+            nome: Nome do produto
+        """
+        if self.cache is None:
+            return
+        
+        if produto_id is None and nome is None:
+            self.cache.limpar()
+        else:
+            self.cache.invalidar(produto_id, nome)
+    
+    def _obter_do_cache(self, produto_ids: List[int], produtos: Dict[int, Produto]) -> List[int]:
+        """
+        Copia para 'produtos' os produtos já presentes no cache
+        
+        Args:
+            produto_ids: IDs procurados
+            produtos: Dicionário ID -> Produto a completar
+            
+        Returns:
+            IDs que não estavam no cache
+        """
+        pendentes = []
+        for produto_id in produto_ids:
+            produto = self.cache.obter_por_id(produto_id)
+            if produto is not None:
+                produtos[produto_id] = produto
+            else:
+                pendentes.append(produto_id)
+        return pendentes
+    
     def _row_to_produto(self, row) -> Produto:
         """
         Converte uma linha do banco em objeto Produto
@@ -200,12 +398,4 @@ class ProdutoService:
         Returns:
             Instância de Produto
         """
-        return Produto(
-            id=row['id'],
-            nome=row['nome'],
-            descricao=row['descricao'],
-            preco_unitario=row['preco_unitario'],
-            estoque_atual=row['estoque_atual'],
-            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-            updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
-        )
+        return Produto.from_row(row)
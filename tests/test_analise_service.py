@@ -0,0 +1,120 @@
+"""
+Testes unitários para o AnaliseService
+"""
+import pytest
+import tempfile
+import os
+import shutil
+from datetime import datetime, timedelta
+
+np = pytest.importorskip("numpy")
+
+from src.models.produto import Produto
+from src.models.movimentacao import Movimentacao, TipoMovimentacao
+from src.models.datas import FORMATO_EPOCH, FORMATO_TEXTO
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.analise_service import AnaliseService
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+
+
+class TestAnaliseService:
+    """Testes para as análises vetorizadas de movimentações"""
+    
+    @pytest.fixture(autouse=True, params=[FORMATO_EPOCH, FORMATO_TEXTO])
+    def setup_method(self, request):
+        """Setup executado antes de cada teste, nos dois formatos de timestamp"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection, formato_timestamp=request.param)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.analise_service = AnaliseService(self.db_connection, tamanho_bloco=3)
+        
+        self.caneta = self.produto_service.criar_produto(Produto(nome="Caneta", estoque_atual=10))
+        self.lapis = self.produto_service.criar_produto(Produto(nome="Lápis", estoque_atual=0))
+        self.borracha = self.produto_service.criar_produto(Produto(nome="Borracha", estoque_atual=5))
+        
+        # Dois dias de movimentações, com horários fixos (com fração de
+        # segundo: em texto, valores sem fração são lidos como UTC)
+        self.dia1 = datetime(2024, 3, 10, 9, 0, 0, 500)
+        self.dia2 = datetime(2024, 3, 11, 15, 30, 0, 500)
+        entrada, saida = TipoMovimentacao.ENTRADA, TipoMovimentacao.SAIDA
+        self.estoque_service.registrar_movimentacoes_em_lote([
+            Movimentacao(produto_id=produto.id, tipo=tipo, quantidade=quantidade, created_at=instante)
+            for produto, tipo, quantidade, instante in [
+                (self.caneta, entrada, 20, self.dia1),
+                (self.caneta, saida, 5, self.dia1),
+                (self.lapis, entrada, 8, self.dia1),
+                (self.caneta, saida, 10, self.dia2),
+                (self.lapis, saida, 3, self.dia2),
+            ]
+        ])
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_carregar_colunas_em_blocos(self):
+        """Testa a leitura das colunas em arrays, bloco a bloco"""
+        blocos = list(self.analise_service.carregar_colunas(("produto_id", "quantidade")))
+        
+        assert [len(bloco["produto_id"]) for bloco in blocos] == [3, 2]
+        quantidades = np.concatenate([bloco["quantidade"] for bloco in blocos])
+        assert quantidades.tolist() == [20, -5, 8, -10, -3]
+        
+        with pytest.raises(ValueError):
+            list(self.analise_service.carregar_colunas(("preco",)))
+    
+    def test_totais_por_produto(self):
+        """Testa os totais de entradas e saídas de cada produto"""
+        totais = self.analise_service.totais_por_produto()
+        
+        assert totais.produto_ids.tolist() == [self.caneta.id, self.lapis.id]
+        assert totais.entradas.tolist() == [20, 8]
+        assert totais.saidas.tolist() == [15, 3]
+        assert totais.liquido.tolist() == [5, 5]
+        assert totais.movimentacoes.tolist() == [3, 2]
+    
+    def test_totais_por_produto_no_periodo(self):
+        """Testa o filtro de período dos totais"""
+        totais = self.analise_service.totais_por_produto(inicio=self.dia2)
+        
+        assert totais.produto_ids.tolist() == [self.caneta.id, self.lapis.id]
+        assert totais.saidas.tolist() == [10, 3]
+        assert totais.entradas.tolist() == [0, 0]
+    
+    def test_fluxo_por_dia(self):
+        """Testa o fluxo agrupado por dia local"""
+        fluxo = self.analise_service.fluxo_por_periodo("dia")
+        
+        assert fluxo.datas() == [datetime(2024, 3, 10), datetime(2024, 3, 11)]
+        assert fluxo.entradas.tolist() == [28, 0]
+        assert fluxo.saidas.tolist() == [5, 13]
+        assert fluxo.movimentacoes.tolist() == [3, 2]
+    
+    def test_fluxo_por_hora_de_um_produto(self):
+        """Testa o fluxo por hora filtrado por produto"""
+        fluxo = self.analise_service.fluxo_por_periodo("hora", produto_id=self.caneta.id)
+        
+        assert fluxo.datas() == [datetime(2024, 3, 10, 9), datetime(2024, 3, 11, 15)]
+        assert fluxo.liquido.tolist() == [15, -10]
+        
+        with pytest.raises(ValueError):
+            self.analise_service.fluxo_por_periodo("mes")
+    
+    def test_giro_por_produto(self):
+        """Testa o giro reconstruindo o estoque no início e no fim do período"""
+        giro = self.analise_service.giro_por_produto(self.dia1 - timedelta(hours=1), self.dia2)
+        
+        # Caneta: 10 no início, 25 no fim do período (a saída do dia 2 fica de fora)
+        assert giro.produto_ids.tolist() == [self.caneta.id, self.lapis.id, self.borracha.id]
+        assert giro.saidas.tolist() == [5, 0, 0]
+        assert giro.estoque_medio.tolist() == [17.5, 4.0, 5.0]
+        assert giro.giro[0] == pytest.approx(5 / 17.5)
+        assert giro.giro[1:].tolist() == [0.0, 0.0]
@@ -0,0 +1,150 @@
+"""
+Testes unitários para a fachada asyncio dos serviços
+"""
+import asyncio
+import pytest
+import tempfile
+import os
+import shutil
+import threading
+
+from src.models.produto import Produto
+from src.services.async_service import AsyncEstoqueService, AsyncProdutoService, ExecutorBanco
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.exceptions.estoque_exceptions import EstoqueInsuficienteException, ProdutoNaoEncontradoException
+
+
+class TestAsyncService:
+    """Testes para AsyncProdutoService e AsyncEstoqueService"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_operacoes_basicas(self):
+        """Testa cadastro, movimentações e consultas pela fachada assíncrona"""
+        async def cenario():
+            executor = ExecutorBanco()
+            produtos = AsyncProdutoService(self.db_connection, executor=executor)
+            estoque = AsyncEstoqueService(self.db_connection, executor=executor)
+            
+            produto = await produtos.criar_produto(Produto(nome="Produto Async", estoque_atual=5))
+            await estoque.registrar_entrada(produto.id, 10)
+            await estoque.registrar_saida(produto.id, 3)
+            
+            with pytest.raises(EstoqueInsuficienteException):
+                await estoque.registrar_saida(produto.id, 100)
+            with pytest.raises(ProdutoNaoEncontradoException):
+                await produtos.buscar_produto_por_id(999)
+            
+            saldo = await estoque.obter_saldo_produto(produto.id)
+            atual = await produtos.buscar_produto_por_nome("Produto Async")
+            movimentacoes = [mov async for mov in estoque.iterar_movimentacoes(tamanho_bloco=1)]
+            
+            executor.fechar()
+            return saldo, atual.estoque_atual, len(movimentacoes)
+        
+        assert asyncio.run(cenario()) == (12, 12, 2)
+    
+    def test_iterar_movimentacoes_com_limite(self):
+        """Testa que a iteração assíncrona respeita o limite e o cursor"""
+        async def cenario():
+            async with AsyncEstoqueService(self.db_connection) as estoque:
+                produtos = AsyncProdutoService(self.db_connection, executor=estoque.executor)
+                produto = await produtos.criar_produto(Produto(nome="Produto Iterado"))
+                for _ in range(7):
+                    await estoque.registrar_entrada(produto.id, 1)
+                
+                todas = [mov.id async for mov in estoque.iterar_movimentacoes()]
+                limitadas = [mov.id async for mov in estoque.iterar_movimentacoes(limite=5, tamanho_bloco=2)]
+                nenhuma = [mov.id async for mov in estoque.iterar_movimentacoes(limite=0)]
+                return todas, limitadas, nenhuma
+        
+        todas, limitadas, nenhuma = asyncio.run(cenario())
+        
+        assert len(todas) == 7
+        assert limitadas == todas[:5]
+        assert nenhuma == []
+    
+    def test_muitas_requisicoes_concorrentes(self):
+        """Testa milhares de requisições simultâneas com contrapressão"""
+        async def cenario():
+            async with AsyncEstoqueService(self.db_connection, executor=ExecutorBanco(max_pendentes=64)) as estoque:
+                produtos = AsyncProdutoService(self.db_connection, executor=estoque.executor)
+                produto = await produtos.criar_produto(Produto(nome="Produto Concorrido", estoque_atual=0))
+                
+                escritas = [estoque.registrar_entrada(produto.id, 1) for _ in range(1000)]
+                leituras = [estoque.verificar_estoque_disponivel(produto.id, 0) for _ in range(1000)]
+                resultados = await asyncio.gather(*escritas, *leituras)
+                
+                final = await produtos.buscar_produto_por_id(produto.id)
+                return resultados, final.estoque_atual
+        
+        resultados, estoque_final = asyncio.run(cenario())
+        
+        assert len(resultados) == 2000
+        assert estoque_final == 1000
+    
+    def test_escrita_lenta_nao_bloqueia_loop(self):
+        """Testa que o event loop continua respondendo durante uma escrita bloqueada"""
+        liberar = threading.Event()
+        
+        async def cenario():
+            async with AsyncEstoqueService(self.db_connection) as estoque:
+                estoque.servico.registrar_entrada = lambda *args: liberar.wait(5)
+                escrita = asyncio.ensure_future(estoque.registrar_entrada(1, 1))
+                
+                ticks = 0
+                for _ in range(5):
+                    await asyncio.sleep(0.001)
+                    ticks += 1
+                
+                liberar.set()
+                await escrita
+                return ticks
+        
+        assert asyncio.run(cenario()) == 5
+    
+    def test_cancelamento_de_escrita_na_fila(self):
+        """Testa que cancelar uma escrita ainda na fila impede sua execução"""
+        liberar = threading.Event()
+        
+        async def cenario():
+            async with AsyncEstoqueService(self.db_connection) as estoque:
+                produtos = AsyncProdutoService(self.db_connection, executor=estoque.executor)
+                produto = await produtos.criar_produto(Produto(nome="Produto Cancelado", estoque_atual=0))
+                
+                original = estoque.servico.registrar_entrada
+                
+                def entrada_lenta(*args):
+                    liberar.wait(5)
+                    return original(*args)
+                
+                estoque.servico.registrar_entrada = entrada_lenta
+                primeira = asyncio.ensure_future(estoque.registrar_entrada(produto.id, 1))
+                await asyncio.sleep(0.01)
+                
+                estoque.servico.registrar_entrada = original
+                segunda = asyncio.ensure_future(estoque.registrar_entrada(produto.id, 10))
+                await asyncio.sleep(0.01)
+                segunda.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await segunda
+                
+                liberar.set()
+                await primeira
+                
+                return (await produtos.buscar_produto_por_id(produto.id)).estoque_atual
+        
+        assert asyncio.run(cenario()) == 1
@@ -0,0 +1,209 @@
+"""
+Testes unitários para o cache de produtos
+"""
+import pytest
+import tempfile
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from src.models.produto import Produto
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.cache_produtos import CacheProdutos
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.exceptions.estoque_exceptions import ProdutoNaoEncontradoException
+
+
+class TestCacheProdutos:
+    """Testes para o cache LRU/TTL de produtos"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.cache = CacheProdutos(capacidade=2)
+        self.produto_service = ProdutoService(self.db_connection, cache=self.cache)
+        self.estoque_service = EstoqueService(self.db_connection, cache=self.cache)
+        
+        self.produto = self.produto_service.criar_produto(Produto(nome="Produto Cache", estoque_atual=10))
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_busca_por_id_usa_cache(self):
+        """Testa acerto e falha nas buscas por ID"""
+        primeiro = self.produto_service.buscar_produto_por_id(self.produto.id)
+        segundo = self.produto_service.buscar_produto_por_id(self.produto.id)
+        
+        assert primeiro.nome == segundo.nome == "Produto Cache"
+        assert primeiro is not segundo
+        
+        estatisticas = self.cache.estatisticas()
+        assert estatisticas.falhas == 1
+        assert estatisticas.acertos == 1
+        assert estatisticas.taxa_acerto == 0.5
+    
+    def test_busca_por_nome_usa_cache(self):
+        """Testa que a busca por nome aproveita o item carregado por ID"""
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        produto = self.produto_service.buscar_produto_por_nome("Produto Cache")
+        
+        assert produto.id == self.produto.id
+        assert self.cache.estatisticas().acertos == 1
+    
+    def test_alteracao_do_chamador_nao_afeta_cache(self):
+        """Testa que o produto retornado é uma cópia"""
+        produto = self.produto_service.buscar_produto_por_id(self.produto.id)
+        produto.estoque_atual = 999
+        
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 10
+    
+    def test_remocao_lru(self):
+        """Testa a remoção do item menos usado ao atingir a capacidade"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro"))
+        terceiro = self.produto_service.criar_produto(Produto(nome="Terceiro"))
+        
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        self.produto_service.buscar_produto_por_id(outro.id)
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        self.produto_service.buscar_produto_por_id(terceiro.id)
+        
+        estatisticas = self.cache.estatisticas()
+        assert estatisticas.remocoes == 1
+        assert estatisticas.tamanho == 2
+        assert self.cache.obter_por_id(outro.id) is None
+        assert self.cache.obter_por_id(self.produto.id) is not None
+    
+    def test_expiracao_ttl(self):
+        """Testa que itens expiram após o TTL"""
+        cache = CacheProdutos(capacidade=10, ttl=0.01)
+        cache.armazenar(self.produto)
+        
+        assert cache.obter_por_id(self.produto.id) is not None
+        time.sleep(0.02)
+        assert cache.obter_por_id(self.produto.id) is None
+    
+    def test_invalidacao_por_escritas_do_produto_service(self):
+        """Testa invalidação em atualizar_produto, atualizar_estoque e excluir_produto"""
+        produto = self.produto_service.buscar_produto_por_id(self.produto.id)
+        produto.nome = "Produto Renomeado"
+        self.produto_service.atualizar_produto(produto)
+        
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).nome == "Produto Renomeado"
+        with pytest.raises(ProdutoNaoEncontradoException):
+            self.produto_service.buscar_produto_por_nome("Produto Cache")
+        
+        self.produto_service.atualizar_estoque(self.produto.id, 3)
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 3
+        
+        self.produto_service.excluir_produto(self.produto.id)
+        with pytest.raises(ProdutoNaoEncontradoException):
+            self.produto_service.buscar_produto_por_id(self.produto.id)
+    
+    def test_invalidacao_por_movimentacoes(self):
+        """Testa invalidação pelas escritas de estoque do EstoqueService"""
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        
+        self.estoque_service.registrar_entrada(self.produto.id, 5)
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 15
+        
+        self.estoque_service.registrar_saida(self.produto.id, 2)
+        assert self.estoque_service.verificar_estoque_disponivel(self.produto.id, 13)
+        
+        self.estoque_service.registrar_movimentacoes_em_lote([(self.produto.id, "saida", 13)])
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 0
+    
+    def test_escrita_de_outra_conexao_detectada_por_data_version(self):
+        """Testa que escritas feitas fora do serviço descartam o cache"""
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        
+        externa = DatabaseConnection(self.test_db_path)
+        ProdutoService(externa).atualizar_estoque(self.produto.id, 42)
+        externa.close()
+        
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 42
+    
+    def test_escrita_externa_antes_da_primeira_sincronizacao_da_conexao(self):
+        """Testa que a primeira busca numa conexão do pool compara a geração do estoque"""
+        self.db_connection.connect()
+        try:
+            self.produto_service.buscar_produto_por_id(self.produto.id)
+            
+            externa = sqlite3.connect(self.test_db_path)
+            externa.execute("UPDATE produtos SET descricao = 'Alterada fora' WHERE id = ?", (self.produto.id,))
+            externa.commit()
+            externa.close()
+            
+            # A conexão desta thread está reservada: a thread nova recebe
+            # outra do pool, ainda não vista pelo cache
+            resultado = []
+            thread = threading.Thread(
+                target=lambda: resultado.append(self.produto_service.buscar_produto_por_id(self.produto.id))
+            )
+            thread.start()
+            thread.join()
+        finally:
+            self.db_connection.close()
+        
+        assert resultado[0].descricao == "Alterada fora"
+    
+    def test_escrita_de_conexao_irma_do_pool_nao_descarta_cache(self):
+        """Testa que escritas dos serviços em outra conexão do pool só invalidam o produto alterado"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro Cache", estoque_atual=5))
+        
+        self.db_connection.connect()
+        try:
+            self.produto_service.buscar_produto_por_id(self.produto.id)
+            
+            # A conexão desta thread está reservada: a escrita usa outra do pool
+            thread = threading.Thread(target=self.estoque_service.registrar_entrada, args=(outro.id, 3))
+            thread.start()
+            thread.join()
+            
+            acertos = self.cache.estatisticas().acertos
+            produto = self.produto_service.buscar_produto_por_id(self.produto.id)
+            alterado = self.produto_service.buscar_produto_por_id(outro.id)
+        finally:
+            self.db_connection.close()
+        
+        assert produto.estoque_atual == 10
+        assert alterado.estoque_atual == 8
+        assert self.cache.estatisticas().acertos == acertos + 1
+    
+    def test_sem_verificar_versao_acerto_nao_acessa_banco(self):
+        """Testa que, sem data_version, os acertos não reservam conexão"""
+        cache = CacheProdutos(capacidade=10, verificar_versao=False)
+        servico = ProdutoService(self.db_connection, cache=cache)
+        servico.buscar_produto_por_id(self.produto.id)
+        checkouts = self.db_connection.pool_metrics().checkouts
+        
+        for _ in range(5):
+            servico.buscar_produto_por_id(self.produto.id)
+        
+        assert self.db_connection.pool_metrics().checkouts == checkouts
+        assert cache.estatisticas().acertos == 5
+    
+    def test_busca_por_ids_completa_e_usa_cache(self):
+        """Testa que a busca em lote consulta apenas os IDs ausentes do cache"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro Cache", estoque_atual=1))
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        acertos = self.cache.estatisticas().acertos
+        
+        produtos = self.produto_service.buscar_produtos_por_ids([self.produto.id, outro.id])
+        
+        assert {produto_id: produto.nome for produto_id, produto in produtos.items()} == {
+            self.produto.id: "Produto Cache", outro.id: "Outro Cache"
+        }
+        assert self.cache.estatisticas().acertos == acertos + 1
+        assert self.cache.obter_por_id(outro.id) is not None
@@ -0,0 +1,314 @@
+"""
+Testes unitários para DatabaseConnection e o pool de conexões
+"""
+import pytest
+import tempfile
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.produto import Produto
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.database.pool import PoolTimeoutError
+from src.database.profiles import PROFILE_ENV_VAR, get_profile
+from src.database.tracing import TRACE_ENV_VAR, SQLTracer, TracedCursor, normalize_sql
+
+
+class TestDatabaseConnection:
+    """Testes para a conexão com banco baseada em pool"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path, pool_size=4)
+        create_tables(self.db_connection)
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_get_cursor_aninhado_reutiliza_conexao(self):
+        """Testa que cursores aninhados na mesma thread usam a mesma conexão"""
+        with self.db_connection.get_cursor() as externo:
+            with self.db_connection.get_cursor() as interno:
+                assert interno.connection is externo.connection
+        
+        metricas = self.db_connection.pool_metrics()
+        assert metricas.open_connections == 1
+        assert metricas.in_use == 0
+    
+    def test_threads_usam_conexoes_distintas(self):
+        """Testa que threads simultâneas recebem conexões diferentes"""
+        barreira = threading.Barrier(3)
+        conexoes = []
+        
+        def trabalhador():
+            with self.db_connection.get_cursor() as cursor:
+                conexoes.append(id(cursor.connection))
+                barreira.wait()
+        
+        threads = [threading.Thread(target=trabalhador) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(set(conexoes)) == 3
+        assert self.db_connection.pool_metrics().idle == 3
+    
+    def test_pool_limitado_registra_espera(self):
+        """Testa que o pool não ultrapassa o limite e contabiliza esperas"""
+        db = DatabaseConnection(self.test_db_path, pool_size=1)
+        liberar = threading.Event()
+        reservado = threading.Event()
+        
+        def segurar_conexao():
+            with db.get_cursor():
+                reservado.set()
+                liberar.wait()
+        
+        thread = threading.Thread(target=segurar_conexao)
+        thread.start()
+        reservado.wait()
+        
+        threading.Timer(0.05, liberar.set).start()
+        with db.get_cursor() as cursor:
+            cursor.execute("SELECT 1")
+        
+        thread.join()
+        metricas = db.pool_metrics()
+        db.close()
+        
+        assert metricas.max_size == 1
+        assert metricas.open_connections == 1
+        assert metricas.checkouts == 2
+        assert metricas.waits == 1
+        assert metricas.max_wait_time > 0
+    
+    def test_pool_timeout(self):
+        """Testa erro quando nenhuma conexão fica livre a tempo"""
+        db = DatabaseConnection(self.test_db_path, pool_size=1, pool_timeout=0.05)
+        liberar = threading.Event()
+        reservado = threading.Event()
+        
+        def segurar_conexao():
+            with db.get_cursor():
+                reservado.set()
+                liberar.wait()
+        
+        thread = threading.Thread(target=segurar_conexao)
+        thread.start()
+        reservado.wait()
+        
+        with pytest.raises(PoolTimeoutError):
+            with db.get_cursor():
+                pass
+        
+        liberar.set()
+        thread.join()
+        assert db.pool_metrics().timeouts == 1
+        db.close()
+    
+    def test_close_permite_reutilizar_instancia(self):
+        """Testa que a instância reabre conexões após close()"""
+        self.db_connection.close()
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM produtos")
+            assert cursor.fetchone()[0] == 0
+    
+    def test_connect_repetido_e_devolvido_por_um_close(self):
+        """Testa que connect() repetido reserva a conexão uma única vez"""
+        db = DatabaseConnection(self.test_db_path, pool_size=1, pool_timeout=0.05)
+        
+        primeira = db.connect()
+        assert db.connect() is primeira
+        assert db.pool_metrics().in_use == 1
+        
+        db.close()
+        assert db.pool_metrics().in_use == 0
+        
+        # Com pool de uma conexão, outra thread só consegue usá-la se foi devolvida
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def contar():
+                with db.get_cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM produtos")
+                    return cursor.fetchone()[0]
+            
+            assert executor.submit(contar).result() == 0
+        db.close()
+    
+    def test_servicos_compartilhados_entre_threads(self):
+        """Testa serviços usados por um pool de threads com a mesma instância"""
+        produto_service = ProdutoService(self.db_connection)
+        estoque_service = EstoqueService(self.db_connection)
+        produto = produto_service.criar_produto(Produto(nome="Produto Compartilhado", estoque_atual=50))
+        
+        def operar(i):
+            if i % 2:
+                estoque_service.registrar_entrada(produto.id, 1)
+            else:
+                estoque_service.registrar_saida(produto.id, 1)
+            return produto_service.buscar_produto_por_id(produto.id).estoque_atual
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(operar, range(200)))
+        
+        assert produto_service.buscar_produto_por_id(produto.id).estoque_atual == 50
+        assert self.db_connection.pool_metrics().open_connections <= 4
+    
+    def _pragma(self, db, nome):
+        """Lê o valor de um PRAGMA em uma conexão do pool"""
+        with db.get_cursor() as cursor:
+            cursor.execute(f"PRAGMA {nome}")
+            return cursor.fetchone()[0]
+    
+    def test_perfil_padrao_balanced(self):
+        """Testa que o perfil padrão ativa WAL com synchronous=NORMAL"""
+        assert self.db_connection.profile.name == "balanced"
+        assert self._pragma(self.db_connection, "journal_mode") == "wal"
+        assert self._pragma(self.db_connection, "synchronous") == 1
+        assert self._pragma(self.db_connection, "temp_store") == 2
+        assert self._pragma(self.db_connection, "busy_timeout") == 5000
+    
+    @pytest.mark.parametrize("nome, synchronous, cache_size", [
+        ("durable", 2, -8000),
+        ("bulk_load", 0, -256000),
+    ])
+    def test_perfil_por_conexao(self, nome, synchronous, cache_size):
+        """Testa a seleção de perfil por conexão"""
+        db = DatabaseConnection(self.test_db_path, profile=nome)
+        
+        assert self._pragma(db, "journal_mode") == "wal"
+        assert self._pragma(db, "synchronous") == synchronous
+        assert self._pragma(db, "cache_size") == cache_size
+        db.close()
+    
+    def test_perfil_por_variavel_de_ambiente(self, monkeypatch):
+        """Testa a seleção de perfil pela variável de ambiente"""
+        monkeypatch.setenv(PROFILE_ENV_VAR, "durable")
+        
+        assert DatabaseConnection(self.test_db_path).profile.name == "durable"
+        assert DatabaseConnection(self.test_db_path, profile="bulk_load").profile.name == "bulk_load"
+    
+    def test_perfil_desconhecido(self):
+        """Testa erro ao informar perfil inexistente"""
+        with pytest.raises(ValueError, match="Perfil de banco desconhecido"):
+            get_profile("turbo")
+    
+    def test_wal_leitor_nao_bloqueia_escritor(self):
+        """Testa que uma leitura em andamento não bloqueia uma escrita"""
+        db = DatabaseConnection(self.test_db_path, profile="durable")
+        produto_service = ProdutoService(db)
+        produto_service.criar_produto(Produto(nome="Produto Lido", estoque_atual=1))
+        
+        leitura_aberta = threading.Event()
+        escrita_concluida = threading.Event()
+        
+        def leitor():
+            with db.get_cursor() as cursor:
+                cursor.execute("BEGIN")
+                cursor.execute("SELECT COUNT(*) FROM produtos")
+                cursor.fetchone()
+                leitura_aberta.set()
+                escrita_concluida.wait(timeout=5)
+        
+        thread = threading.Thread(target=leitor)
+        thread.start()
+        leitura_aberta.wait()
+        
+        produto_service.criar_produto(Produto(nome="Produto Escrito", estoque_atual=1))
+        escrita_concluida.set()
+        thread.join()
+        
+        assert len(produto_service.listar_produtos()) == 2
+        db.close()
+    
+    def test_rastreamento_desativado_usa_cursor_padrao(self, monkeypatch):
+        """Testa que, sem rastreador, get_cursor não usa o cursor rastreado"""
+        monkeypatch.delenv(TRACE_ENV_VAR, raising=False)
+        db = DatabaseConnection(self.test_db_path)
+        
+        assert db.tracer is None
+        with db.get_cursor() as cursor:
+            assert type(cursor) is sqlite3.Cursor
+        db.close()
+    
+    def test_rastreamento_agrega_instrucoes_normalizadas(self):
+        """Testa a agregação por texto normalizado, com linhas e transação de escrita"""
+        produto_service = ProdutoService(self.db_connection)
+        estoque_service = EstoqueService(self.db_connection)
+        produto = produto_service.criar_produto(Produto(nome="Produto Rastreado", estoque_atual=5))
+        tracer = self.db_connection.enable_tracing(slow_threshold_ms=10_000)
+        
+        for _ in range(3):
+            estoque_service.registrar_entrada(produto.id, 2)
+        with self.db_connection.get_cursor() as cursor:
+            assert isinstance(cursor, TracedCursor)
+            for limite in (1, 2):
+                cursor.execute(f"SELECT id FROM movimentacoes WHERE quantidade = 2 LIMIT {limite}")
+                list(cursor)
+            cursor.execute("SELECT id FROM movimentacoes")
+            while cursor.fetchmany(2):
+                pass
+        
+        estatisticas = {item.statement: item for item in tracer.statistics()}
+        limitada = estatisticas["SELECT id FROM movimentacoes WHERE quantidade = ? LIMIT ?"]
+        assert (limitada.calls, limitada.rows, limitada.write_calls) == (2, 3, 0)
+        assert estatisticas["SELECT id FROM movimentacoes"].rows == 3
+        
+        atualizacao = estatisticas["UPDATE produtos SET estoque_atual = estoque_atual + ? WHERE id = ?"]
+        assert (atualizacao.calls, atualizacao.rows, atualizacao.write_calls) == (3, 3, 3)
+        assert tracer.slow_queries() == []
+        assert "UPDATE produtos" in tracer.format_table()
+        
+        assert self.db_connection.disable_tracing() is tracer
+        ProdutoService(self.db_connection).listar_produtos()
+        assert "SELECT * FROM produtos ORDER BY nome" not in {item.statement for item in tracer.statistics()}
+    
+    def test_rastreamento_log_de_consultas_lentas(self, caplog):
+        """Testa que instruções acima do limite vão para o log de consultas lentas"""
+        tracer = self.db_connection.enable_tracing(slow_threshold_ms=0)
+        
+        with caplog.at_level("WARNING", logger="estoque.sql.lentas"):
+            ProdutoService(self.db_connection).buscar_produtos_por_ids([1, 2, 3])
+        
+        assert [lenta.statement for lenta in tracer.slow_queries()] == ["SELECT * FROM produtos WHERE id IN (...)"]
+        assert "WHERE id IN (...)" in caplog.text
+    
+    def test_rastreamento_inclui_instrucoes_internas(self):
+        """Testa que PRAGMAs do perfil e leituras de metadados também são rastreados"""
+        tracer = SQLTracer(slow_threshold_ms=10_000)
+        db = DatabaseConnection(self.test_db_path, tracer=tracer)
+        
+        assert db.timestamp_format == self.db_connection.timestamp_format
+        db.close()
+        
+        instrucoes = {item.statement for item in tracer.statistics()}
+        assert "PRAGMA busy_timeout = ?" in instrucoes
+        assert "PRAGMA journal_mode = WAL" in instrucoes
+        assert "SELECT valor FROM metadados WHERE chave = ?" in instrucoes
+    
+    def test_rastreamento_por_variavel_de_ambiente(self, monkeypatch):
+        """Testa a ativação do rastreamento pela variável de ambiente"""
+        monkeypatch.setenv(TRACE_ENV_VAR, "250")
+        
+        db = DatabaseConnection(self.test_db_path)
+        assert db.tracer.slow_threshold == 0.25
+        db.close()
+    
+    def test_normalizacao_de_instrucoes(self):
+        """Testa a troca de literais por '?' e das listas IN por IN (...)"""
+        assert normalize_sql("SELECT *\n  FROM produtos WHERE nome = 'O''Brien' AND id IN (?, ?, ?)") == (
+            "SELECT * FROM produtos WHERE nome = ? AND id IN (...)"
+        )
+        assert normalize_sql("SELECT 1.5 FROM idx_v2") == "SELECT ? FROM idx_v2"
@@ -0,0 +1,140 @@
+"""
+Testes unitários para o escritor de movimentações com group commit
+"""
+import pytest
+import tempfile
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.produto import Produto
+from src.models.movimentacao import TipoMovimentacao
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.escritor_movimentacoes import EscritorMovimentacoes
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.exceptions.estoque_exceptions import (
+    EstoqueInsuficienteException,
+    MovimentacaoInvalidaException,
+    ProdutoNaoEncontradoException
+)
+
+
+class TestEscritorMovimentacoes:
+    """Testes para EscritorMovimentacoes"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.produto = self.produto_service.criar_produto(Produto(nome="Produto Escritor", estoque_atual=100))
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_registrar_entrada_e_saida(self):
+        """Testa movimentações isoladas pelo escritor"""
+        with EscritorMovimentacoes(self.estoque_service) as escritor:
+            entrada = escritor.registrar_entrada(self.produto.id, 5, "Entrada")
+            saida = escritor.registrar_saida(self.produto.id, 20)
+        
+        assert entrada.id is not None
+        assert saida.id > entrada.id
+        assert saida.is_saida()
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 85
+    
+    def test_erros_por_chamador(self):
+        """Testa que cada chamador recebe a exceção da própria linha"""
+        with EscritorMovimentacoes(self.estoque_service, intervalo_max=0.05) as escritor:
+            excesso = escritor.submeter(self.produto.id, TipoMovimentacao.SAIDA, 500)
+            inexistente = escritor.submeter(999, TipoMovimentacao.ENTRADA, 1)
+            valida = escritor.submeter(self.produto.id, TipoMovimentacao.SAIDA, 100)
+            
+            with pytest.raises(EstoqueInsuficienteException):
+                excesso.result()
+            with pytest.raises(ProdutoNaoEncontradoException):
+                inexistente.result()
+            assert valida.result().quantidade == 100
+            
+            with pytest.raises(MovimentacaoInvalidaException):
+                escritor.submeter(self.produto.id, TipoMovimentacao.ENTRADA, 0)
+        
+        assert escritor.estatisticas().lotes == 1
+    
+    def test_group_commit_com_threads_concorrentes(self):
+        """Testa que pedidos de várias threads são agrupados em poucas transações"""
+        escritor = EscritorMovimentacoes(self.estoque_service, intervalo_max=0.01, tamanho_max=64)
+        
+        def vender(_):
+            try:
+                escritor.registrar_saida(self.produto.id, 1)
+                return True
+            except EstoqueInsuficienteException:
+                return False
+        
+        with escritor:
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                resultados = list(executor.map(vender, range(150)))
+        
+        estatisticas = escritor.estatisticas()
+        assert resultados.count(True) == 100
+        assert estatisticas.movimentacoes == 150
+        assert estatisticas.lotes < 150
+        assert estatisticas.maior_lote <= 64
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 0
+        assert len(self.estoque_service.listar_movimentacoes()) == 100
+    
+    def test_parar_aplica_pendentes(self):
+        """Testa que parar() aplica os pedidos já enfileirados"""
+        escritor = EscritorMovimentacoes(self.estoque_service, intervalo_max=1.0)
+        futuros = [escritor.submeter(self.produto.id, TipoMovimentacao.ENTRADA, 1) for _ in range(10)]
+        escritor.parar()
+        
+        assert all(futuro.done() for futuro in futuros)
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 110
+    
+    def test_submeter_concorrente_com_parar(self):
+        """Testa que todo pedido aceito durante parar() é concluído e os seguintes são recusados"""
+        escritor = EscritorMovimentacoes(self.estoque_service, intervalo_max=0.001, tamanho_max=8)
+        futuros = []
+        recusados = []
+        iniciado = threading.Barrier(9)
+        
+        def submeter():
+            iniciado.wait()
+            while True:
+                try:
+                    futuros.append(escritor.submeter(self.produto.id, TipoMovimentacao.ENTRADA, 1))
+                except RuntimeError:
+                    recusados.append(True)
+                    return
+        
+        threads = [threading.Thread(target=submeter) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        iniciado.wait()
+        escritor.parar()
+        for thread in threads:
+            thread.join(timeout=10)
+        
+        assert len(recusados) == 8
+        assert all(futuro.done() and futuro.exception() is None for futuro in futuros)
+        assert self.produto_service.buscar_produto_por_id(self.produto.id).estoque_atual == 100 + len(futuros)
+        
+        with pytest.raises(RuntimeError):
+            escritor.submeter(self.produto.id, TipoMovimentacao.ENTRADA, 1)
+        
+        escritor.iniciar()
+        assert escritor.registrar_entrada(self.produto.id, 1).id is not None
+        escritor.parar()
@@ -4,6 +4,9 @@ Testes unitários para EstoqueService
 import pytest
 import tempfile
 import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
 
 from src.models.produto import Produto
 from src.models.movimentacao import Movimentacao, TipoMovimentacao
@@ -29,7 +32,7 @@ class TestEstoqueService:
         self.test_db_path = os.path.join(self.temp_dir, "test.db")
         
         self.db_connection = DatabaseConnection(self.test_db_path)
-        create_tables()
+        create_tables(self.db_connection)
         
         self.produto_service = ProdutoService(self.db_connection)
         self.estoque_service = EstoqueService(self.db_connection)
@@ -170,6 +173,18 @@ class TestEstoqueService:
         assert movimentacoes[0].created_at >= movimentacoes[1].created_at
         assert movimentacoes[1].created_at >= movimentacoes[2].created_at
     
+    def test_movimentacao_carregada_do_banco(self):
+        """Testa a hidratação de movimentações lidas do banco"""
+        self.estoque_service.registrar_saida(self.produto_teste.id, 4, "Hidratação")
+        
+        movimentacao = self.estoque_service.listar_movimentacoes()[0]
+        
+        assert not hasattr(movimentacao, "__dict__")
+        assert movimentacao.tipo is TipoMovimentacao.SAIDA
+        assert movimentacao.quantidade == 4
+        assert movimentacao.observacao == "Hidratação"
+        assert movimentacao.get_impacto_estoque() == -4
+    
     def test_listar_movimentacoes_por_produto(self):
         """Testa listagem de movimentações filtrada por produto"""
         # Cria outro produto
@@ -234,6 +249,79 @@ class TestEstoqueService:
         # Deve ser: estoque inicial (10) + entrada (15) - saída (5) = 20
         assert produto_recalculado.estoque_atual == 20
     
+    def test_obter_saldos(self):
+        """Testa o saldo de vários produtos em uma única agregação"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro Produto", estoque_atual=4))
+        sem_movimentacoes = self.produto_service.criar_produto(Produto(nome="Parado", estoque_atual=7))
+        
+        self.estoque_service.registrar_entrada(self.produto_teste.id, 5)
+        self.estoque_service.registrar_saida(outro.id, 3)
+        self.estoque_service.criar_checkpoint_saldo(outro.id)
+        self.estoque_service.registrar_entrada(outro.id, 10)
+        
+        assert self.estoque_service.obter_saldos() == {self.produto_teste.id: 15, outro.id: 11, sem_movimentacoes.id: 7}
+        assert self.estoque_service.obter_saldos([outro.id, 999, outro.id]) == {outro.id: 11}
+        assert self.estoque_service.obter_saldos([]) == {}
+    
+    def test_recalcular_todos(self):
+        """Testa a conferência e correção do estoque de todo o catálogo"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro Produto", estoque_atual=4))
+        self.estoque_service.registrar_entrada(self.produto_teste.id, 15)
+        self.estoque_service.registrar_saida(outro.id, 1)
+        
+        # Desvios gravados por fora das movimentações
+        self.produto_service.atualizar_estoque(self.produto_teste.id, 999)
+        
+        relatorio = self.estoque_service.recalcular_todos(corrigir=False)
+        assert relatorio.produtos_verificados == 2
+        assert [(d.produto_id, d.estoque_atual, d.saldo, d.diferenca) for d in relatorio.divergencias] == [
+            (self.produto_teste.id, 999, 25, -974)
+        ]
+        assert self.produto_service.buscar_produto_por_id(self.produto_teste.id).estoque_atual == 999
+        
+        relatorio = self.estoque_service.recalcular_todos()
+        assert relatorio.corrigido and relatorio.total_divergencias == 1
+        assert self.produto_service.buscar_produto_por_id(self.produto_teste.id).estoque_atual == 25
+        assert self.produto_service.buscar_produto_por_id(outro.id).estoque_atual == 3
+        
+        assert self.estoque_service.recalcular_todos().divergencias == []
+    
+    def test_relatorio_valorizacao(self):
+        """Testa totais, maiores valores e valor por produto calculados no banco"""
+        self.produto_service.atualizar_produto(Produto(
+            nome="Produto Teste", preco_unitario=2.5, estoque_atual=10, id=self.produto_teste.id
+        ))
+        self.produto_service.criar_produto(Produto(nome="Caro", preco_unitario=100.0, estoque_atual=3))
+        self.produto_service.criar_produto(Produto(nome="Zerado", preco_unitario=50.0, estoque_atual=0))
+        
+        relatorio = self.estoque_service.relatorio_valorizacao(top=2, por_produto=True)
+        
+        assert (relatorio.total_produtos, relatorio.total_unidades, relatorio.valor_total) == (3, 13, 325.0)
+        assert [(item.nome, item.valor) for item in relatorio.maiores] == [("Caro", 300.0), ("Produto Teste", 25.0)]
+        assert [item.nome for item in relatorio.por_produto] == ["Caro", "Produto Teste", "Zerado"]
+        assert self.estoque_service.relatorio_valorizacao(top=0).maiores == ()
+    
+    def test_relatorio_valorizacao_em_cache_ate_escrita(self):
+        """Testa que o relatório é reaproveitado até mudar estoque, preço ou nome"""
+        servico = self.estoque_service
+        relatorio = servico.relatorio_valorizacao()
+        
+        # Campos que não entram na valorização não invalidam o cache
+        self.produto_service.definir_estoque_minimo(self.produto_teste.id, 4)
+        assert servico.relatorio_valorizacao() is relatorio
+        
+        servico.registrar_entrada(self.produto_teste.id, 5)
+        atualizado = servico.relatorio_valorizacao()
+        assert atualizado is not relatorio and atualizado.total_unidades == 15
+        assert servico.relatorio_valorizacao() is atualizado
+        
+        # Escrita de outra conexão, fora dos serviços
+        conexao = sqlite3.connect(self.test_db_path)
+        conexao.execute("UPDATE produtos SET preco_unitario = 2 WHERE id = ?", (self.produto_teste.id,))
+        conexao.commit()
+        conexao.close()
+        assert servico.relatorio_valorizacao().valor_total == 30.0
+    
     def test_verificar_estoque_disponivel(self):
         """Testa verificação de estoque disponível"""
         assert self.estoque_service.verificar_estoque_disponivel(self.produto_teste.id, 5) == True
@@ -264,6 +352,45 @@ class TestEstoqueService:
         # Verifica ordenação (menor estoque primeiro)
         assert produtos_baixo[0].estoque_atual <= produtos_baixo[-1].estoque_atual
     
+    def test_listar_produtos_para_reposicao(self):
+        """Testa a listagem paginada pelo ponto de reposição de cada produto"""
+        # produto_teste: estoque 10, mínimo 0 (fora da lista)
+        criados = [
+            self.produto_service.criar_produto(Produto(nome=nome, estoque_atual=atual, estoque_minimo=minimo))
+            for nome, atual, minimo in [
+                ("Parafuso", 2, 10), ("Porca", 5, 5), ("Arruela", 30, 10),
+                ("Prego", 0, 3), ("Rebite", 4, 12), ("Bucha", 1, 1),
+            ]
+        ]
+        
+        nomes = []
+        pagina = self.estoque_service.listar_produtos_para_reposicao(limite=2)
+        while True:
+            nomes.extend(p.nome for p in pagina)
+            if not pagina.tem_proxima:
+                break
+            pagina = self.estoque_service.listar_produtos_para_reposicao(limite=2, apos=pagina.proximo)
+        
+        # Maior déficit primeiro; empates pelo id
+        assert nomes == ["Parafuso", "Rebite", "Prego", "Porca", "Bucha"]
+        assert all(p.precisa_reposicao() for p in criados if p.nome in nomes)
+        
+        # Uma entrada tira o produto da lista
+        self.estoque_service.registrar_entrada(criados[0].id, 9)
+        nomes = [p.nome for p in self.estoque_service.listar_produtos_para_reposicao()]
+        assert "Parafuso" not in nomes
+    
+    def test_definir_estoque_minimo(self):
+        """Testa a definição do ponto de reposição"""
+        produto = self.produto_service.definir_estoque_minimo(self.produto_teste.id, 10)
+        
+        assert produto.estoque_minimo == 10
+        assert self.produto_service.buscar_produto_por_id(produto.id).estoque_minimo == 10
+        assert [p.id for p in self.estoque_service.listar_produtos_para_reposicao()] == [produto.id]
+        
+        with pytest.raises(ValueError):
+            self.produto_service.definir_estoque_minimo(produto.id, -1)
+    
     def test_multiplas_operacoes_estoque(self):
         """Testa múltiplas operações de estoque em sequência"""
         produto_id = self.produto_teste.id
@@ -283,3 +410,364 @@ class TestEstoqueService:
         # Verifica que foram criadas 5 movimentações
         movimentacoes = self.estoque_service.listar_movimentacoes(produto_id=produto_id)
         assert len(movimentacoes) == 5
+    
+    def test_registrar_movimentacoes_em_lote_sucesso(self):
+        """Testa registro de lote com saldo acumulado por produto"""
+        produto2 = self.produto_service.criar_produto(Produto(nome="Produto 2", estoque_atual=0))
+        
+        resultado = self.estoque_service.registrar_movimentacoes_em_lote([
+            (self.produto_teste.id, TipoMovimentacao.SAIDA, 10),
+            (produto2.id, "entrada", 7, "Recebimento"),
+            {"produto_id": self.produto_teste.id, "tipo": "entrada", "quantidade": 4},
+            Movimentacao(produto_id=produto2.id, tipo=TipoMovimentacao.SAIDA, quantidade=7),
+        ])
+        
+        assert resultado.total_sucesso == 4
+        assert resultado.total_falhas == 0
+        
+        ids = [mov.id for mov in resultado.movimentacoes]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 4
+        
+        assert self.produto_service.buscar_produto_por_id(self.produto_teste.id).estoque_atual == 4
+        assert self.produto_service.buscar_produto_por_id(produto2.id).estoque_atual == 0
+        assert len(self.estoque_service.listar_movimentacoes()) == 4
+        assert self.estoque_service.obter_saldo_produto(self.produto_teste.id) == 4
+    
+    def test_registrar_movimentacoes_em_lote_relatorio_de_falhas(self):
+        """Testa que linhas inválidas são rejeitadas sem abortar o lote"""
+        resultado = self.estoque_service.registrar_movimentacoes_em_lote([
+            (self.produto_teste.id, "saida", 6),
+            (self.produto_teste.id, "saida", 6),   # saldo acumulado: 4
+            (999, "entrada", 1),
+            (self.produto_teste.id, "entrada", 0),
+            (self.produto_teste.id, "devolucao", 1),
+            (self.produto_teste.id, "saida", 4),
+        ])
+        
+        assert resultado.total_sucesso == 2
+        falhas = {linha.indice: linha.erro for linha in resultado.falhas}
+        assert isinstance(falhas[1], EstoqueInsuficienteException)
+        assert falhas[1].estoque_atual == 4
+        assert isinstance(falhas[2], ProdutoNaoEncontradoException)
+        assert isinstance(falhas[3], MovimentacaoInvalidaException)
+        assert isinstance(falhas[4], MovimentacaoInvalidaException)
+        
+        produto = self.produto_service.buscar_produto_por_id(self.produto_teste.id)
+        assert produto.estoque_atual == 0
+        assert len(self.estoque_service.listar_movimentacoes()) == 2
+    
+    def test_registrar_movimentacoes_em_lote_na_transacao_do_chamador(self):
+        """Testa que o lote com cursor segue o commit ou rollback de quem abriu a transação"""
+        with self.produto_service.transacao_escrita() as cursor:
+            resultado = self.estoque_service.registrar_movimentacoes_em_lote(
+                [(self.produto_teste.id, "entrada", 3)], cursor=cursor
+            )
+            assert cursor.connection.in_transaction
+        
+        assert resultado.total_sucesso == 1
+        assert self.estoque_service.obter_saldo_produto(self.produto_teste.id) == 13
+        
+        with pytest.raises(RuntimeError):
+            with self.produto_service.transacao_escrita() as cursor:
+                self.estoque_service.registrar_movimentacoes_em_lote(
+                    [(self.produto_teste.id, "saida", 5)], cursor=cursor
+                )
+                raise RuntimeError("falha do chamador")
+        
+        assert self.estoque_service.obter_saldo_produto(self.produto_teste.id) == 13
+        assert len(self.estoque_service.listar_movimentacoes()) == 1
+    
+    def test_registrar_movimentacoes_em_lote_vazio(self):
+        """Testa lote sem itens"""
+        resultado = self.estoque_service.registrar_movimentacoes_em_lote([])
+        
+        assert resultado.total_sucesso == 0
+        assert resultado.total_falhas == 0
+    
+    def _executar_em_threads(self, funcao, num_threads: int, operacoes_por_thread: int):
+        """Executa a função em várias threads, cada uma com sua própria conexão"""
+        barreira = threading.Barrier(num_threads)
+        resultados = []
+        trava = threading.Lock()
+        
+        def trabalhador():
+            conexao = DatabaseConnection(self.test_db_path)
+            servico = EstoqueService(conexao)
+            barreira.wait()
+            locais = [funcao(servico) for _ in range(operacoes_por_thread)]
+            conexao.close()
+            with trava:
+                resultados.extend(locais)
+        
+        threads = [threading.Thread(target=trabalhador) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        return resultados
+    
+    def test_registrar_saida_concorrente_sem_venda_a_descoberto(self):
+        """Testa saídas concorrentes: nenhuma atualização perdida nem estoque negativo"""
+        produto = self.produto_service.criar_produto(Produto(nome="Produto Concorrido", estoque_atual=100))
+        
+        def vender(servico):
+            try:
+                servico.registrar_saida(produto.id, 1)
+                return True
+            except EstoqueInsuficienteException:
+                return False
+        
+        resultados = self._executar_em_threads(vender, num_threads=8, operacoes_por_thread=25)
+        
+        assert resultados.count(True) == 100
+        assert resultados.count(False) == 100
+        assert self.produto_service.buscar_produto_por_id(produto.id).estoque_atual == 0
+        assert len(self.estoque_service.listar_movimentacoes(produto_id=produto.id)) == 100
+    
+    def test_registrar_entrada_concorrente_sem_atualizacao_perdida(self):
+        """Testa entradas concorrentes: o estoque final soma todas as entradas"""
+        produto_id = self.produto_teste.id
+        
+        self._executar_em_threads(
+            lambda servico: servico.registrar_entrada(produto_id, 2),
+            num_threads=8,
+            operacoes_por_thread=25
+        )
+        
+        assert self.produto_service.buscar_produto_por_id(produto_id).estoque_atual == 10 + 8 * 25 * 2
+        assert self.estoque_service.obter_saldo_produto(produto_id) == 10 + 8 * 25 * 2
+    
+    def _registrar_historico(self, quantidade_movimentacoes: int):
+        """Registra um histórico com vários empates de created_at"""
+        instante = datetime(2024, 1, 1, 12, 0, 0)
+        self.estoque_service.registrar_movimentacoes_em_lote([
+            Movimentacao(
+                produto_id=self.produto_teste.id,
+                tipo=TipoMovimentacao.ENTRADA if i % 3 else TipoMovimentacao.SAIDA,
+                quantidade=1,
+                created_at=instante.replace(minute=i // 4)
+            )
+            for i in range(quantidade_movimentacoes)
+        ])
+    
+    def test_listar_movimentacoes_paginado_percorre_todas(self):
+        """Testa que a paginação por cursor percorre o histórico sem repetições"""
+        self._registrar_historico(23)
+        
+        ids = []
+        pagina = self.estoque_service.listar_movimentacoes_paginado(limite=5)
+        paginas = 1
+        ids.extend(mov.id for mov in pagina)
+        while pagina.tem_proxima:
+            pagina = self.estoque_service.listar_movimentacoes_paginado(limite=5, apos=pagina.proximo)
+            ids.extend(mov.id for mov in pagina)
+            paginas += 1
+        
+        assert paginas == 5
+        assert len(pagina) == 3
+        assert ids == [mov.id for mov in self.estoque_service.listar_movimentacoes()]
+        assert len(set(ids)) == 23
+    
+    def test_listar_movimentacoes_paginado_com_filtro(self):
+        """Testa paginação combinada com filtro por tipo"""
+        self._registrar_historico(12)
+        
+        pagina = self.estoque_service.listar_movimentacoes_paginado(limite=3, tipo=TipoMovimentacao.SAIDA)
+        segunda = self.estoque_service.listar_movimentacoes_paginado(
+            limite=3, apos=pagina.proximo, tipo=TipoMovimentacao.SAIDA
+        )
+        
+        assert len(pagina) == 3
+        assert len(segunda) == 1
+        assert not segunda.tem_proxima
+        assert all(mov.is_saida() for mov in list(pagina) + list(segunda))
+    
+    def test_listar_movimentacoes_paginado_cursor_invalido(self):
+        """Testa erro ao informar cursor inválido"""
+        with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+            self.estoque_service.listar_movimentacoes_paginado(apos="nao-e-um-cursor")
+    
+    def test_iterar_movimentacoes_em_blocos(self):
+        """Testa o gerador de movimentações com fetchmany e limite"""
+        self._registrar_historico(23)
+        todas = self.estoque_service.listar_movimentacoes()
+        
+        iteradas = list(self.estoque_service.iterar_movimentacoes(tamanho_bloco=4))
+        assert [mov.id for mov in iteradas] == [mov.id for mov in todas]
+        
+        primeira = self.estoque_service.listar_movimentacoes_paginado(limite=10)
+        restantes = list(self.estoque_service.iterar_movimentacoes(apos=primeira.proximo, limite=5, tamanho_bloco=2))
+        assert [mov.id for mov in restantes] == [mov.id for mov in todas[10:15]]
+    
+    def test_listar_movimentacoes_com_produto(self):
+        """Testa a junção com produtos: nome e preço em uma única consulta"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro", preco_unitario=7.5, estoque_atual=3))
+        self.estoque_service.registrar_entrada(self.produto_teste.id, 4)
+        self.estoque_service.registrar_saida(outro.id, 2)
+        
+        conexao = self.db_connection.connect()
+        instrucoes = []
+        conexao.set_trace_callback(instrucoes.append)
+        try:
+            pagina = self.estoque_service.listar_movimentacoes_paginado(limite=10, incluir_produto=True)
+        finally:
+            conexao.set_trace_callback(None)
+        
+        assert [(mov.produto_nome, mov.produto_preco) for mov in pagina] == [
+            ("Outro", 7.5), (self.produto_teste.nome, self.produto_teste.preco_unitario)
+        ]
+        # Além da consulta ao catálogo de partições, uma única leitura de movimentações
+        assert len([sql for sql in instrucoes if sql.startswith("SELECT") and "particoes_movimentacoes" not in sql]) == 1
+        
+        iteradas = list(self.estoque_service.iterar_movimentacoes(produto_id=outro.id, incluir_produto=True))
+        assert [mov.produto_nome for mov in iteradas] == ["Outro"]
+        
+        sem_produto = self.estoque_service.listar_movimentacoes()
+        assert [mov.produto_nome for mov in sem_produto] == [None, None]
+        assert sem_produto == self.estoque_service.listar_movimentacoes(incluir_produto=True)
+    
+    def _checkpoint(self, produto_id):
+        """Lê o checkpoint de saldo gravado para o produto"""
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM saldos_checkpoint WHERE produto_id = ?", (produto_id,))
+            return cursor.fetchone()
+    
+    def test_criar_checkpoint_saldo_sob_demanda(self):
+        """Testa que o saldo continua correto antes e depois do checkpoint"""
+        produto_id = self.produto_teste.id
+        self.estoque_service.registrar_entrada(produto_id, 25)
+        ultima = self.estoque_service.registrar_saida(produto_id, 8)
+        
+        assert self.estoque_service.criar_checkpoint_saldo(produto_id) == 1
+        checkpoint = self._checkpoint(produto_id)
+        assert checkpoint['saldo'] == 27
+        assert checkpoint['movimentacao_id'] == ultima.id
+        
+        self.estoque_service.registrar_entrada(produto_id, 5)
+        self.estoque_service.registrar_saida(produto_id, 3)
+        assert self.estoque_service.obter_saldo_produto(produto_id) == 29
+        
+        # O checkpoint seguinte parte do anterior
+        self.estoque_service.criar_checkpoint_saldo()
+        assert self._checkpoint(produto_id)['saldo'] == 29
+        assert self.estoque_service.obter_saldo_produto(produto_id) == 29
+    
+    def test_criar_checkpoint_saldo_produto_inexistente(self):
+        """Testa erro ao criar checkpoint para produto inexistente"""
+        with pytest.raises(ProdutoNaoEncontradoException):
+            self.estoque_service.criar_checkpoint_saldo(999)
+    
+    def test_checkpoint_saldo_periodico(self):
+        """Testa que as escritas avançam o checkpoint após o intervalo e a leitura não grava"""
+        servico = EstoqueService(self.db_connection, intervalo_checkpoint=3)
+        produto_id = self.produto_teste.id
+        
+        servico.registrar_entrada(produto_id, 1)
+        servico.registrar_entrada(produto_id, 1)
+        assert self._checkpoint(produto_id) is None
+        assert servico.obter_saldo_produto(produto_id) == 12
+        assert self._checkpoint(produto_id) is None
+        
+        ultima = servico.registrar_saida(produto_id, 4)
+        checkpoint = self._checkpoint(produto_id)
+        assert checkpoint['movimentacao_id'] == ultima.id
+        assert checkpoint['saldo'] == 8
+        
+        servico.registrar_entrada(produto_id, 2)
+        assert servico.obter_saldo_produto(produto_id) == 10
+        assert self._checkpoint(produto_id)['movimentacao_id'] == checkpoint['movimentacao_id']
+        assert self._checkpoint(produto_id)['movimentacoes_pendentes'] == 1
+        
+        resultado = servico.registrar_movimentacoes_em_lote([
+            (produto_id, "entrada", 1),
+            (produto_id, "saida", 3),
+        ])
+        checkpoint = self._checkpoint(produto_id)
+        assert checkpoint['movimentacao_id'] == resultado.linhas[-1].movimentacao.id
+        assert checkpoint['saldo'] == 8
+        assert servico.obter_saldo_produto(produto_id) == 8
+        assert checkpoint['movimentacoes_pendentes'] == 0
+    
+    def test_checkpoint_conta_movimentacoes_do_produto(self):
+        """Testa que o intervalo conta as movimentações de cada produto, não IDs globais"""
+        servico = EstoqueService(self.db_connection, intervalo_checkpoint=3)
+        produtos = [
+            self.produto_service.criar_produto(Produto(nome=f"Produto {indice}", estoque_atual=10)).id
+            for indice in range(8)
+        ]
+        
+        conexao = self.db_connection.connect()
+        instrucoes = []
+        conexao.set_trace_callback(instrucoes.append)
+        try:
+            for _ in range(4):
+                for produto_id in produtos:
+                    servico.registrar_entrada(produto_id, 1)
+        finally:
+            conexao.set_trace_callback(None)
+        
+        # Um checkpoint por produto, gravado na terceira movimentação dele
+        gravacoes = [sql for sql in instrucoes if sql.lstrip().startswith("INSERT INTO saldos_checkpoint")]
+        assert len(gravacoes) == len(produtos)
+        
+        for produto_id in produtos:
+            checkpoint = self._checkpoint(produto_id)
+            assert checkpoint['saldo'] == 13
+            assert checkpoint['movimentacoes_pendentes'] == 1
+            assert servico.obter_saldo_produto(produto_id) == 14
+    
+    def test_resumo_diario_mantido_pelas_movimentacoes(self):
+        """Testa que entradas, saídas e lotes atualizam o resumo diário"""
+        produto_id = self.produto_teste.id
+        ontem = datetime.now() - timedelta(days=1)
+        
+        self.estoque_service.registrar_entrada(produto_id, 7)
+        self.estoque_service.registrar_saida(produto_id, 3)
+        self.estoque_service.registrar_movimentacoes_em_lote([
+            Movimentacao(produto_id=produto_id, tipo=TipoMovimentacao.ENTRADA, quantidade=4, created_at=ontem),
+            Movimentacao(produto_id=produto_id, tipo=TipoMovimentacao.SAIDA, quantidade=2),
+            (produto_id, "saida", 1000),  # rejeitada: não entra no resumo
+        ])
+        with pytest.raises(EstoqueInsuficienteException):
+            self.estoque_service.registrar_saida(produto_id, 1000)
+        
+        resumo = self.estoque_service.listar_movimentacoes_diarias(ontem.date(), date.today())
+        
+        assert [(r.dia, r.entradas, r.saidas) for r in resumo] == [
+            (ontem.date(), 4, 0),
+            (date.today(), 7, 5),
+        ]
+    
+    def test_obter_totais_periodo(self):
+        """Testa a soma por produto de um intervalo de dias"""
+        outro = self.produto_service.criar_produto(Produto(nome="Outro Produto", estoque_atual=50))
+        anteontem = datetime.now() - timedelta(days=2)
+        
+        self.estoque_service.registrar_movimentacoes_em_lote([
+            Movimentacao(produto_id=self.produto_teste.id, tipo=TipoMovimentacao.ENTRADA, quantidade=5,
+                         created_at=anteontem),
+            Movimentacao(produto_id=outro.id, tipo=TipoMovimentacao.SAIDA, quantidade=8, created_at=anteontem),
+        ])
+        self.estoque_service.registrar_entrada(self.produto_teste.id, 1)
+        self.estoque_service.registrar_saida(outro.id, 2)
+        
+        totais = self.estoque_service.obter_totais_periodo(anteontem.date(), date.today())
+        assert [(t.produto_id, t.entradas, t.saidas, t.liquido) for t in totais] == [
+            (self.produto_teste.id, 6, 0, 6),
+            (outro.id, 0, 10, -10),
+        ]
+        
+        so_hoje = self.estoque_service.obter_totais_periodo(date.today(), date.today())
+        assert [(t.produto_id, t.liquido) for t in so_hoje] == [(self.produto_teste.id, 1), (outro.id, -2)]
+        
+        por_produto = self.estoque_service.listar_movimentacoes_diarias(
+            anteontem.date(), date.today(), produto_id=outro.id
+        )
+        assert [r.saidas for r in por_produto] == [8, 2]
+    
+    def test_obter_saldo_produto_inexistente(self):
+        """Testa erro ao calcular saldo de produto inexistente"""
+        with pytest.raises(ProdutoNaoEncontradoException):
+            self.estoque_service.obter_saldo_produto(999)
@@ -0,0 +1,115 @@
+"""
+Testes unitários para o Exportador
+"""
+import csv
+import gzip
+import io
+import json
+import pytest
+import tempfile
+import os
+import shutil
+from datetime import datetime
+
+from src.models.produto import Produto
+from src.models.movimentacao import Movimentacao, TipoMovimentacao
+from src.models.datas import FORMATO_EPOCH, FORMATO_TEXTO
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.exportador import Exportador
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+
+
+class TestExportador:
+    """Testes para a exportação em fluxo"""
+    
+    @pytest.fixture(autouse=True, params=[FORMATO_EPOCH, FORMATO_TEXTO])
+    def setup_method(self, request):
+        """Setup executado antes de cada teste, nos dois formatos de timestamp"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection, formato_timestamp=request.param)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.exportador = Exportador(self.db_connection, tamanho_bloco=2)
+        
+        self.caneta = self.produto_service.criar_produto(Produto(nome="Caneta", estoque_atual=10))
+        self.lapis = self.produto_service.criar_produto(Produto(nome="Lápis", descricao="HB, nº 2"))
+        
+        # Horários com fração de segundo: em texto, valores sem fração são lidos como UTC
+        self.dia1 = datetime(2024, 3, 10, 9, 0, 0, 500)
+        self.dia2 = datetime(2024, 3, 11, 15, 30, 0, 250)
+        self.estoque_service.registrar_movimentacoes_em_lote([
+            Movimentacao(produto_id=self.caneta.id, tipo=TipoMovimentacao.SAIDA, quantidade=3,
+                         observacao='Venda "balcão"', created_at=self.dia2),
+            Movimentacao(produto_id=self.lapis.id, tipo=TipoMovimentacao.ENTRADA, quantidade=8, created_at=self.dia1),
+            Movimentacao(produto_id=self.caneta.id, tipo=TipoMovimentacao.ENTRADA, quantidade=5, created_at=self.dia1),
+        ])
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_exporta_movimentacoes_csv(self):
+        """Testa a exportação em CSV, em ordem cronológica e com datas ISO locais"""
+        destino = io.StringIO()
+        resultado = self.exportador.exportar_movimentacoes(destino)
+        
+        linhas = list(csv.DictReader(io.StringIO(destino.getvalue())))
+        assert resultado.linhas == 3
+        assert [(linha["produto_id"], linha["tipo"], linha["quantidade"]) for linha in linhas] == [
+            (str(self.lapis.id), "entrada", "8"),
+            (str(self.caneta.id), "entrada", "5"),
+            (str(self.caneta.id), "saida", "3"),
+        ]
+        assert linhas[0]["created_at"] == "2024-03-10 09:00:00.000500"
+        assert linhas[2]["observacao"] == 'Venda "balcão"'
+    
+    def test_exporta_com_filtros(self):
+        """Testa os filtros de produto, tipo e período"""
+        destino = io.StringIO()
+        self.exportador.exportar_movimentacoes(destino, formato="jsonl", produto_id=self.caneta.id,
+                                               tipo=TipoMovimentacao.ENTRADA)
+        assert [json.loads(linha)["quantidade"] for linha in destino.getvalue().splitlines()] == [5]
+        
+        destino = io.StringIO()
+        resultado = self.exportador.exportar_movimentacoes(destino, inicio=datetime(2024, 3, 11))
+        assert resultado.linhas == 1
+        
+        destino = io.StringIO()
+        resultado = self.exportador.exportar_movimentacoes(destino, fim=datetime(2024, 3, 11))
+        assert resultado.linhas == 2
+    
+    def test_exporta_jsonl_compactado(self):
+        """Testa a gravação em JSONL com gzip deduzidos da extensão"""
+        caminho = os.path.join(self.temp_dir, "movimentacoes.jsonl.gz")
+        self.exportador.exportar_movimentacoes(caminho)
+        
+        with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+            registros = [json.loads(linha) for linha in arquivo]
+        
+        assert [registro["id"] for registro in registros] == [2, 3, 1]
+        assert registros[2] == {
+            "id": 1, "produto_id": self.caneta.id, "tipo": "saida", "quantidade": 3,
+            "observacao": 'Venda "balcão"', "created_at": "2024-03-11 15:30:00.000250",
+        }
+    
+    def test_exporta_produtos(self):
+        """Testa a exportação do catálogo em ordem de nome"""
+        caminho = os.path.join(self.temp_dir, "produtos.csv")
+        resultado = self.exportador.exportar_produtos(caminho)
+        
+        with open(caminho, newline="", encoding="utf-8") as arquivo:
+            linhas = list(csv.DictReader(arquivo))
+        
+        assert resultado.linhas == 2
+        assert [(linha["nome"], linha["estoque_atual"]) for linha in linhas] == [("Caneta", "12"), ("Lápis", "8")]
+        assert linhas[1]["descricao"] == "HB, nº 2"
+        
+        with pytest.raises(ValueError):
+            self.exportador.exportar_produtos(io.StringIO(), formato="xml")
@@ -0,0 +1,128 @@
+"""
+Testes unitários para o ImportadorCSV
+"""
+import io
+import pytest
+import tempfile
+import os
+import shutil
+from datetime import date
+
+from src.models.produto import Produto
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.importador_csv import ImportadorCSV
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+
+
+CATALOGO = """nome,descricao,preco_unitario,estoque_atual,estoque_minimo
+Caneta,Caneta azul,"2,50",100,10
+Lápis,,1.20,40,
+Borracha,Borracha branca,0.80,,5
+"""
+
+
+class TestImportadorCSV:
+    """Testes para a importação de produtos e saldos"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.importador = ImportadorCSV(self.db_connection, tamanho_bloco=2)
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_importa_produtos_e_saldos(self):
+        """Testa a inserção dos produtos com movimentações de saldo inicial"""
+        resultado = self.importador.importar(io.StringIO(CATALOGO))
+        
+        assert (resultado.linhas_lidas, resultado.inseridos, resultado.ajustes) == (3, 3, 2)
+        assert resultado.total_rejeitadas == 0
+        
+        caneta = self.produto_service.buscar_produto_por_nome("Caneta")
+        assert (caneta.descricao, caneta.preco_unitario, caneta.estoque_atual, caneta.estoque_minimo) == \
+            ("Caneta azul", 2.5, 100, 10)
+        assert self.produto_service.buscar_produto_por_nome("Borracha").estoque_atual == 0
+        
+        # O saldo vem das movimentações, que também entram no resumo diário
+        assert self.estoque_service.obter_saldo_produto(caneta.id) == 100
+        assert [m.quantidade for m in self.estoque_service.listar_movimentacoes(produto_id=caneta.id)] == [100]
+        hoje = date.today()
+        assert sum(r.entradas for r in self.estoque_service.obter_totais_periodo(hoje, hoje)) == 140
+    
+    def test_reimportar_e_idempotente(self):
+        """Testa que importar o mesmo arquivo de novo não grava nada"""
+        self.importador.importar(io.StringIO(CATALOGO))
+        resultado = self.importador.importar(io.StringIO(CATALOGO))
+        
+        assert (resultado.inseridos, resultado.atualizados, resultado.inalterados, resultado.ajustes) == (0, 0, 3, 0)
+        assert len(self.estoque_service.listar_movimentacoes()) == 2
+    
+    def test_atualiza_cadastro_e_ajusta_estoque(self):
+        """Testa o upsert pelo nome e o ajuste do estoque para o valor do arquivo"""
+        existente = self.produto_service.criar_produto(
+            Produto(nome="Caneta", descricao="Antiga", preco_unitario=3.0, estoque_atual=120)
+        )
+        
+        resultado = self.importador.importar(io.StringIO("nome;estoque_atual\nCaneta;100\n"), delimitador=";")
+        
+        assert (resultado.inseridos, resultado.atualizados, resultado.inalterados, resultado.ajustes) == (0, 0, 1, 1)
+        caneta = self.produto_service.buscar_produto_por_id(existente.id)
+        assert (caneta.descricao, caneta.preco_unitario, caneta.estoque_atual) == ("Antiga", 3.0, 100)
+        
+        ajuste, = self.estoque_service.listar_movimentacoes(produto_id=existente.id)
+        assert (ajuste.tipo.value, ajuste.quantidade) == ("saida", 20)
+        
+        resultado = self.importador.importar(io.StringIO("nome,preco_unitario\nCaneta,3.5\n"))
+        assert (resultado.atualizados, resultado.ajustes) == (1, 0)
+        assert self.produto_service.buscar_produto_por_id(existente.id).preco_unitario == 3.5
+    
+    def test_rejeita_linhas_sem_abortar(self):
+        """Testa que linhas inválidas são relatadas e as demais importadas"""
+        rejeitadas = []
+        arquivo = io.StringIO(
+            "nome,preco_unitario,estoque_atual\n"
+            "Caneta,2.50,10\n"
+            ",1.00,5\n"
+            "Lápis,abc,5\n"
+            "Borracha,1.00,-3\n"
+            "Régua,4.00,7\n"
+        )
+        resultado = self.importador.importar(arquivo, ao_rejeitar=rejeitadas.append)
+        
+        assert (resultado.linhas_lidas, resultado.inseridos, resultado.total_rejeitadas) == (5, 2, 3)
+        assert [rejeicao.linha for rejeicao in resultado.rejeicoes] == [3, 4, 5]
+        assert rejeitadas == resultado.rejeicoes
+        assert [p.nome for p in self.produto_service.listar_produtos()] == ["Caneta", "Régua"]
+    
+    def test_nome_repetido_aplicado_em_ordem(self):
+        """Testa que linhas repetidas do mesmo produto são aplicadas na ordem do arquivo"""
+        resultado = self.importador.importar(io.StringIO("nome,estoque_atual\nCaneta,10\nCaneta,4\nCaneta,4\n"))
+        
+        assert (resultado.inseridos, resultado.inalterados, resultado.ajustes) == (1, 2, 2)
+        caneta = self.produto_service.buscar_produto_por_nome("Caneta")
+        assert caneta.estoque_atual == 4
+        assert self.estoque_service.obter_saldo_produto(caneta.id) == 4
+    
+    def test_importa_arquivo_em_disco(self):
+        """Testa a leitura de um caminho, com BOM, e o cabeçalho obrigatório"""
+        caminho = os.path.join(self.temp_dir, "catalogo.csv")
+        with open(caminho, "w", encoding="utf-8-sig", newline="") as arquivo:
+            arquivo.write(CATALOGO)
+        
+        assert self.importador.importar(caminho).inseridos == 3
+        
+        with pytest.raises(ValueError):
+            self.importador.importar(io.StringIO("produto,estoque_atual\nCaneta,1\n"))
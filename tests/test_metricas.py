@@ -0,0 +1,158 @@
+"""
+Testes unitários para o registro de métricas e a instrumentação dos serviços
+"""
+import math
+import pytest
+import tempfile
+import os
+import shutil
+import urllib.request
+
+from src.models.produto import Produto
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.cache_produtos import CacheProdutos
+from src.services.metricas import REGISTRO_PADRAO, RegistroMetricas
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+from src.exceptions.estoque_exceptions import EstoqueInsuficienteException, ProdutoNaoEncontradoException
+
+
+class TestMetricas:
+    """Testes para métricas, exportação e instrumentação"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.cache = CacheProdutos(capacidade=10)
+        self.produto_service = ProdutoService(self.db_connection, cache=self.cache)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.produto = self.produto_service.criar_produto(Produto(nome="Produto Medido", estoque_atual=5))
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_exportacao_prometheus(self):
+        """Testa o formato texto: HELP, TYPE, buckets cumulativos, soma, contagem e escape"""
+        registro = RegistroMetricas()
+        registro.contador("pedidos_total", "Pedidos", ("origem",)).incrementar('loja "A"', quantidade=2)
+        registro.medidor("fila", "Itens na fila").definir(3)
+        latencia = registro.histograma("latencia_segundos", "Latência", limites=(0.1, 1.0))
+        for valor in (0.05, 0.5, 0.7, 3.0):
+            latencia.observar(valor)
+        
+        texto = registro.exportar_prometheus()
+        
+        assert "# TYPE pedidos_total counter\npedidos_total{origem=\"loja \\\"A\\\"\"} 2\n" in texto
+        assert "# HELP fila Itens na fila\n# TYPE fila gauge\nfila 3\n" in texto
+        assert (
+            'latencia_segundos_bucket{le="0.1"} 1\n'
+            'latencia_segundos_bucket{le="1"} 3\n'
+            'latencia_segundos_bucket{le="+Inf"} 4\n'
+            'latencia_segundos_sum 4.25\n'
+            'latencia_segundos_count 4\n'
+        ) in texto
+        
+        with pytest.raises(ValueError):
+            registro.medidor("pedidos_total", "Outro tipo")
+    
+    def test_quantil_do_histograma(self):
+        """Testa a estimativa de quantil por interpolação nos buckets"""
+        histograma = RegistroMetricas().histograma("duracao", "Duração", limites=(0.001, 0.01, 0.1))
+        assert math.isnan(histograma.quantil(0.99))
+        
+        for _ in range(98):
+            histograma.observar(0.0005)
+        histograma.observar(0.05)
+        histograma.observar(0.05)
+        
+        assert histograma.quantil(0.5) == pytest.approx(0.001 * 50 / 98)
+        assert 0.01 < histograma.quantil(0.99) <= 0.1
+    
+    def test_servicos_instrumentados(self):
+        """Testa chamadas, erros por classe de exceção e duração dos métodos públicos"""
+        chamadas = REGISTRO_PADRAO.obter("estoque_chamadas_total")
+        erros = REGISTRO_PADRAO.obter("estoque_erros_total")
+        duracao = REGISTRO_PADRAO.obter("estoque_duracao_segundos")
+        saidas_antes = chamadas.valor("estoque", "registrar_saida")
+        recusas_antes = erros.valor("estoque", "registrar_saida", "EstoqueInsuficienteException")
+        buscas_antes = erros.valor("produto", "buscar_produto_por_id", "ProdutoNaoEncontradoException")
+        
+        self.estoque_service.registrar_saida(self.produto.id, 2)
+        with pytest.raises(EstoqueInsuficienteException):
+            self.estoque_service.registrar_saida(self.produto.id, 50)
+        with pytest.raises(ProdutoNaoEncontradoException):
+            self.produto_service.buscar_produto_por_id(999)
+        list(self.estoque_service.iterar_movimentacoes())
+        
+        assert chamadas.valor("estoque", "registrar_saida") == saidas_antes + 2
+        assert erros.valor("estoque", "registrar_saida", "EstoqueInsuficienteException") == recusas_antes + 1
+        assert erros.valor("produto", "buscar_produto_por_id", "ProdutoNaoEncontradoException") == buscas_antes + 1
+        assert duracao.contagem("estoque", "iterar_movimentacoes") >= 1
+        assert duracao.quantil(0.99, "estoque", "registrar_saida") > 0
+        assert self.estoque_service.registrar_saida.__name__ == "registrar_saida"
+        
+        texto = REGISTRO_PADRAO.exportar_prometheus()
+        assert 'estoque_duracao_segundos_bucket{servico="estoque",metodo="registrar_saida",le="+Inf"}' in texto
+        assert ('estoque_erros_total{servico="estoque",metodo="registrar_saida",'
+                'excecao="EstoqueInsuficienteException"}') in texto
+    
+    def test_auxiliares_nao_sao_medidos(self):
+        """Testa que transações e invalidação de cache ficam fora das métricas"""
+        self.estoque_service.registrar_entrada(self.produto.id, 1)
+        with self.produto_service.transacao_escrita():
+            pass
+        with pytest.raises(RuntimeError):
+            with self.produto_service.transacao_escrita():
+                raise RuntimeError("falha dentro da transação")
+        self.produto_service.invalidar_cache()
+        
+        texto = REGISTRO_PADRAO.exportar_prometheus()
+        assert 'metodo="transacao_escrita"' not in texto
+        assert 'metodo="invalidar_cache"' not in texto
+        assert 'metodo="registrar_entrada"' in texto
+        assert self.produto_service.transacao_escrita.__name__ == "transacao_escrita"
+    
+    def test_medidores_de_pool_e_cache(self):
+        """Testa os valores do pool e do cache lidos a cada exportação"""
+        registro = RegistroMetricas()
+        registro.observar_pool(self.db_connection)
+        registro.observar_cache(self.cache)
+        
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        self.produto_service.buscar_produto_por_id(self.produto.id)
+        
+        with self.db_connection.get_cursor():
+            em_uso = registro.obter("estoque_pool_conexoes").valor(self.test_db_path, "em_uso")
+        assert em_uso == 1
+        assert registro.obter("estoque_cache_acertos_total").valor("produtos") == self.cache.estatisticas().acertos
+        assert f'estoque_pool_tamanho_maximo{{banco="{self.test_db_path}"}} 8' in registro.exportar_prometheus()
+    
+    def test_exportacao_para_arquivo_e_http(self):
+        """Testa a gravação atômica em arquivo e o endpoint /metrics"""
+        registro = RegistroMetricas()
+        registro.contador("eventos_total", "Eventos").incrementar()
+        
+        caminho = os.path.join(self.temp_dir, "estoque.prom")
+        registro.gravar_arquivo(caminho)
+        with open(caminho, encoding="utf-8") as arquivo:
+            assert "eventos_total 1" in arquivo.read()
+        assert not [nome for nome in os.listdir(self.temp_dir) if nome.endswith(".tmp")]
+        
+        servidor = registro.iniciar_servidor(porta=0)
+        try:
+            url = f"http://127.0.0.1:{servidor.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as resposta:
+                assert resposta.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "eventos_total 1" in resposta.read().decode("utf-8")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
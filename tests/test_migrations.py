@@ -0,0 +1,302 @@
+"""
+Testes unitários para as migrations e o formato dos timestamps
+"""
+import pytest
+import tempfile
+import os
+import shutil
+import copy
+from dataclasses import asdict, fields, replace
+from datetime import datetime
+
+from src.models.produto import Produto
+from src.models.movimentacao import Movimentacao
+from src.models.datas import FORMATO_EPOCH, FORMATO_TEXTO, para_datetime, para_epoch_us
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.database.connection import DatabaseConnection
+from src.database.migrations import (
+    MIGRATIONS, create_tables, migrar_esquema, migrar_timestamps_para_epoch, reconstruir_movimentacoes_diarias
+)
+from src.database.migrator import Migration, Migrator
+
+
+class TestTimestamps:
+    """Testes para o armazenamento de timestamps em epoch"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _tipos_created_at(self, tabela: str):
+        """Retorna os tipos SQLite gravados em created_at"""
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute(f"SELECT DISTINCT typeof(created_at) AS tipo FROM {tabela}")
+            return {row['tipo'] for row in cursor.fetchall()}
+    
+    def test_banco_novo_grava_epoch(self):
+        """Testa que bancos novos gravam timestamps inteiros"""
+        create_tables(self.db_connection)
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Epoch", estoque_atual=5))
+        movimentacao = EstoqueService(self.db_connection).registrar_saida(produto.id, 2)
+        
+        assert self.db_connection.timestamp_format == FORMATO_EPOCH
+        assert self._tipos_created_at("produtos") == {"integer"}
+        assert self._tipos_created_at("movimentacoes") == {"integer"}
+        
+        lida = EstoqueService(self.db_connection).listar_movimentacoes()[0]
+        assert lida.created_at == movimentacao.created_at
+    
+    def test_formato_texto_opcional(self):
+        """Testa a criação do banco com timestamps em texto"""
+        create_tables(self.db_connection, formato_timestamp=FORMATO_TEXTO)
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Texto"))
+        
+        assert self.db_connection.timestamp_format == FORMATO_TEXTO
+        assert self._tipos_created_at("produtos") == {"text"}
+        assert ProdutoService(self.db_connection).buscar_produto_por_id(produto.id).created_at == produto.created_at
+        
+        with pytest.raises(ValueError):
+            create_tables(self.db_connection, formato_timestamp=FORMATO_EPOCH)
+    
+    def test_trigger_grava_updated_at_em_epoch(self):
+        """Testa que o trigger de updated_at grava inteiros no formato epoch"""
+        create_tables(self.db_connection)
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Trigger", estoque_atual=1))
+        EstoqueService(self.db_connection).registrar_entrada(produto.id, 1)
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT updated_at, typeof(updated_at) AS tipo FROM produtos WHERE id = ?", (produto.id,))
+            row = cursor.fetchone()
+        
+        assert row['tipo'] == "integer"
+        assert abs(para_datetime(row['updated_at']) - datetime.now()).total_seconds() < 60
+    
+    def test_data_convertida_apenas_no_acesso(self):
+        """Testa que o modelo guarda o valor bruto até a data ser lida"""
+        instante = datetime(2024, 5, 6, 7, 8, 9, 123456)
+        movimentacao = Movimentacao.from_row({
+            "id": 1, "produto_id": 1, "tipo": "entrada", "quantidade": 1,
+            "observacao": None, "created_at": para_epoch_us(instante)
+        })
+        
+        assert isinstance(Movimentacao.created_at.bruto(movimentacao), int)
+        assert movimentacao.created_at == instante
+        assert Movimentacao.created_at.bruto(movimentacao) is movimentacao.created_at
+    
+    def test_datas_sao_campos_publicos(self):
+        """Testa que as datas preguiçosas aparecem em fields, asdict, comparação e cópia"""
+        instante = datetime(2024, 5, 6, 7, 8, 9, 123456)
+        linha = {
+            "id": 1, "nome": "Produto", "descricao": None, "preco_unitario": 1.0, "estoque_atual": 2,
+            "estoque_minimo": 0, "created_at": para_epoch_us(instante), "updated_at": instante.isoformat()
+        }
+        produto = Produto.from_row(linha)
+        
+        nomes = [campo.name for campo in fields(Produto)]
+        assert "created_at" in nomes and "updated_at" in nomes and "_created_at" not in nomes
+        assert asdict(produto)["created_at"] == instante
+        assert asdict(produto)["updated_at"] == instante
+        assert produto == Produto("Produto", None, 1.0, 2, id=1, created_at=instante, updated_at=instante)
+        assert produto != replace(produto, updated_at=datetime(2024, 5, 7))
+        assert copy.copy(Produto.from_row(linha)) == produto
+    
+    def test_migrar_banco_em_texto(self):
+        """Testa a conversão em blocos de um banco existente em texto"""
+        create_tables(self.db_connection, formato_timestamp=FORMATO_TEXTO)
+        produto_service = ProdutoService(self.db_connection)
+        estoque_service = EstoqueService(self.db_connection)
+        
+        produto = produto_service.criar_produto(Produto(nome="Produto Legado", estoque_atual=10))
+        for quantidade in range(1, 6):
+            estoque_service.registrar_entrada(produto.id, quantidade)
+        antes = [(m.id, m.created_at) for m in estoque_service.listar_movimentacoes()]
+        
+        convertidas = migrar_timestamps_para_epoch(self.db_connection, tamanho_bloco=2)
+        
+        assert convertidas == 6  # 1 produto e 5 movimentações
+        assert self.db_connection.timestamp_format == FORMATO_EPOCH
+        assert self._tipos_created_at("movimentacoes") == {"integer"}
+        assert [(m.id, m.created_at) for m in estoque_service.listar_movimentacoes()] == antes
+        
+        estoque_service.registrar_saida(produto.id, 1)
+        assert self._tipos_created_at("movimentacoes") == {"integer"}
+        assert migrar_timestamps_para_epoch(self.db_connection) == 0
+
+
+class TestMigrador:
+    """Testes para o motor de migrations versionadas"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _versoes_registradas(self):
+        """Retorna as versões gravadas em schema_version"""
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT version FROM schema_version ORDER BY version")
+            return [row['version'] for row in cursor.fetchall()]
+    
+    def test_banco_novo_registra_versoes(self):
+        """Testa que todas as migrations ficam registradas num banco novo"""
+        create_tables(self.db_connection)
+        
+        migrador = Migrator(self.db_connection, MIGRATIONS)
+        assert migrador.current_version() == migrador.latest_version
+        assert migrador.pending() == []
+        assert self._versoes_registradas() == [migration.version for migration in MIGRATIONS]
+    
+    def test_esquema_atual_nao_reaplica(self):
+        """Testa que, com o esquema atual, nenhum passo é executado de novo"""
+        chamadas = []
+        migrations = [Migration(1, "tabela teste", lambda cursor, contexto: (
+            chamadas.append(1), cursor.execute("CREATE TABLE teste (id INTEGER PRIMARY KEY)")
+        ))]
+        
+        assert Migrator(self.db_connection, migrations).migrate() == 1
+        assert Migrator(self.db_connection, migrations).migrate() == 1
+        assert chamadas == [1]
+    
+    def test_banco_anterior_ao_motor(self):
+        """Testa a atualização de um banco criado antes do schema_version"""
+        create_tables(self.db_connection, formato_timestamp=FORMATO_TEXTO)
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Antigo", estoque_atual=3))
+        self.db_connection.execute_script("""
+        DROP TABLE schema_version;
+        DROP TABLE metadados;
+        DROP TABLE saldos_checkpoint;
+        PRAGMA user_version = 0;
+        """)
+        self.db_connection.refresh_timestamp_format()
+        
+        create_tables(self.db_connection)
+        
+        assert self.db_connection.timestamp_format == FORMATO_TEXTO
+        assert self._versoes_registradas() == [migration.version for migration in MIGRATIONS]
+        assert ProdutoService(self.db_connection).buscar_produto_por_id(produto.id).estoque_atual == 3
+        assert EstoqueService(self.db_connection).obter_saldo_produto(produto.id) == 3
+    
+    def test_carga_em_blocos_retomavel(self):
+        """Testa que uma carga de dados interrompida continua de onde parou"""
+        blocos = []
+        
+        def criar(cursor, contexto):
+            cursor.execute("CREATE TABLE numeros (n INTEGER PRIMARY KEY, dobro INTEGER)")
+            cursor.executemany("INSERT INTO numeros (n) VALUES (?)", [(n,) for n in range(1, 11)])
+        
+        def preencher(cursor, ultimo, tamanho_bloco):
+            cursor.execute(
+                "SELECT n FROM numeros WHERE n > ? ORDER BY n LIMIT ?", (ultimo or 0, tamanho_bloco)
+            )
+            numeros = [row['n'] for row in cursor.fetchall()]
+            if not numeros:
+                return None
+            blocos.append(numeros)
+            cursor.executemany("UPDATE numeros SET dobro = n * 2 WHERE n = ?", [(n,) for n in numeros])
+            return numeros[-1]
+        
+        migrations = [Migration(1, "numeros", criar, preencher)]
+        
+        assert Migrator(self.db_connection, migrations).migrate(chunk_size=3, max_chunks=2) == 0
+        assert blocos == [[1, 2, 3], [4, 5, 6]]
+        
+        assert Migrator(self.db_connection, migrations).migrate(chunk_size=3) == 1
+        assert blocos[2:] == [[7, 8, 9], [10]]
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM numeros WHERE dobro = n * 2")
+            assert cursor.fetchone()[0] == 10
+    
+    def test_falha_desfaz_o_passo(self):
+        """Testa que uma migration com erro não fica registrada"""
+        def quebrar(cursor, contexto):
+            cursor.execute("CREATE TABLE parcial (id INTEGER)")
+            raise RuntimeError("falha simulada")
+        
+        with pytest.raises(RuntimeError):
+            Migrator(self.db_connection, [Migration(1, "quebrada", quebrar)]).migrate()
+        
+        migrador = Migrator(self.db_connection, [Migration(1, "corrigida", lambda cursor, contexto: None)])
+        assert migrador.current_version() == 0
+        assert migrador.migrate() == 1
+    
+    def test_versoes_repetidas(self):
+        """Testa que versões repetidas são rejeitadas"""
+        passo = lambda cursor, contexto: None
+        
+        with pytest.raises(ValueError):
+            Migrator(self.db_connection, [Migration(1, "a", passo), Migration(1, "b", passo)])
+    
+    def test_carga_interrompida_aplica_esquema_das_versoes_seguintes(self):
+        """Testa que max_chunks interrompe só a carga: as versões seguintes são aplicadas e os serviços funcionam"""
+        Migrator(self.db_connection, [m for m in MIGRATIONS if m.version < 7]).migrate()
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Antigo", estoque_atual=100))
+        with self.db_connection.get_cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimentacoes (produto_id, tipo, quantidade, created_at) VALUES (?, ?, ?, ?)",
+                [(produto.id, "entrada", 1, para_epoch_us(datetime(2024, 2, 3, 10, 0))) for _ in range(5)]
+            )
+        
+        migrador = Migrator(self.db_connection, MIGRATIONS)
+        assert migrador.migrate(chunk_size=1, max_chunks=1) == 6
+        assert self._versoes_registradas() == [migration.version for migration in MIGRATIONS]
+        
+        estoque_service = EstoqueService(self.db_connection)
+        estoque_service.registrar_entrada(produto.id, 4)
+        assert len(estoque_service.listar_movimentacoes(produto_id=produto.id)) == 6
+        assert estoque_service.obter_saldo_produto(produto.id) == 109
+        assert estoque_service.relatorio_valorizacao().total_unidades == 104
+        assert estoque_service.listar_particoes() == []
+        
+        assert migrador.migrate(chunk_size=1) == migrador.latest_version
+        resumo = estoque_service.listar_movimentacoes_diarias(datetime(2024, 2, 3).date(), datetime(2024, 2, 3).date())
+        assert [(r.entradas, r.saidas) for r in resumo] == [(5, 0)]
+    
+    def test_carga_do_resumo_diario(self):
+        """Testa a carga em blocos do resumo diário de um banco anterior a ele"""
+        Migrator(self.db_connection, [m for m in MIGRATIONS if m.version < 7]).migrate()
+        produto = ProdutoService(self.db_connection).criar_produto(Produto(nome="Produto Antigo", estoque_atual=100))
+        dia = datetime(2024, 2, 3, 10, 0, 0, 1)
+        with self.db_connection.get_cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimentacoes (produto_id, tipo, quantidade, created_at) VALUES (?, ?, ?, ?)",
+                [(produto.id, tipo, quantidade, para_epoch_us(dia)) for tipo, quantidade in
+                 [("entrada", 5), ("saida", 2), ("entrada", 1), ("saida", 3), ("entrada", 10)]]
+            )
+        
+        # Interrompida após o primeiro bloco, continua na próxima inicialização
+        assert migrar_esquema(self.db_connection, tamanho_bloco=2, max_blocos=1) == 6
+        EstoqueService(self.db_connection).registrar_entrada(produto.id, 4)  # já somada pelo serviço
+        create_tables(self.db_connection)
+        
+        estoque_service = EstoqueService(self.db_connection)
+        resumo = estoque_service.listar_movimentacoes_diarias(dia.date(), dia.date())
+        assert [(r.entradas, r.saidas) for r in resumo] == [(16, 5)]
+        total_hoje = sum(r.entradas for r in estoque_service.obter_totais_periodo(datetime.now().date(),
+                                                                                   datetime.now().date()))
+        assert total_hoje == 4
+        
+        # A reconstrução chega ao mesmo resultado
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("UPDATE movimentacoes_diarias SET entradas = 0")
+        assert reconstruir_movimentacoes_diarias(self.db_connection, tamanho_bloco=4) == 6
+        assert [(r.entradas, r.saidas) for r in estoque_service.listar_movimentacoes_diarias(dia.date(), dia.date())] \
+            == [(16, 5)]
@@ -0,0 +1,234 @@
+"""
+Testes unitários para o arquivamento de movimentações em partições mensais
+"""
+import pytest
+import tempfile
+import io
+import os
+import shutil
+import stat
+from datetime import date, datetime
+
+from src.models.produto import Produto
+from src.models.movimentacao import TipoMovimentacao
+from src.models.datas import para_banco
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.exportador import Exportador
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables, reconstruir_movimentacoes_diarias
+from src.database.partitions import MAX_ATTACHED_PARTITIONS, attach_partitions
+
+
+class TestParticoesMovimentacoes:
+    """Testes para partições mensais do histórico de movimentações"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.produto = self.produto_service.criar_produto(Produto(nome="Produto A", estoque_atual=100))
+        self.outro = self.produto_service.criar_produto(Produto(nome="Produto B", estoque_atual=100))
+        
+        yield
+        
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _movimentar(self, produto_id: int, quando: datetime, quantidade: int = 1,
+                    tipo: TipoMovimentacao = TipoMovimentacao.ENTRADA) -> int:
+        """Registra uma movimentação e reescreve sua data"""
+        if tipo == TipoMovimentacao.ENTRADA:
+            movimentacao = self.estoque_service.registrar_entrada(produto_id, quantidade)
+        else:
+            movimentacao = self.estoque_service.registrar_saida(produto_id, quantidade)
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE movimentacoes SET created_at = ? WHERE id = ?",
+                (para_banco(quando, self.db_connection.timestamp_format), movimentacao.id)
+            )
+        return movimentacao.id
+    
+    def _historico(self, meses: int = 3):
+        """Cria duas movimentações por mês a partir de janeiro de 2024 e uma no mês atual"""
+        for indice in range(meses):
+            quando = datetime(2024 + indice // 12, indice % 12 + 1, 15, 10, 0)
+            self._movimentar(self.produto.id, quando, quantidade=indice + 1)
+            self._movimentar(self.outro.id, quando.replace(hour=11), tipo=TipoMovimentacao.SAIDA)
+        self.estoque_service.registrar_entrada(self.produto.id, 7)
+    
+    def test_arquivar_preserva_listagem_e_saldo(self):
+        """Testa que o arquivamento move os meses fechados sem mudar leituras"""
+        self._historico()
+        antes = [mov.id for mov in self.estoque_service.listar_movimentacoes()]
+        saldos = (self.estoque_service.obter_saldo_produto(self.produto.id),
+                  self.estoque_service.obter_saldo_produto(self.outro.id))
+        
+        particoes = self.estoque_service.arquivar_movimentacoes()
+        
+        assert [particao.mes for particao in particoes] == ["2024-01", "2024-02", "2024-03"]
+        assert [particao.linhas for particao in particoes] == [2, 2, 2]
+        assert self.estoque_service.listar_particoes() == particoes
+        assert particoes[0].inicio == datetime(2024, 1, 1) and particoes[0].fim == datetime(2024, 2, 1)
+        
+        caminho = os.path.join(self.temp_dir, particoes[0].arquivo)
+        assert caminho == os.path.join(self.temp_dir, "test_particoes", "movimentacoes_2024_01.db")
+        assert not stat.S_IMODE(os.stat(caminho).st_mode) & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM movimentacoes")
+            assert cursor.fetchone()[0] == 1
+        
+        assert [mov.id for mov in self.estoque_service.listar_movimentacoes()] == antes
+        assert (self.estoque_service.obter_saldo_produto(self.produto.id),
+                self.estoque_service.obter_saldo_produto(self.outro.id)) == saldos
+        assert self.estoque_service.recalcular_todos(corrigir=False).divergencias == []
+        
+        # Nada mais a arquivar: uma nova execução não altera o catálogo
+        assert self.estoque_service.arquivar_movimentacoes() == []
+        assert self.estoque_service.listar_particoes() == particoes
+    
+    def test_poda_por_periodo_e_produto(self):
+        """Testa que só as partições do período e do produto são consultadas"""
+        self._historico()
+        self.estoque_service.arquivar_movimentacoes()
+        terceiro = self.produto_service.criar_produto(Produto(nome="Produto C"))
+        
+        conexao = self.db_connection.connect()
+        instrucoes = []
+        conexao.set_trace_callback(instrucoes.append)
+        try:
+            fevereiro = self.estoque_service.listar_movimentacoes(
+                produto_id=self.produto.id, inicio=datetime(2024, 2, 1), fim=datetime(2024, 3, 1)
+            )
+            sem_particoes = self.estoque_service.listar_movimentacoes(produto_id=terceiro.id)
+        finally:
+            conexao.set_trace_callback(None)
+        
+        assert [(mov.produto_id, mov.quantidade) for mov in fevereiro] == [(self.produto.id, 2)]
+        assert sem_particoes == []
+        
+        consultas = [sql for sql in instrucoes if "FROM movimentacoes m" in sql]
+        assert "mov_2024_02.movimentacoes" in consultas[0]
+        assert "mov_2024_01" not in consultas[0] and "mov_2024_03" not in consultas[0]
+        assert "UNION ALL" not in consultas[1]
+    
+    def test_grupos_alem_do_limite_de_anexos(self):
+        """Testa paginação e iteração com mais partições do que cabem anexadas"""
+        self._historico(meses=MAX_ATTACHED_PARTITIONS + 3)
+        antes = [mov.id for mov in self.estoque_service.listar_movimentacoes()]
+        
+        self.estoque_service.arquivar_movimentacoes()
+        
+        assert [mov.id for mov in self.estoque_service.listar_movimentacoes()] == antes
+        assert [mov.id for mov in self.estoque_service.iterar_movimentacoes(limite=20, tamanho_bloco=3)] == antes[:20]
+        
+        paginas = []
+        pagina = self.estoque_service.listar_movimentacoes_paginado(limite=4)
+        paginas.extend(mov.id for mov in pagina)
+        while pagina.proximo:
+            pagina = self.estoque_service.listar_movimentacoes_paginado(limite=4, apos=pagina.proximo)
+            paginas.extend(mov.id for mov in pagina)
+        assert paginas == antes
+        
+        anexadas = self.db_connection.connect().attached_partitions
+        assert len(anexadas) <= MAX_ATTACHED_PARTITIONS
+    
+    def _exportar(self, **filtros) -> str:
+        """Exporta movimentações em CSV e retorna o texto"""
+        destino = io.StringIO()
+        Exportador(self.db_connection, tamanho_bloco=3).exportar_movimentacoes(destino, **filtros)
+        return destino.getvalue()
+    
+    def test_exportacao_inclui_particoes(self):
+        """Testa que a exportação lê as partições em ordem cronológica"""
+        self._historico(meses=MAX_ATTACHED_PARTITIONS + 3)
+        filtros = [
+            {},
+            {"produto_id": self.produto.id},
+            {"tipo": TipoMovimentacao.SAIDA, "inicio": datetime(2024, 3, 1), "fim": datetime(2024, 11, 1)},
+        ]
+        antes = [self._exportar(**filtro) for filtro in filtros]
+        
+        self.estoque_service.arquivar_movimentacoes()
+        
+        assert len(antes[0].splitlines()) == 1 + 2 * (MAX_ATTACHED_PARTITIONS + 3) + 1
+        assert [self._exportar(**filtro) for filtro in filtros] == antes
+        
+        # Os ramos já vêm ordenados pelo índice: sem ordenação temporária
+        conexao = self.db_connection.connect()
+        instrucoes = []
+        conexao.set_trace_callback(instrucoes.append)
+        try:
+            self._exportar(inicio=datetime(2024, 2, 1), fim=datetime(2024, 4, 1))
+        finally:
+            conexao.set_trace_callback(None)
+        
+        consulta = next(sql for sql in instrucoes if "UNION ALL" in sql)
+        plano = [row['detail'] for row in conexao.execute(f"EXPLAIN QUERY PLAN {consulta}")]
+        assert not any("TEMP B-TREE" in passo for passo in plano)
+    
+    def test_analises_incluem_particoes(self):
+        """Testa que totais, fluxo e giro somam as movimentações arquivadas"""
+        pytest.importorskip("numpy")
+        from src.services.analise_service import AnaliseService
+        
+        self._historico(meses=MAX_ATTACHED_PARTITIONS + 3)
+        analise = AnaliseService(self.db_connection, tamanho_bloco=3)
+        
+        def resultados():
+            totais = analise.totais_por_produto()
+            fluxo = analise.fluxo_por_periodo("dia", produto_id=self.produto.id)
+            giro = analise.giro_por_produto(inicio=datetime(2024, 6, 1))
+            return (
+                totais.produto_ids.tolist(), totais.entradas.tolist(), totais.saidas.tolist(),
+                fluxo.inicios.tolist(), fluxo.entradas.tolist(),
+                giro.produto_ids.tolist(), giro.saidas.tolist(), giro.giro.tolist(),
+            )
+        
+        antes = resultados()
+        self.estoque_service.arquivar_movimentacoes()
+        
+        assert antes[2] == [0, MAX_ATTACHED_PARTITIONS + 3]
+        assert resultados() == antes
+    
+    def test_saldo_sem_checkpoint_soma_particoes(self):
+        """Testa o saldo de um produto cujo checkpoint não cobre as partições"""
+        self._historico()
+        saldo = self.estoque_service.obter_saldo_produto(self.produto.id)
+        self.estoque_service.arquivar_movimentacoes()
+        
+        with self.db_connection.get_cursor() as cursor:
+            cursor.execute("DELETE FROM saldos_checkpoint")
+        
+        assert self.estoque_service.obter_saldo_produto(self.produto.id) == saldo
+    
+    def test_reconstrucao_do_resumo_inclui_particoes(self):
+        """Testa que o resumo diário reconstruído soma as partições"""
+        self._historico()
+        reconstruir_movimentacoes_diarias(self.db_connection)
+        resumo = self.estoque_service.listar_movimentacoes_diarias(date(2024, 1, 1), date(2024, 12, 31))
+        
+        self.estoque_service.arquivar_movimentacoes()
+        reconstruir_movimentacoes_diarias(self.db_connection)
+        
+        assert len(resumo) == 6
+        assert self.estoque_service.listar_movimentacoes_diarias(date(2024, 1, 1), date(2024, 12, 31)) == resumo
+    
+    def test_anexar_particao_inexistente(self):
+        """Testa que um arquivo ausente não é criado vazio pelo ATTACH"""
+        caminho = os.path.join(self.temp_dir, "ausente.db")
+        
+        with self.db_connection.get_cursor() as cursor:
+            with pytest.raises(FileNotFoundError):
+                attach_partitions(cursor, [("mov_2024_01", caminho)])
+        
+        assert not os.path.exists(caminho)
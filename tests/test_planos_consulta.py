@@ -0,0 +1,212 @@
+"""
+Testes de regressão dos planos de consulta (EXPLAIN QUERY PLAN)
+
+Cada método dos serviços é executado com um trace na conexão; todas as
+instruções capturadas passam por EXPLAIN QUERY PLAN e o teste falha se o
+plano varrer uma tabela ou criar uma B-tree temporária para ordenar.
+"""
+import io
+import pytest
+import tempfile
+import os
+import shutil
+from datetime import date, datetime
+
+from src.models.produto import Produto
+from src.models.movimentacao import TipoMovimentacao
+from src.services.produto_service import ProdutoService
+from src.services.estoque_service import EstoqueService
+from src.services.importador_csv import ImportadorCSV
+from src.services.exportador import Exportador
+from src.database.connection import DatabaseConnection
+from src.database.migrations import create_tables
+
+
+# Varreduras intencionais: detalhe do plano -> motivo
+VARREDURAS_PERMITIDAS = {
+    "SCAN produtos USING INDEX sqlite_autoindex_produtos_1":
+        "listar_produtos devolve o catálogo inteiro em ordem de nome",
+    "SCAN m USING INDEX idx_movimentacoes_created_at":
+        "listagem sem filtros já na ordem do índice; as páginas param no LIMIT",
+    "SCAN movimentacoes USING INDEX idx_movimentacoes_created_at":
+        "exportação sem filtros já na ordem do índice",
+    "SCAN produtos USING INDEX idx_produtos_reposicao":
+        "índice parcial contém apenas os produtos a repor",
+    "SCAN correcoes VIRTUAL TABLE INDEX 1:":
+        "lista de correções (JSON) aplicada por recalcular_todos",
+    "SCAN CONSTANT ROW":
+        "SELECT sem tabela",
+    "SCAN particoes_movimentacoes USING INDEX sqlite_autoindex_particoes_movimentacoes_1":
+        "catálogo de partições: uma linha por mês arquivado, em ordem de mês",
+    "SCAN particoes_movimentacoes":
+        "catálogo de partições: uma linha por mês arquivado",
+}
+
+# Métodos em que a B-tree temporária é intencional: método -> motivo
+ORDENACOES_PERMITIDAS = {
+    "obter_totais_periodo": "agrupa por produto só as linhas do período no resumo diário",
+    "relatorio_valorizacao": "maiores valores: ordenação top-N limitada, com o resultado em cache",
+}
+
+# Varreduras intencionais de um único método: método -> {detalhe do plano: motivo}
+VARREDURAS_POR_METODO = {
+    "recalcular_todos": {
+        "SCAN produtos USING COVERING INDEX sqlite_autoindex_produtos_1": "conta os produtos verificados",
+        "SCAN p": "confere o saldo de todos os produtos",
+    },
+    "obter_saldos": {
+        "SCAN p": "saldo de todos os produtos",
+    },
+    "criar_checkpoint_saldo_todos": {
+        "SCAN p": "checkpoint de saldo de todos os produtos",
+    },
+    "relatorio_valorizacao": {
+        "SCAN produtos": "soma o valor do catálogo inteiro; o resultado fica em cache até a próxima escrita",
+    },
+}
+
+INSTRUCOES_COM_PLANO = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class TestPlanosConsulta:
+    """Testes dos planos de consulta dos serviços"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Setup executado antes de cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.temp_dir, "test.db")
+        
+        self.db_connection = DatabaseConnection(self.test_db_path)
+        create_tables(self.db_connection)
+        
+        self.produto_service = ProdutoService(self.db_connection)
+        self.estoque_service = EstoqueService(self.db_connection)
+        self.importador = ImportadorCSV(self.db_connection)
+        self.exportador = Exportador(self.db_connection)
+        
+        self.produto = self.produto_service.criar_produto(Produto(nome="Produto Plano", estoque_atual=10))
+        self.outro = self.produto_service.criar_produto(Produto(nome="Outro Produto", estoque_atual=1, estoque_minimo=5))
+        for _ in range(3):
+            self.estoque_service.registrar_entrada(self.produto.id, 2)
+        
+        # Reserva a conexão da thread para que todas as chamadas passem pelo trace
+        self.conexao = self.db_connection.connect()
+        
+        yield
+        
+        self.conexao.set_trace_callback(None)
+        self.db_connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _instrucoes(self, operacao):
+        """Executa a operação e retorna as instruções SQL enviadas ao banco"""
+        instrucoes = []
+        self.conexao.set_trace_callback(instrucoes.append)
+        try:
+            operacao()
+        finally:
+            self.conexao.set_trace_callback(None)
+        
+        return [sql for sql in instrucoes if sql.split(None, 1)[0].upper() in INSTRUCOES_COM_PLANO]
+    
+    def _problemas(self, sql, permitir_ordenacao=False, varreduras=()):
+        """Retorna os passos do plano que varrem tabelas ou ordenam em B-tree temporária"""
+        plano = [row['detail'] for row in self.conexao.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        return [
+            passo for passo in plano
+            if ("USE TEMP B-TREE" in passo and not permitir_ordenacao)
+            or (passo.startswith("SCAN ") and passo not in VARREDURAS_PERMITIDAS and passo not in varreduras)
+        ]
+    
+    @pytest.mark.parametrize("nome, operacao", [
+        ("buscar_produto_por_id", lambda self: self.produto_service.buscar_produto_por_id(self.produto.id)),
+        ("buscar_produtos_por_ids",
+         lambda self: self.produto_service.buscar_produtos_por_ids([self.produto.id, self.outro.id])),
+        ("buscar_produto_por_nome", lambda self: self.produto_service.buscar_produto_por_nome("Produto Plano")),
+        ("listar_produtos", lambda self: self.produto_service.listar_produtos()),
+        ("atualizar_estoque", lambda self: self.produto_service.atualizar_estoque(self.outro.id, 3)),
+        ("definir_estoque_minimo", lambda self: self.produto_service.definir_estoque_minimo(self.produto.id, 2)),
+        ("excluir_produto", lambda self: self.produto_service.excluir_produto(self.outro.id)),
+        ("registrar_entrada", lambda self: self.estoque_service.registrar_entrada(self.produto.id, 1)),
+        ("registrar_saida", lambda self: self.estoque_service.registrar_saida(self.produto.id, 1)),
+        ("registrar_movimentacoes_em_lote", lambda self: self.estoque_service.registrar_movimentacoes_em_lote(
+            [(self.produto.id, "entrada", 1), (self.outro.id, "saida", 1), (999, "entrada", 1)]
+        )),
+        ("listar_movimentacoes", lambda self: self.estoque_service.listar_movimentacoes()),
+        ("listar_movimentacoes_por_produto",
+         lambda self: self.estoque_service.listar_movimentacoes(produto_id=self.produto.id)),
+        ("listar_movimentacoes_por_tipo",
+         lambda self: self.estoque_service.listar_movimentacoes(tipo=TipoMovimentacao.ENTRADA)),
+        ("listar_movimentacoes_por_produto_e_tipo", lambda self: self.estoque_service.listar_movimentacoes(
+            produto_id=self.produto.id, tipo=TipoMovimentacao.ENTRADA
+        )),
+        ("listar_movimentacoes_por_periodo", lambda self: self.estoque_service.listar_movimentacoes(
+            inicio=datetime(2024, 1, 1), fim=datetime(2030, 1, 1)
+        )),
+        ("listar_movimentacoes_paginado", lambda self: self.estoque_service.listar_movimentacoes_paginado(
+            limite=1, apos=self.estoque_service.listar_movimentacoes_paginado(limite=1).proximo
+        )),
+        ("listar_movimentacoes_paginado_por_produto", lambda self: self.estoque_service.listar_movimentacoes_paginado(
+            limite=1, produto_id=self.produto.id,
+            apos=self.estoque_service.listar_movimentacoes_paginado(limite=1, produto_id=self.produto.id).proximo
+        )),
+        ("listar_movimentacoes_com_produto",
+         lambda self: self.estoque_service.listar_movimentacoes(incluir_produto=True)),
+        ("listar_movimentacoes_paginado_com_produto", lambda self: self.estoque_service.listar_movimentacoes_paginado(
+            limite=1, incluir_produto=True,
+            apos=self.estoque_service.listar_movimentacoes_paginado(limite=1).proximo
+        )),
+        ("iterar_movimentacoes", lambda self: list(self.estoque_service.iterar_movimentacoes(produto_id=self.produto.id))),
+        ("listar_movimentacoes_diarias",
+         lambda self: self.estoque_service.listar_movimentacoes_diarias(date(2024, 1, 1), date(2024, 12, 31))),
+        ("listar_movimentacoes_diarias_por_produto", lambda self: self.estoque_service.listar_movimentacoes_diarias(
+            date(2024, 1, 1), date(2024, 12, 31), produto_id=self.produto.id
+        )),
+        ("obter_totais_periodo",
+         lambda self: self.estoque_service.obter_totais_periodo(date(2024, 1, 1), date(2024, 12, 31))),
+        ("obter_saldo_produto", lambda self: self.estoque_service.obter_saldo_produto(self.produto.id)),
+        ("criar_checkpoint_saldo", lambda self: self.estoque_service.criar_checkpoint_saldo(self.produto.id)),
+        ("criar_checkpoint_saldo_todos", lambda self: self.estoque_service.criar_checkpoint_saldo()),
+        ("obter_saldos", lambda self: self.estoque_service.obter_saldos()),
+        ("obter_saldos_por_ids", lambda self: self.estoque_service.obter_saldos([self.produto.id, self.outro.id])),
+        ("recalcular_todos", lambda self: (
+            self.produto_service.atualizar_estoque(self.outro.id, 50), self.estoque_service.recalcular_todos()
+        )),
+        ("recalcular_estoque_produto", lambda self: self.estoque_service.recalcular_estoque_produto(self.produto.id)),
+        ("verificar_estoque_disponivel",
+         lambda self: self.estoque_service.verificar_estoque_disponivel(self.produto.id, 1)),
+        ("obter_produtos_com_estoque_baixo", lambda self: self.estoque_service.obter_produtos_com_estoque_baixo(5)),
+        ("importar_csv", lambda self: self.importador.importar(io.StringIO(
+            "nome,preco_unitario,estoque_atual\nProduto Plano,3.5,4\nProduto Novo,1.0,2\n"
+        ))),
+        ("exportar_movimentacoes", lambda self: self.exportador.exportar_movimentacoes(io.StringIO())),
+        ("exportar_movimentacoes_filtradas", lambda self: self.exportador.exportar_movimentacoes(
+            io.StringIO(), produto_id=self.produto.id, inicio=datetime(2024, 1, 1)
+        )),
+        ("exportar_movimentacoes_por_tipo", lambda self: self.exportador.exportar_movimentacoes(
+            io.StringIO(), tipo=TipoMovimentacao.SAIDA, fim=datetime(2030, 1, 1)
+        )),
+        ("exportar_produtos", lambda self: self.exportador.exportar_produtos(io.StringIO())),
+        ("relatorio_valorizacao", lambda self: self.estoque_service.relatorio_valorizacao(por_produto=True)),
+        ("listar_produtos_para_reposicao", lambda self: self.estoque_service.listar_produtos_para_reposicao(
+            limite=1, apos=self.estoque_service.listar_produtos_para_reposicao(limite=1).proximo
+        )),
+    ])
+    def test_plano_sem_varredura_nem_ordenacao_temporaria(self, nome, operacao):
+        """Testa que as instruções do método usam índices e não ordenam em memória"""
+        instrucoes = self._instrucoes(lambda: operacao(self))
+        assert instrucoes, f"{nome} não executou nenhuma instrução"
+        
+        problemas = {
+            sql: self._problemas(sql, nome in ORDENACOES_PERMITIDAS, VARREDURAS_POR_METODO.get(nome, {}))
+            for sql in instrucoes
+        }
+        assert {sql: passos for sql, passos in problemas.items() if passos} == {}
+    
+    def test_detecta_varredura(self):
+        """Testa que o próprio verificador acusa uma consulta sem índice"""
+        assert self._problemas("SELECT * FROM movimentacoes WHERE quantidade = 1")
+        assert self._problemas("SELECT * FROM produtos ORDER BY preco_unitario")
+        # A varredura de todos os produtos só é aceita nos métodos que os leem todos
+        assert self._problemas("SELECT * FROM produtos p WHERE p.preco_unitario > 1")
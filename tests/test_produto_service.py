@@ -24,7 +24,7 @@ class TestProdutoService:
         self.test_db_path = os.path.join(self.temp_dir, "test.db")
         
         self.db_connection = DatabaseConnection(self.test_db_path)
-        create_tables()
+        create_tables(self.db_connection)
         
         self.produto_service = ProdutoService(self.db_connection)
         
@@ -78,6 +78,18 @@ class TestProdutoService:
         with pytest.raises(ProdutoNaoEncontradoException):
             self.produto_service.buscar_produto_por_id(999)
     
+    def test_buscar_produtos_por_ids(self, monkeypatch):
+        """Testa a busca em lote, em blocos de IN (...), ignorando repetidos e inexistentes"""
+        monkeypatch.setattr("src.services.produto_service.TAMANHO_BLOCO_IN", 2)
+        ids = [self.produto_service.criar_produto(Produto(nome=f"Produto {i}", preco_unitario=i)).id
+               for i in range(5)]
+        
+        produtos = self.produto_service.buscar_produtos_por_ids(ids + [ids[0], 999])
+        
+        assert sorted(produtos) == sorted(ids)
+        assert [produtos[produto_id].nome for produto_id in ids] == [f"Produto {i}" for i in range(5)]
+        assert self.produto_service.buscar_produtos_por_ids([]) == {}
+    
     def test_buscar_produto_por_nome_sucesso(self):
         """Testa busca de produto por nome com sucesso"""
         produto = Produto(nome="Monitor 24 polegadas")
@@ -186,3 +198,34 @@ class TestProdutoService:
         assert produto.tem_estoque_suficiente(5) == True
         assert produto.tem_estoque_suficiente(10) == True
         assert produto.tem_estoque_suficiente(15) == False
+    
+    def test_construcao_posicional_mantem_ordem_dos_campos(self):
+        """Testa que o estoque mínimo não desloca os argumentos posicionais"""
+        criado_em = datetime(2024, 1, 2, 3, 4, 5)
+        produto = Produto("Posicional", "Descrição", 2.5, 4, 9, criado_em, criado_em)
+        
+        assert (produto.id, produto.created_at, produto.updated_at) == (9, criado_em, criado_em)
+        assert produto.estoque_minimo == 0
+    
+    def test_produto_carregado_do_banco_usa_slots(self):
+        """Testa que produtos lidos do banco são compactos e trazem as datas gravadas"""
+        produto_criado = self.produto_service.criar_produto(Produto(nome="Produto Slots"))
+        
+        produto = self.produto_service.buscar_produto_por_id(produto_criado.id)
+        
+        assert not hasattr(produto, "__dict__")
+        assert produto.created_at is not None
+        assert produto.updated_at is not None
+    
+    def test_from_row_nao_aplica_valores_padrao(self):
+        """Testa que from_row preserva os valores da linha sem executar __post_init__"""
+        linha = {
+            "id": 7, "nome": "Linha", "descricao": None, "preco_unitario": 1.5,
+            "estoque_atual": 3, "estoque_minimo": 0, "created_at": None, "updated_at": "2024-01-02 03:04:05"
+        }
+        
+        produto = Produto.from_row(linha)
+        
+        assert produto.id == 7
+        assert produto.created_at is None
+        assert produto.updated_at.year == 2024